@@ -0,0 +1,120 @@
+"""Load benchmark for System 2 against the local stub brain server.
+
+Drives :class:`game.Simulation` with many agents while their novelty events
+are answered by :class:`stub_brain_server.StubBrainServer`, then reports
+System 2 throughput and tail latency next to main-loop frame times. A frame
+p99 that stays flat as brain latency grows shows thinking never stalls
+``update()``.
+
+Usage::
+
+    python bench_system2.py --agents 300 --seconds 10 --latency 0.25 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+import game
+from profiling import percentile
+from stub_brain_server import StubBrainServer
+from system2 import BrainResponseCache, BrainScheduler, OllamaBackend, UrllibBackend
+
+BACKENDS = {"requests": OllamaBackend, "urllib": UrllibBackend}
+
+
+def run_benchmark(
+    agents=200,
+    seconds=10.0,
+    latency=0.2,
+    failure_rate=0.0,
+    workers=4,
+    max_pending=64,
+    step=1.0,
+    seed=0,
+    use_cache=False,
+    client="requests",
+):
+    """Run the simulation for ``seconds`` of wall time and return a report dict.
+
+    ``client`` picks the HTTP backend: ``"requests"`` (keep-alive sessions, as
+    the game uses) or ``"urllib"`` (standard library only).
+    """
+    rng = random.Random(seed)
+    previous = (game.QwenBrain.backend, game.brain_scheduler, game.brain_cache)
+    scheduler = BrainScheduler(workers=workers, max_pending=max_pending)
+    with StubBrainServer(latency=latency, failure_rate=failure_rate, seed=seed) as server:
+        game.QwenBrain.use_backend(BACKENDS[client](url=server.url, timeout=max(10.0, latency * 4)))
+        game.brain_scheduler = scheduler
+        game.brain_cache = BrainResponseCache() if use_cache else BrainResponseCache(max_entries=0)
+        try:
+            sim = game.Simulation(rng=random.Random(seed))
+            while len(sim.humans) < agents:
+                sim.add_human(rng.randrange(game.MAP_W), rng.randrange(game.MAP_H), len(sim.humans) % 2)
+
+            frames = []
+            started = time.perf_counter()
+            while time.perf_counter() - started < seconds:
+                t0 = time.perf_counter()
+                sim.update(step)
+                frames.append(time.perf_counter() - t0)
+            elapsed = time.perf_counter() - started
+            scheduler.wait_idle(timeout=max(5.0, latency * 10))
+            metrics = scheduler.metrics()
+            served = server.requests_served
+        finally:
+            scheduler.shutdown(wait=False)
+            game.QwenBrain.use_backend(previous[0])
+            game.brain_scheduler, game.brain_cache = previous[1], previous[2]
+
+    return {
+        "agents": agents,
+        "frames": len(frames),
+        "frame_p50_ms": percentile(frames, 0.5) * 1000,
+        "frame_p99_ms": percentile(frames, 0.99) * 1000,
+        "frame_max_ms": max(frames, default=0.0) * 1000,
+        "thoughts_completed": metrics.completed,
+        "thoughts_per_second": metrics.completed / elapsed if elapsed else 0.0,
+        "think_latency_p50_ms": metrics.latency_p50 * 1000,
+        "think_latency_p99_ms": metrics.latency_p99 * 1000,
+        "queue_max_depth": metrics.max_queue_depth,
+        "rejected": metrics.rejected,
+        "shed": metrics.shed,
+        "server_requests": served,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark System 2 load against the stub brain server.")
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--step", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="enable the System 2 response cache")
+    parser.add_argument("--client", choices=sorted(BACKENDS), default="requests", help="HTTP backend for the brain")
+    args = parser.parse_args(argv)
+    report = run_benchmark(
+        agents=args.agents,
+        seconds=args.seconds,
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        workers=args.workers,
+        max_pending=args.max_pending,
+        step=args.step,
+        seed=args.seed,
+        use_cache=args.cache,
+        client=args.client,
+    )
+    for key, value in report.items():
+        print(f"{key:>22}: {value:,.2f}" if isinstance(value, float) else f"{key:>22}: {value}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,13 @@
 """Camera utilities for isometric transforms and zoom/pan controls."""
 
-from dataclasses import dataclass
+import math
+from array import array
+from dataclasses import dataclass, field
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; array.array buffers are used instead.
+    np = None
 
 
 def clamp(value: float, min_value: float, max_value: float) -> float:
@@ -17,6 +24,23 @@ class Camera:
     tile_height: float = 18.0
     min_scale: float = 0.6
     max_scale: float = 2.4
+    _factors: tuple = field(default=(), init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._refresh_factors()
+
+    def _refresh_factors(self) -> None:
+        # (scale, tile_width, tile_height) the factors were built from, then the
+        # projection (scaled half tile) and unprojection (its reciprocal) terms.
+        half_w = self.tile_width / 2 * self.scale
+        half_h = self.tile_height / 2 * self.scale
+        key = (self.scale, self.tile_width, self.tile_height)
+        self._factors = (key, half_w, half_h, 1 / half_w, 1 / half_h)
+
+    def _scaled_halves(self) -> tuple:
+        if self._factors[0] != (self.scale, self.tile_width, self.tile_height):
+            self._refresh_factors()  # fields were assigned directly
+        return self._factors[1:]
 
     def world_to_screen(self, tile_x: float, tile_y: float) -> tuple[float, float]:
         """Convert tile coordinates to isometric screen coordinates."""
@@ -26,16 +50,71 @@ class Camera:
         screen_y = (tile_x + tile_y) * half_h * self.scale + self.offset_y
         return screen_x, screen_y
 
-    def screen_to_world(self, screen_x: float, screen_y: float) -> tuple[int, int]:
-        """Convert screen coordinates back to tile grid positions (rounded)."""
+    def _screen_to_tile(self, screen_x: float, screen_y: float) -> tuple[float, float]:
         half_w = self.tile_width / 2
         half_h = self.tile_height / 2
         x_part = ((screen_x - self.offset_x) / self.scale) / half_w
         y_part = ((screen_y - self.offset_y) / self.scale) / half_h
-        tile_x = (x_part + y_part) / 2
-        tile_y = (y_part - x_part) / 2
+        return (x_part + y_part) / 2, (y_part - x_part) / 2
+
+    def screen_to_world(self, screen_x: float, screen_y: float) -> tuple[int, int]:
+        """Convert screen coordinates back to tile grid positions (rounded)."""
+        tile_x, tile_y = self._screen_to_tile(screen_x, screen_y)
         return round(tile_x), round(tile_y)
 
+    def visible_tile_bounds(self, screen_w: float, screen_h: float, margin: int = 1) -> tuple[int, int, int, int]:
+        """Tile rectangle ``(x0, y0, x1, y1)``, end-exclusive, covering the screen.
+
+        The screen maps to a rotated rectangle in tile space, so the bounds are
+        taken over all four unprojected corners; ``margin`` extra tiles keep
+        diamonds and sprites straddling the edge from popping out.
+        """
+        corners = [self._screen_to_tile(sx, sy) for sx in (0, screen_w) for sy in (0, screen_h)]
+        xs = [tx for tx, _ in corners]
+        ys = [ty for _, ty in corners]
+        return (
+            math.floor(min(xs)) - margin,
+            math.floor(min(ys)) - margin,
+            math.ceil(max(xs)) + margin + 1,
+            math.ceil(max(ys)) + margin + 1,
+        )
+
+    def world_to_screen_many(self, xs, ys):
+        """Project many tile positions at once; returns ``(screen_xs, screen_ys)``.
+
+        NumPy arrays are transformed with array arithmetic; any other sequence
+        (lists, ``array.array`` buffers) yields ``array('d')`` results.
+        """
+        half_w, half_h, _, _ = self._scaled_halves()
+        if np is not None and isinstance(xs, np.ndarray):
+            xs = xs.astype(np.float64, copy=False)
+            ys = np.asarray(ys, dtype=np.float64)
+            return (xs - ys) * half_w + self.offset_x, (xs + ys) * half_h + self.offset_y
+        ox, oy = self.offset_x, self.offset_y
+        return (
+            array("d", [(x - y) * half_w + ox for x, y in zip(xs, ys)]),
+            array("d", [(x + y) * half_h + oy for x, y in zip(xs, ys)]),
+        )
+
+    def screen_to_world_many(self, screen_xs, screen_ys):
+        """Batch :meth:`screen_to_world`; returns rounded ``(tile_xs, tile_ys)``."""
+        _, _, inv_w, inv_h = self._scaled_halves()
+        if np is not None and isinstance(screen_xs, np.ndarray):
+            x_part = (screen_xs - self.offset_x) * inv_w
+            y_part = (np.asarray(screen_ys, dtype=np.float64) - self.offset_y) * inv_h
+            return (
+                np.rint((x_part + y_part) / 2).astype(np.int64),
+                np.rint((y_part - x_part) / 2).astype(np.int64),
+            )
+        tile_xs, tile_ys = array("q"), array("q")
+        ox, oy = self.offset_x, self.offset_y
+        for sx, sy in zip(screen_xs, screen_ys):
+            x_part = (sx - ox) * inv_w
+            y_part = (sy - oy) * inv_h
+            tile_xs.append(round((x_part + y_part) / 2))
+            tile_ys.append(round((y_part - x_part) / 2))
+        return tile_xs, tile_ys
+
     def pan(self, dx: float, dy: float) -> None:
         """Pan camera by adjusting offsets."""
         self.offset_x += dx
@@ -46,10 +125,12 @@ class Camera:
         new_scale = clamp(self.scale * factor, self.min_scale, self.max_scale)
         if pivot is None:
             self.scale = new_scale
+            self._refresh_factors()
             return
 
         world_point = self.screen_to_world(*pivot)
         self.scale = new_scale
+        self._refresh_factors()
         anchor_x, anchor_y = self.world_to_screen(*world_point)
         self.offset_x += pivot[0] - anchor_x
         self.offset_y += pivot[1] - anchor_y
@@ -1,19 +1,63 @@
-import json
 import math
 import random
 import sys
-import threading
-import math
 from collections import deque
 
+import pygame
+
 from camera import Camera
+from system2 import (
+    PRIORITY_COMBAT,
+    PRIORITY_DISCOVERY,
+    PRIORITY_SOCIAL,
+    BrainResponseCache,
+    BrainScheduler,
+    OllamaBackend,
+    ResultChannel,
+    ThoughtResult,
+)
+from simulation_core import (
+    BuildingPlanner,
+    ChunkedWorld,
+    ChunkManager,
+    DistanceField,
+    ItemIndex,
+    KnowledgeBase,
+    MemoryChronicle,
+    PopulationStore,
+    RandomStreams,
+    RegrowthScheduler,
+    SpatialHash,
+    TILE_WATER,
+    WADE_COOLDOWN,
+    build_hut,
+    decay_needs,
+    drink,
+    energy_factor,
+    is_exposed,
+    melee_damage,
+    near_fire,
+    seek_need,
+    seek_step,
+    take_item,
+    tile_overlay,
+    vision_range,
+    wander,
+)
+from profiling import TickProfiler
+from replay import ReplayRecorder
+from snapshot import SnapshotError, read_snapshot, write_snapshot
 
 # ==========================================
 # CONFIGURATION
 # ==========================================
 MODEL_NAME = "qwen2.5:1.5b" 
 TILE_SIZE = 36
-MAP_W, MAP_H = 18, 18
+ISO_TILE_H = TILE_SIZE // 2
+MAP_W, MAP_H = 18, 18  # the home region on screen; the world itself has no edge
+CHUNK_SIZE = 8
+ACTIVE_MARGIN = 4  # tiles kept active around each agent; covers the widest vision range
+FIELD_RANGE = 2 * ACTIVE_MARGIN  # resource fields stop searching this many steps out
 SIDEBAR_W = 360
 LOG_HEIGHT = 140
 SCREEN_W = (MAP_W * TILE_SIZE) + SIDEBAR_W
@@ -21,6 +65,8 @@ SCREEN_H = (MAP_H * TILE_SIZE) + LOG_HEIGHT
 FPS = 15
 DAY_LENGTH_TICKS = FPS * 20  # ~20 seconds per simulated day
 SEASON_LENGTH_DAYS = 50
+APPLE_REGROWTH_MINUTES = 3 * 24 * 60
+FARM_GROWTH_MINUTES = 5
 
 # Color Palette
 C_GRASS  = (100, 180, 80)
@@ -28,6 +74,15 @@ C_TREE   = (34, 139, 34)
 C_WATER  = (65, 105, 225)
 C_STONE_G = (120, 120, 120)
 C_HUT    = (160, 110, 60)
+C_SNOW   = (235, 240, 245)
+
+# Items a chunk starts with, by tile: apples on trees, stones, sticks by the water
+CHUNK_ITEMS = {1: "🍎", 2: "🦴", 3: "🥢"}
+FIELD_ITEMS = {"apple": "🍎", "fire": "🔥"}  # item each resource field follows
+PASSABLE = bytes(t != 3 for t in range(256))  # translate table: water -> 0, else 1
+
+# How the terrain reads in each season phase; winter snows over grass and freezes water
+SEASON_OVERLAYS = {0: None, 1: tile_overlay({0: 5, 3: 5})}
 BROWN    = (100, 60, 30)
 WHITE    = (255, 255, 255)
 BLACK    = (20, 20, 20)
@@ -41,31 +96,54 @@ TRIBE_B_SKIN = (160, 140, 220)
 # SYSTEM 2: THE BRAIN (OLLAMA)
 # ==========================================
 class QwenBrain:
+    # Any system2.BrainBackend works; swap in a stub server or replay log with use_backend().
+    backend = OllamaBackend(model=MODEL_NAME)
+
+    @classmethod
+    def use_backend(cls, backend):
+        cls.backend = backend
+
     @staticmethod
-    def call_brain(agent_name, inventory, tools, situation):
-        url = "http://localhost:11434/api/generate"
-        prompt = (
+    def build_prompt(agent_name, inventory, tools, situation):
+        return (
             f"System: Respond as a primitive human. Be brief. No meta-talk.\n"
             f"Name: {agent_name}\nInv: {inventory}\nTools: {tools}\nSituation: {situation}\n\n"
             f"Format:\nTHOUGHT: [One sentence]\nSPEECH: [One grunt]\nCRAFT: [SPEAR or NONE]"
         )
-        try:
-            r = requests.post(url, json={"model": MODEL_NAME, "prompt": prompt, "stream": False}, timeout=10)
-            if r.status_code == 200:
-                text = r.json().get('response', "")
-                res = {"THOUGHT": "...", "SPEECH": "...", "CRAFT": "NONE"}
-                for line in text.split('\n'):
-                    if line.upper().startswith("THOUGHT:"): res["THOUGHT"] = line.split(":", 1)[-1].strip()
-                    elif line.upper().startswith("SPEECH:"): res["SPEECH"] = line.split(":", 1)[-1].strip()
-                    elif line.upper().startswith("CRAFT:"): res["CRAFT"] = line.split(":", 1)[-1].strip().upper()
-                return res
-        except: return None
+
+    @staticmethod
+    def parse_reply(text):
+        res = {"THOUGHT": "...", "SPEECH": "...", "CRAFT": "NONE"}
+        for line in text.split('\n'):
+            if line.upper().startswith("THOUGHT:"): res["THOUGHT"] = line.split(":", 1)[-1].strip()
+            elif line.upper().startswith("SPEECH:"): res["SPEECH"] = line.split(":", 1)[-1].strip()
+            elif line.upper().startswith("CRAFT:"): res["CRAFT"] = line.split(":", 1)[-1].strip().upper()
+        return res
+
+    @staticmethod
+    def call_brain(agent_name, inventory, tools, situation):
+        text = QwenBrain.backend.generate(QwenBrain.build_prompt(agent_name, inventory, tools, situation))
+        if text is None:
+            return None
+        return QwenBrain.parse_reply(text)
+
+# Shared by every agent so a burst of novelty events cannot overload Ollama.
+brain_scheduler = BrainScheduler(workers=4, max_pending=64)
+brain_cache = BrainResponseCache(max_entries=512, ttl=120.0)
 
 # ==========================================
 # AGENT CLASS
 # ==========================================
 class Human:
-    def __init__(self, id, x, y, tribe_id, role="Gatherer"):
+    __slots__ = (
+        "id", "tribe_id", "name", "x", "y", "hp", "hunger", "thirst", "inventory", "tools",
+        "memories", "gender", "alive", "thought", "speech", "is_thinking", "anim_timer",
+        "attack_power", "spear_uses", "move_cooldown", "resources", "knowledge",
+        "status_effects", "day_log", "phobias", "last_lesson",
+    )
+
+    def __init__(self, id, x, y, tribe_id, role="Gatherer", rng=None):
+        rng = rng if rng is not None else random
         self.id = id
         self.tribe_id = tribe_id
         self.name = f"{'Sun' if tribe_id==0 else 'Moon'}_{id}"
@@ -74,34 +152,73 @@ class Human:
         self.thirst = 0
         self.inventory, self.tools = [], []
         self.memories = []
-        self.gender = random.choice(["M", "F"])
+        self.gender = rng.choice(["M", "F"])
         self.alive = True
         self.thought = "I seek food and the light."
         self.speech = "..."
         self.is_thinking = False
-        self.anim_timer = random.random() * 10
+        self.anim_timer = rng.random() * 10
         self.attack_power = 10
+        self.spear_uses = 0
         self.move_cooldown = 0.0
-
-    def trigger_thinking(self, situation, async_call=True):
+        self.resources = {"wood": 0, "stone": 0}
+        self.knowledge = set()
+        self.status_effects = {}
+        self.day_log = []
+        self.phobias = set()
+        self.last_lesson = None
+
+    def trigger_thinking(self, situation, outbox, async_call=True, priority=PRIORITY_DISCOVERY):
+        """Ask System 2 about ``situation`` without blocking the caller.
+
+        Every reply, whether from the cache, a synchronous call or a worker
+        thread, is posted to ``outbox`` and only takes effect once the owner
+        applies it with :meth:`apply_thought` on its own thread; the agent
+        stays ``is_thinking`` until then.
+        """
         if self.is_thinking: return
 
-        def run_ai():
-            self.is_thinking = True
-            res = QwenBrain.call_brain(self.name, self.inventory, self.tools, situation)
+        self.is_thinking = True
+        inventory, tools = list(self.inventory), list(self.tools)
+        cached = brain_cache.get(inventory, tools, situation)
+        if cached is not None:
+            outbox.post(ThoughtResult.from_response(self, situation, cached))
+            return
+
+        args = (self.name, inventory, tools, situation)
+        if not async_call:
+            res = QwenBrain.call_brain(*args)
+            if res:
+                brain_cache.put(inventory, tools, situation, res)
+            outbox.post(ThoughtResult.from_response(self, situation, res))
+            return
+
+        def deliver(res):
+            # Runs on a worker thread: only touch thread-safe shared state here.
             if res:
-                self.thought, self.speech = res['THOUGHT'], res['SPEECH']
-                if "SPEAR" in res['CRAFT'] and "🦴" in self.inventory and "🥢" in self.inventory:
-                    self.inventory.remove("🦴"); self.inventory.remove("🥢")
-                    self.tools.append("SPEAR")
-                    self.attack_power = 40
-                    self.spear_uses = 5
+                brain_cache.put(inventory, tools, situation, res)
+            outbox.post(ThoughtResult.from_response(self, situation, res))
+
+        if not brain_scheduler.submit(self, QwenBrain.call_brain, *args, priority=priority, on_done=deliver):
             self.is_thinking = False
 
-        if async_call:
-            threading.Thread(target=run_ai, daemon=True).start()
-        else:
-            run_ai()
+    def apply_thought(self, result):
+        if result.ok:
+            self.thought, self.speech = result.thought, result.speech
+            if "SPEAR" in result.craft and "🦴" in self.inventory and "🥢" in self.inventory:
+                self.inventory.remove("🦴"); self.inventory.remove("🥢")
+                self.tools.append("SPEAR")
+                self.attack_power = 40
+                self.spear_uses = 5
+        self.is_thinking = False
+
+    def use_spear(self):
+        if "SPEAR" not in self.tools:
+            return
+        self.spear_uses -= 1
+        if self.spear_uses <= 0:
+            self.tools.remove("SPEAR")
+            self.attack_power = 10
 
     # ==========================================
     # MEMORY & DREAMING
@@ -132,12 +249,40 @@ class Human:
         self.day_log.clear()
         return self.last_lesson
 
+def _pooled_stat(name, cast):
+    def fget(self):
+        return cast(getattr(self._store, name)[self._row])
+
+    def fset(self, value):
+        getattr(self._store, name)[self._row] = value
+
+    return property(fget, fset)
+
+
+class PooledHuman(Human):
+    """Human whose scalar stats live in one row of a shared PopulationStore."""
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store, id, x, y, tribe_id, role="Gatherer", rng=None):
+        self._store = store
+        self._row = store.add(x=x, y=y)
+        super().__init__(id, x, y, tribe_id, role, rng)
+
+    x = _pooled_stat("x", int)
+    y = _pooled_stat("y", int)
+    hp = _pooled_stat("hp", float)
+    hunger = _pooled_stat("hunger", float)
+    thirst = _pooled_stat("thirst", float)
+    move_cooldown = _pooled_stat("move_cooldown", float)
+    alive = _pooled_stat("alive", bool)
+
 # ==========================================
 # GRAPHICS DRAWING HELPERS
 # ==========================================
-def draw_agent(surf, h, camera):
+def draw_agent(surf, h, camera, screen_pos=None):
     bob = int(math.sin(pygame.time.get_ticks() * 0.01 + h.anim_timer) * 4)
-    cx, cy = camera.world_to_screen(h.x, h.y)
+    cx, cy = screen_pos if screen_pos is not None else camera.world_to_screen(h.x, h.y)
     cy += bob
     skin = TRIBE_A_SKIN if h.tribe_id == 0 else TRIBE_B_SKIN
 
@@ -158,51 +303,133 @@ def draw_agent(surf, h, camera):
     if h.is_thinking:
         pygame.draw.circle(surf, WHITE, (cx + 12, cy - 18), 3)
 
-def draw_world_tile(surf, x, y, t_type):
-    rect = (x*TILE_SIZE, y*TILE_SIZE, TILE_SIZE, TILE_SIZE)
-    base_lookup = [C_GRASS, C_TREE, C_STONE_G, C_WATER, HUT_BROWN]
+def draw_water_shimmer(surf, camera, x, y):
+    cx, cy = camera.world_to_screen(x, y)
+    wave = int(math.sin(pygame.time.get_ticks()*0.005 + x)*3 * camera.scale)
+    half = camera.tile_width / 6 * camera.scale
+    pygame.draw.line(surf, WHITE, (cx-half, cy+wave), (cx+half, cy+wave), 1)
+
+def draw_world_tile(surf, camera, x, y, t_type, animate=True):
+    """Paint tile ``(x, y)`` as an isometric diamond centred where ``camera`` projects it."""
+    cx, cy = camera.world_to_screen(x, y)
+    hw, hh = camera.tile_width / 2 * camera.scale, camera.tile_height / 2 * camera.scale
+    base_lookup = [C_GRASS, C_TREE, C_STONE_G, C_WATER, HUT_BROWN, C_SNOW]
     base = base_lookup[t_type]
-    pygame.draw.rect(surf, base, rect)
-    # Detail
+    pygame.draw.polygon(surf, base, [(cx, cy-hh), (cx+hw, cy), (cx, cy+hh), (cx-hw, cy)])
+    # Detail, kept inside the diamond so a repainted tile never smears its neighbours
     if t_type == 0: # Grass tuft
-        pygame.draw.line(surf, (80, 150, 60), (x*TILE_SIZE+5, y*TILE_SIZE+10), (x*TILE_SIZE+7, y*TILE_SIZE+5), 1)
+        pygame.draw.line(surf, (80, 150, 60), (cx-2*camera.scale, cy+hh/2), (cx, cy-hh/2), 1)
     elif t_type == 1: # Bush/Tree
-        pygame.draw.circle(surf, (20, 80, 20), (x*TILE_SIZE+18, y*TILE_SIZE+18), 12)
-        pygame.draw.circle(surf, (40, 100, 40), (x*TILE_SIZE+12, y*TILE_SIZE+12), 10)
+        pygame.draw.circle(surf, (20, 80, 20), (cx, cy), hh*0.9)
+        pygame.draw.circle(surf, (40, 100, 40), (cx-hh/3, cy-hh/3), hh*0.6)
     elif t_type == 4: # Hut outline
-        pygame.draw.rect(surf, (120, 80, 40), (x*TILE_SIZE+6, y*TILE_SIZE+10, TILE_SIZE-12, TILE_SIZE-12), 2)
-        pygame.draw.rect(surf, (200, 170, 120), (x*TILE_SIZE+10, y*TILE_SIZE+18, TILE_SIZE-20, TILE_SIZE-16))
-    elif t_type == 3: # Shimmering water
-        wave = int(math.sin(pygame.time.get_ticks()*0.005 + x)*3)
-        pygame.draw.line(surf, WHITE, (x*TILE_SIZE+5, y*TILE_SIZE+15+wave), (x*TILE_SIZE+15, y*TILE_SIZE+15+wave), 1)
-    elif t_type == 4: # Hut roof line
-        pygame.draw.polygon(surf, (200, 180, 120), [
-            (x*TILE_SIZE+6, y*TILE_SIZE+18),
-            (x*TILE_SIZE+TILE_SIZE//2, y*TILE_SIZE+6),
-            (x*TILE_SIZE+TILE_SIZE-6, y*TILE_SIZE+18)
-        ])
+        pygame.draw.polygon(surf, (200, 180, 120), [(cx-hw/2, cy+hh/3), (cx, cy-hh*0.8), (cx+hw/2, cy+hh/3)])
+        pygame.draw.rect(surf, (120, 80, 40), (cx-hw/4, cy, hw/2, hh/2), 2)
+    elif t_type == 3 and animate: # Shimmering water
+        draw_water_shimmer(surf, camera, x, y)
+
+class TerrainLayer:
+    """Terrain in view pre-rendered once and patched only where tiles change.
+
+    The cache holds the camera's visible tile window; panning or zooming
+    repaints that window, otherwise only tiles written since the last frame
+    are redrawn. Only the water shimmer is animated; it is redrawn each frame
+    on the visible water tiles alone instead of repainting the whole view.
+    """
+
+    def __init__(self, size=(MAP_W*TILE_SIZE, MAP_H*TILE_SIZE)):
+        self.size = size
+        self.surface = None
+        self.version = None
+        self.key = None
+        self.camera = None
+        self.water_tiles = []
+
+    def render(self, sim, camera):
+        if self.surface is None:
+            self.surface = pygame.Surface(self.size)
+        view = camera.visible_tile_bounds(*self.size)
+        key = (view, camera.offset_x, camera.offset_y, camera.scale)
+        if key == self.key and self.version == sim.world_version:
+            return self.surface
+        x0, y0, x1, y1 = view
+        changed = None if key != self.key else sim.changed_tiles_since(self.version)
+        if changed is None:
+            self.surface.fill(BLACK)
+            changed = [(x, y) for y in range(y0, y1) for x in range(x0, x1)]
+        else:
+            changed = [(x, y) for x, y in changed if x0 <= x < x1 and y0 <= y < y1]
+        for x, y in changed:
+            draw_world_tile(self.surface, camera, x, y, sim.world.get(x, y), animate=False)
+        width = x1 - x0
+        tiles = sim.world.region(x0, y0, x1, y1)
+        self.water_tiles = [(x0 + i % width, y0 + i // width) for i, t in enumerate(tiles) if t == 3]
+        self.key, self.version, self.camera = key, sim.world_version, camera
+        return self.surface
+
+    def draw_animated(self, surf):
+        for x, y in self.water_tiles:
+            draw_water_shimmer(surf, self.camera, x, y)
+
+def build_rain_surface():
+    rain_surface = pygame.Surface((MAP_W*TILE_SIZE, MAP_H*TILE_SIZE), pygame.SRCALPHA)
+    for rx in range(0, MAP_W*TILE_SIZE, 12):
+        pygame.draw.line(rain_surface, (150, 180, 255, 120), (rx, 0), (rx-8, MAP_H*TILE_SIZE), 2)
+    return rain_surface
 
 # ==========================================
 # MAIN SIMULATION CLASS
 # ==========================================
 class Simulation:
-    def __init__(self, rng=None):
-        self.rng = rng or random.Random()
-        self.world = [[self.rng.choices([0,1,2,3], weights=[60,15,10,15])[0] for _ in range(MAP_W)] for _ in range(MAP_H)]
-        self.items = {}
-        self.apple_regrowth = {}
-        for y in range(MAP_H):
-            for x in range(MAP_W):
-                if self.world[y][x] == 1:
-                    self.items[(x,y)] = "🍎"
-                elif self.world[y][x] == 2:
-                    self.items[(x,y)] = "🦴"
-                elif self.world[y][x] == 3:
-                    self.items[(x,y)] = "🥢"
-
-        self.humans = [Human(i, self.rng.randint(0,2), self.rng.randint(0,2), 0) for i in range(3)] + \
-                      [Human(i, self.rng.randint(15,17), self.rng.randint(15,17), 1) for i in range(3,6)]
+    def __init__(self, rng=None, chronicle=None, population_backend=None, seed=None):
+        """``population_backend`` ("numpy", "array" or "auto") opts into
+        struct-of-arrays agent stats with vectorized needs updates.
+
+        ``seed`` fixes the whole run: world generation and every subsystem's
+        random stream. A run started from ``rng`` alone derives its streams
+        from that generator but has no seed to record for replays.
+
+        The world is unbounded and generated in ``CHUNK_SIZE`` chunks. Only
+        chunks near living agents, or inside ``view_bounds`` when a front-end
+        sets it, are active: their items are placed on first activation, and
+        untouched chunks are dropped again once nobody is near. A chunk that
+        goes inactive parks its items and fog until it is active again. Nothing else
+        runs per chunk: regrowth waits in a due-time heap and seasons are a
+        read-time overlay, so a chunk that comes back has nothing to catch up on.
+        """
+        if rng is None:
+            if seed is None:
+                seed = random.randrange(2**63)
+            rng = random.Random(seed)
+        self.seed = seed
+        self.rng = rng
+        if seed is None:
+            # Peek at rng through a copy so world generation sees the same draws.
+            probe = random.Random()
+            probe.setstate(rng.getstate())
+            self.streams = RandomStreams(probe.getrandbits(64))
+        else:
+            self.streams = RandomStreams(seed)
+        self.world = ChunkedWorld(
+            ChunkManager(chunk_size=CHUNK_SIZE, world_seed=self.rng.getrandbits(64)),
+            on_write=self._on_tile_written,
+        )
+        self.world_version = 0
+        self.items = ItemIndex(on_remove=self._on_item_removed)
+        self._init_caches()
+        self._populated_chunks = set()
+        self._parked_chunks = {}
+        self.season_phase = 0
+        self.view_bounds = None
+        self.apple_regrowth = RegrowthScheduler()
+
+        self.population = PopulationStore(population_backend) if population_backend else None
+        self.humans = [self._new_human(i, self.rng.randint(0,2), self.rng.randint(0,2), 0) for i in range(3)] + \
+                      [self._new_human(i, self.rng.randint(15,17), self.rng.randint(15,17), 1) for i in range(3,6)]
         self.selected = self.humans[0]
+        self.human_index = SpatialHash(cell_size=4)
+        for h in self.humans:
+            self.human_index.move(h, h.x, h.y)
         self.migration_targets = {}
         self.next_human_id = len(self.humans)
 
@@ -210,6 +437,23 @@ class Simulation:
         self.log_events = deque(maxlen=8)
         self.first_spear_logged = False
 
+        self.tribe_resources = {0: {"wood": 0, "stone": 0}, 1: {"wood": 0, "stone": 0}}
+        self.tribe_knowledge = {0: KnowledgeBase(), 1: KnowledgeBase()}
+        self.tribal_taboos = {0: set(), 1: set()}
+        self.planner = BuildingPlanner(self.streams["planner"])
+        self.chronicle = chronicle
+        self.buildings = []
+        self.farms = RegrowthScheduler()  # farm tile -> when its next apple is due
+        self.wolves = []
+        self.cave_paintings = {}
+        self.explored = set()
+        self._last_reveal = {}
+        self.camera = Camera(offset_x=MAP_W * TILE_SIZE / 2, offset_y=TILE_SIZE)
+        self.thought_results = ResultChannel()
+        self.replay = None
+        self.profiler = None
+        self.tick = 0
+
         self.time_minutes = 8 * 60
         self.total_minutes = 0.0
         self.day_count = 0
@@ -217,8 +461,184 @@ class Simulation:
         self.is_night = False
         self.is_raining = False
         self.temperature = 20
+        self.update_active_chunks()
         self.log_event("The world begins at dawn.")
 
+    def _init_caches(self):
+        self._resource_fields = {}
+        self._window_tiles = {}
+        self._tile_changes = deque(maxlen=256)
+        self.active_chunks = set()
+        self._chunk_windows = {}
+
+    # ==========================================
+    # SNAPSHOTS
+    # ==========================================
+    def save_snapshot(self, path):
+        """Checkpoint the whole simulation to ``path``; returns the file size.
+
+        System 2 requests still in flight are not captured; agents waiting on
+        one resume as if it had failed. Only chunks that differ from their
+        generated terrain are stored; the rest regenerate from the world seed.
+        """
+        chunks = self.world.modified()
+        return write_snapshot(path, CHUNK_SIZE * CHUNK_SIZE, len(chunks), b"".join(chunks.values()),
+                              self._snapshot_state())
+
+    @classmethod
+    def load_snapshot(cls, path, chronicle=None):
+        """Rebuild a simulation saved by :meth:`save_snapshot`.
+
+        Runs resumed from a snapshot continue bit-for-bit like the original.
+        """
+        with read_snapshot(path) as snap:
+            world_seed, chunk_size, keys, _ = snap.state["world"]
+            if (snap.width, snap.height) != (chunk_size * chunk_size, len(keys)):
+                raise SnapshotError(f"Snapshot tiles ({snap.width}x{snap.height}) do not match its chunk table")
+            sim = cls.__new__(cls)
+            sim.world = ChunkedWorld(
+                ChunkManager(chunk_size=chunk_size, world_seed=world_seed), on_write=sim._on_tile_written,
+            )
+            for i, key in enumerate(keys):
+                sim.world.restore(key, snap.tiles[i*snap.width:(i+1)*snap.width])
+            sim._restore_state(snap.state, chronicle)
+        return sim
+
+    def _snapshot_state(self):
+        human_index = [(cell, [h.id for h in bucket]) for cell, bucket in self.human_index.cells.items()]
+        return {
+            "rng": self.rng.getstate(),
+            "seed": self.seed,
+            "streams": (self.streams.seed, self.streams.getstate()),
+            "tick": self.tick,
+            "clock": (self.time_minutes, self.total_minutes, self.day_count,
+                      self.light_level, self.is_night, self.is_raining, self.temperature),
+            "world_version": self.world_version,
+            "world": (self.world.chunks.world_seed, self.world.chunk_size,
+                      self.world.modified_keys(), self._populated_chunks),
+            "active_chunks": self.active_chunks,
+            "parked_chunks": self._parked_chunks,
+            "season_phase": self.season_phase,
+            "items": list(self.items.items()),
+            "apple_regrowth": self.apple_regrowth.entries(),
+            "population_backend": self.population.backend if self.population is not None else None,
+            "humans": [{name: getattr(h, name) for name in Human.__slots__} for h in self.humans],
+            "selected": self.selected.id,
+            "human_index": human_index,
+            "migration_targets": self.migration_targets,
+            "next_human_id": self.next_human_id,
+            "fires": self.fires,
+            "log_events": list(self.log_events),
+            "first_spear_logged": self.first_spear_logged,
+            "tribe_resources": self.tribe_resources,
+            "tribe_tiers": {tribe: kb.tier for tribe, kb in self.tribe_knowledge.items()},
+            "tribal_taboos": self.tribal_taboos,
+            "buildings": self.buildings,
+            "farms": self.farms.entries(),
+            "wolves": self.wolves,
+            "cave_paintings": self.cave_paintings,
+            "explored": self.explored,
+            "last_reveal": self._last_reveal,
+            "camera": (self.camera.offset_x, self.camera.offset_y, self.camera.scale),
+        }
+
+    def _restore_state(self, state, chronicle):
+        self.rng = random.Random()
+        self.rng.setstate(state["rng"])
+        self.seed = state["seed"]
+        streams_seed, stream_states = state["streams"]
+        self.streams = RandomStreams(streams_seed)
+        self.streams.setstate(stream_states)
+        self.tick = state["tick"]
+        self.replay = None
+        self.profiler = None
+        (self.time_minutes, self.total_minutes, self.day_count,
+         self.light_level, self.is_night, self.is_raining, self.temperature) = state["clock"]
+        self.world_version = state["world_version"]
+        self._init_caches()
+        self._populated_chunks = set(state["world"][3])
+        self.active_chunks = state["active_chunks"]
+        self._parked_chunks = state["parked_chunks"]
+        self.season_phase = state["season_phase"]
+        self.world.overlay = SEASON_OVERLAYS[self.season_phase]
+        self._chunk_windows = self.world.group_windows(self.active_chunks)
+        self.view_bounds = None
+        self.items = ItemIndex(on_remove=self._on_item_removed)
+        for pos, item in state["items"]:
+            self.items[pos] = item
+        self.apple_regrowth = RegrowthScheduler()
+        for due, pos in state["apple_regrowth"]:
+            self.apple_regrowth.schedule(pos, due)
+
+        backend = state["population_backend"]
+        self.population = PopulationStore(backend) if backend else None
+        self.humans = []
+        for values in state["humans"]:
+            # Bypass __init__ so rebuilding agents draws nothing from the RNGs.
+            h = object.__new__(PooledHuman if self.population is not None else Human)
+            if self.population is not None:
+                h._store = self.population
+                h._row = self.population.add(**{name: values[name] for name in PopulationStore.FIELDS})
+            for name, value in values.items():
+                setattr(h, name, value)
+            h.is_thinking = False
+            self.humans.append(h)
+        by_id = {h.id: h for h in self.humans}
+        self.selected = by_id[state["selected"]]
+        self.human_index = SpatialHash(cell_size=4)
+        for _, ids in state["human_index"]:
+            for hid in ids:
+                self.human_index.move(by_id[hid], by_id[hid].x, by_id[hid].y)
+
+        self.migration_targets = state["migration_targets"]
+        self.next_human_id = state["next_human_id"]
+        self.fires = state["fires"]
+        self.log_events = deque(state["log_events"], maxlen=8)
+        self.first_spear_logged = state["first_spear_logged"]
+        self.tribe_resources = state["tribe_resources"]
+        self.tribe_knowledge = {}
+        for tribe, tier in state["tribe_tiers"].items():
+            self.tribe_knowledge[tribe] = KnowledgeBase()
+            self.tribe_knowledge[tribe].tier = tier
+        self.tribal_taboos = state["tribal_taboos"]
+        self.planner = BuildingPlanner(self.streams["planner"])
+        self.chronicle = chronicle
+        self.buildings = state["buildings"]
+        self.farms = RegrowthScheduler()
+        for due, pos in state["farms"]:
+            self.farms.schedule(pos, due)
+        self.wolves = state["wolves"]
+        self.cave_paintings = state["cave_paintings"]
+        self.explored = state["explored"]
+        self._last_reveal = state["last_reveal"]
+        offset_x, offset_y, scale = state["camera"]
+        self.camera = Camera(offset_x=offset_x, offset_y=offset_y, scale=scale)
+        self.thought_results = ResultChannel()
+
+    def close(self):
+        """Flush the chronicle and finish any replay being recorded."""
+        if self.chronicle is not None:
+            self.chronicle.close()
+        if self.replay is not None and not self.replay.replaying:
+            self.replay.close()
+
+    def _new_human(self, id, x, y, tribe_id):
+        if self.population is not None:
+            return PooledHuman(self.population, id, x, y, tribe_id, rng=self.streams["agents"])
+        return Human(id, x, y, tribe_id, rng=self.streams["agents"])
+
+    def add_human(self, x, y, tribe_id):
+        """Spawn a new agent at ``(x, y)`` and register it with the simulation."""
+        h = self._new_human(self.next_human_id, x, y, tribe_id)
+        self.next_human_id += 1
+        self.humans.append(h)
+        self.human_index.move(h, h.x, h.y)
+        return h
+
+    @property
+    def year(self):
+        return self.day_count // 365
+
     def log_event(self, text):
         stamp_hour = int(self.time_minutes // 60) % 24
         stamp_min = int(self.time_minutes % 60)
@@ -251,141 +671,424 @@ class Simulation:
         elif was_raining:
             self.log_event("The rain stops; embers fade.")
 
-    def _update_apple_regrowth(self, dt_minutes):
-        to_restore = []
-        for pos in list(self.apple_regrowth.keys()):
-            self.apple_regrowth[pos] += dt_minutes
-            if self.apple_regrowth[pos] >= 3 * 24 * 60:
-                to_restore.append(pos)
-
-        for pos in to_restore:
-            self.apple_regrowth.pop(pos, None)
-            self.items[pos] = "🍎"
-            self.log_event("An apple tree bears fruit again.")
+    def _on_item_removed(self, pos, item):
+        # A bare tree starts growing a new apple as soon as it is emptied.
+        x, y = pos
+        if self.world.get(x, y) == 1:
+            self.apple_regrowth.schedule(pos, self.total_minutes + APPLE_REGROWTH_MINUTES)
+
+    def _update_apple_regrowth(self):
+        for pos in self.apple_regrowth.pop_due(self.total_minutes):
+            x, y = pos
+            items = self._items_holding(pos)
+            if self.world.get(x, y) == 1 and pos not in items:
+                items[pos] = "🍎"
+                self.log_event("An apple tree bears fruit again.")
+
+    def _grow_farms(self):
+        for pos in self.farms.pop_due(self.total_minutes):
+            self._items_holding(pos)[pos] = "🍎"
+            self.farms.schedule(pos, self.total_minutes + FARM_GROWTH_MINUTES)
 
     def _advance_time(self, dt_seconds):
         dt_minutes = dt_seconds * 1  # 1 real second = 1 in-game minute
         self.total_minutes += dt_minutes
         self.time_minutes += dt_minutes
+        days = self.day_count
         while self.time_minutes >= 24 * 60:
             self.time_minutes -= 24 * 60
             self.day_count += 1
             self._roll_weather()
-        for y in range(MAP_H):
-            for x in range(MAP_W):
-                pos = (x, y)
-                if self.world[y][x] == 1 and pos not in self.items and pos not in self.apple_regrowth:
-                    self.apple_regrowth[pos] = 0
+        if self.day_count != days:
+            self.apply_seasonal_changes()
         self.light_level = self._compute_light_level()
         self.temperature = 26 if not self.is_night else 10
         if self.is_raining:
             self.temperature -= 3
-        self._update_apple_regrowth(dt_minutes)
-
-    def _is_sheltered(self, h):
-        return self.world[h.y][h.x] == 1
+        self._update_apple_regrowth()
+        self._grow_farms()
 
     def _near_fire(self, h):
-        for fx, fy in self.fires:
-            if abs(fx - h.x) <= 2 and abs(fy - h.y) <= 2:
-                return True
-        return False
+        return near_fire(self.fires, h.x, h.y)
+
+    def reveal_area(self, h):
+        vision = self._vision_range(h)
+        key = (h.x, h.y, vision)
+        if self._last_reveal.get(h.id) == key:
+            return
+        self._last_reveal[h.id] = key
+        for y in range(h.y - vision, h.y + vision + 1):
+            for x in range(h.x - vision, h.x + vision + 1):
+                self.explored.add((x, y))
+
+    def handle_dialogue(self, speaker, listener):
+        # Remember each stranger once per day rather than on every tick of a fight.
+        entry = f"Clashed with {listener.name}"
+        if entry not in speaker.day_log:
+            speaker.log_event(entry)
 
     def _vision_range(self, h):
-        if self._near_fire(h):
-            return 4
-        return 4 if not self.is_night else 2
-
-    def _find_nearest_tile(self, h, tile_type, max_dist):
-        best = None
-        for dy in range(-max_dist, max_dist+1):
-            for dx in range(-max_dist, max_dist+1):
-                tx, ty = h.x + dx, h.y + dy
-                if 0 <= tx < MAP_W and 0 <= ty < MAP_H:
-                    if abs(dx) + abs(dy) > max_dist:
-                        continue
-                    if self.world[ty][tx] == tile_type:
-                        if best is None or abs(dx) + abs(dy) < abs(best[0]-h.x) + abs(best[1]-h.y):
-                            best = (tx, ty)
-        return best
+        return vision_range(self.is_night, self._near_fire(h))
 
     def _find_nearest_item(self, h, item, max_dist):
-        best = None
-        for (ix, iy), itm in self.items.items():
-            if itm != item:
-                continue
-            dist = abs(ix - h.x) + abs(iy - h.y)
-            if dist <= max_dist:
-                if best is None or dist < abs(best[0]-h.x) + abs(best[1]-h.y):
-                    best = (ix, iy)
-        return best
-
-    def _step_toward(self, h, target, purposeful=False):
-        tx, ty = target
-        dx = 0 if tx == h.x else (1 if tx > h.x else -1)
-        dy = 0 if ty == h.y else (1 if ty > h.y else -1)
-        nx, ny = h.x + dx, h.y + dy
-        if 0 <= nx < MAP_W and 0 <= ny < MAP_H:
-            if self.world[ny][nx] == 3 and not purposeful:
-                return
-            h.x, h.y = nx, ny
-            if self.world[ny][nx] == 3:
-                h.move_cooldown = max(h.move_cooldown, 0.75)
+        return self.items.nearest(item, h.x, h.y, max_dist)
+
+    def set_tile(self, x, y, tile):
+        """Write a world tile and invalidate the resource distance fields."""
+        self.world.set(x, y, tile)
+
+    def _on_tile_written(self, x, y):
+        # Every write lands here, including direct ``world[y][x] = t`` assignments.
+        self.world_version += 1
+        self._tile_changes.append((self.world_version, x, y))
+
+    def changed_tiles_since(self, version):
+        """Tiles written since ``version``, or None if a bulk change needs a full redraw."""
+        changed = [(x, y) for v, x, y in self._tile_changes if v > version]
+        if len(changed) != self.world_version - version:
+            return None
+        return changed
+
+    # ==========================================
+    # ACTIVE CHUNKS
+    # ==========================================
+    def _wanted_chunks(self):
+        wanted = set()
+        for h in self.humans:
+            if h.alive:
+                wanted.update(self.world.chunks_in(h.x - ACTIVE_MARGIN, h.y - ACTIVE_MARGIN,
+                                                   h.x + ACTIVE_MARGIN + 1, h.y + ACTIVE_MARGIN + 1))
+        if self.view_bounds is not None:
+            wanted.update(self.world.chunks_in(*self.view_bounds))
+        return wanted
+
+    def update_active_chunks(self):
+        """Activate the chunks near living agents or in view; release the rest.
+
+        A chunk gets its items the first time it becomes active. Each connected
+        group of active chunks shares one tile window for distance fields.
+        """
+        wanted = self._wanted_chunks()
+        if wanted == self.active_chunks:
+            return
+        for key in sorted(self.active_chunks - wanted):
+            self._park_chunk(key)
+        for key in sorted(wanted - self.active_chunks):
+            self._unpark_chunk(key)
+        self.world.release(set(self.world.resident()) - wanted)
+        self.active_chunks = wanted
+        self._chunk_windows = self.world.group_windows(wanted)
+        windows = set(self._chunk_windows.values())
+        self._resource_fields = {k: v for k, v in self._resource_fields.items() if k[1] in windows}
+        self._window_tiles = {k: v for k, v in self._window_tiles.items() if k in windows}
+
+    def _generated_items(self, key):
+        x0, y0, x1, y1 = self.world.chunk_bounds(key)
+        return {
+            (x0 + i % CHUNK_SIZE, y0 + i // CHUNK_SIZE): CHUNK_ITEMS[t]
+            for i, t in enumerate(self.world.region(x0, y0, x1, y1, base=True)) if t in CHUNK_ITEMS
+        }
+
+    def _park_chunk(self, key):
+        """Move an inactive chunk's items and fog out of the live indexes.
+
+        A chunk that still looks freshly generated is forgotten instead and
+        will be populated again on its next visit.
+        """
+        if key not in self._populated_chunks:
+            return
+        self._populated_chunks.discard(key)
+        x0, y0, x1, y1 = self.world.chunk_bounds(key)
+        items = dict(self.items.take_rect(x0, y0, x1, y1))
+        explored = 0
+        for i in range(CHUNK_SIZE * CHUNK_SIZE):
+            pos = (x0 + i % CHUNK_SIZE, y0 + i // CHUNK_SIZE)
+            if pos in self.explored:
+                self.explored.discard(pos)
+                explored |= 1 << i
+        if explored or items != self._generated_items(key):
+            self._parked_chunks[key] = (items, explored)
+
+    def _unpark_chunk(self, key):
+        parked = self._parked_chunks.pop(key, None)
+        if parked is None:
+            self._populate_chunk(key)
+            return
+        self._populated_chunks.add(key)
+        items, explored = parked
+        x0, y0 = key[0] * CHUNK_SIZE, key[1] * CHUNK_SIZE
+        for pos, item in items.items():
+            if pos not in self.items:
+                self.items[pos] = item
+        for i in range(CHUNK_SIZE * CHUNK_SIZE):
+            if explored >> i & 1:
+                self.explored.add((x0 + i % CHUNK_SIZE, y0 + i // CHUNK_SIZE))
+
+    def item_at(self, pos):
+        """Item lying at ``pos``, looking into parked chunks too; None if empty."""
+        return self._items_holding(pos).get(pos)
+
+    def human_at(self, x, y):
+        """Living human standing on tile ``(x, y)`` (the one drawn on top), or None."""
+        here = [h for h in self.human_index.in_rect(x, y, x + 1, y + 1) if h.alive]
+        return max(here, key=lambda h: h.id, default=None)
+
+    def all_items(self):
+        """Every item in the world, live or parked, by position."""
+        found = dict(self.items.items())
+        for items, _ in self._parked_chunks.values():
+            found.update(items)
+        return dict(sorted(found.items()))
+
+    def _items_holding(self, pos):
+        """The live item index, or the parked items when ``pos``'s chunk is inactive.
+
+        A chunk that was never visited is parked on first write, starting from
+        its generated items, so inactive chunks never hold live items.
+        """
+        key = self.world.chunk_of(*pos)
+        if key in self.active_chunks:
+            return self.items
+        parked = self._parked_chunks.get(key)
+        if parked is None:
+            parked = self._parked_chunks[key] = (self._generated_items(key), 0)
+        return parked[0]
+
+    def _populate_chunk(self, key):
+        self._populated_chunks.add(key)
+        for pos, item in self._generated_items(key).items():
+            if pos not in self.items:
+                self.items[pos] = item
+
+    def _window_at(self, x, y):
+        key = self.world.chunk_of(x, y)
+        window = self._chunk_windows.get(key)
+        if window is None:
+            # Agents teleported since the last tick; catch the active set up.
+            self.update_active_chunks()
+            window = self._chunk_windows.get(key) or self.world.chunk_bounds(key)
+        return window
+
+    def _tiles_in(self, window):
+        """Tile bytes and passable mask of ``window``, cached per world version."""
+        cached = self._window_tiles.get(window)
+        if cached is None or cached[0] != self.world_version:
+            tiles = self.world.region(*window)
+            cached = self._window_tiles[window] = (self.world_version, tiles, bytearray(tiles.translate(PASSABLE)))
+        return cached[1], cached[2]
+
+    def _field_sources(self, kind, window, rect=None):
+        """Sources of ``kind`` in ``rect``, a part of ``window`` (all of it by default)."""
+        x0, y0, x1, y1 = rect or window
+        if kind in ("water", "hut"):
+            target = 3 if kind == "water" else 4
+            width = x1 - x0
+            tiles = self.world.region(x0, y0, x1, y1) if rect else self._tiles_in(window)[0]
+            return [(x0 + i % width, y0 + i // width) for i, t in enumerate(tiles) if t == target]
+        if kind == "apple":
+            return [pos for pos, item in self.items.in_rect(x0, y0, x1, y1) if item == "🍎"]
+        if kind == "fire":
+            fires = {(x, y) for x, y in self.fires if x0 <= x < x1 and y0 <= y < y1}
+            return fires | {pos for pos, item in self.items.in_rect(x0, y0, x1, y1) if item == "🔥"}
+        raise ValueError(f"Unknown resource field: {kind}")
+
+    def _field_changes(self, kind, world_version, item_version, fires):
+        """Positions that may have changed ``kind``'s field, or None if unknown."""
+        changed = self.changed_tiles_since(world_version)
+        item = FIELD_ITEMS.get(kind)
+        if changed is None or item is None:
+            return changed
+        moved = self.items.changes_since(item, item_version)
+        if moved is None:
+            return None
+        changed.extend(moved)
+        if kind == "fire" and fires != self.fires:
+            changed.extend(fires ^ self.fires)
+        return changed
+
+    def resource_field(self, kind, pos=(0, 0)):
+        """BFS distance field toward water, apples, fires or huts.
+
+        The field covers the window of active chunks containing ``pos`` and is
+        shared by every agent in it. When tiles, items or fires change, only
+        the part of the field within ``FIELD_RANGE`` of each change is
+        searched again; the whole window is rebuilt only for bulk changes.
+        """
+        window = self._window_at(*pos)
+        item = FIELD_ITEMS.get(kind)
+        item_version = self.items.version(item) if item else 0
+        cached = self._resource_fields.get((kind, window))
+        if cached is not None and cached[0] == self.world_version and cached[1] == item_version \
+                and (kind != "fire" or cached[2] == self.fires):
+            return cached[3]
+        x0, y0, x1, y1 = window
+        # Water is a destination, not something to walk through on the way elsewhere.
+        passable = None if kind == "water" else self._tiles_in(window)[1]
+        changed = None if cached is None else self._field_changes(kind, *cached[:3])
+        if changed is not None:
+            reach = FIELD_RANGE
+            changed = [(x, y) for x, y in changed
+                       if x0 - reach <= x < x1 + reach and y0 - reach <= y < y1 + reach]
+            if len(changed) * (2 * reach + 1) ** 2 > (x1 - x0) * (y1 - y0):
+                changed = None
+        if changed is None:
+            if self.profiler is not None:
+                self.profiler.count("field_rebuilds" if cached else "field_builds")
+            field = cached[3] if cached else DistanceField(x1 - x0, y1 - y0, origin=(x0, y0))
+            field.rebuild(self._field_sources(kind, window), passable, FIELD_RANGE)
+        else:
+            field = cached[3]
+            if changed:
+                if self.profiler is not None:
+                    self.profiler.count("field_refreshes")
+                rect = (max(x0, min(x for x, _ in changed) - reach),
+                        max(y0, min(y for _, y in changed) - reach),
+                        min(x1, max(x for x, _ in changed) + reach + 1),
+                        min(y1, max(y for _, y in changed) + reach + 1))
+                field.refresh(changed, self._field_sources(kind, window, rect), passable)
+        fires = set(self.fires) if kind == "fire" else None
+        self._resource_fields[(kind, window)] = (self.world_version, item_version, fires, field)
+        return field
+
+    def _seek(self, h, kind, max_dist):
+        if self.profiler is not None:
+            self.profiler.count("path_queries")
+        nxt = seek_step(self.resource_field(kind, (h.x, h.y)), h.x, h.y, max_dist)
+        if nxt is None:
+            return False
+        if nxt != (h.x, h.y):
+            self._move_human(h, *nxt)
+            if self.world.get(*nxt) == TILE_WATER:
+                h.move_cooldown = max(h.move_cooldown, WADE_COOLDOWN)
+        return True
+
+    def _sync_human_index(self):
+        # Picks up deaths and positions assigned outside _move_human.
+        for h in self.humans:
+            if h.alive:
+                self.human_index.move(h, h.x, h.y)
+            else:
+                self.human_index.remove(h)
+
+    def _move_human(self, h, x, y):
+        h.x, h.y = x, y
+        self.human_index.move(h, x, y)
+
+    def neighbors_within(self, h, radius, predicate=None):
+        """Other living humans within Chebyshev ``radius`` of ``h``, in id order."""
+        if self.profiler is not None:
+            self.profiler.count("neighbor_queries")
+        found = self.human_index.within(
+            h.x, h.y, radius,
+            lambda o: o is not h and o.alive and (predicate is None or predicate(o)),
+        )
+        found.sort(key=lambda o: o.id)
+        return found
+
+    def _decay_needs(self, dt_seconds):
+        energy = energy_factor(self.is_raining)
+        if self.population is not None:
+            exposed = None
+            if self.is_night:
+                store = self.population
+                ground = store.ground_under(set(self._chunk_windows.values()),
+                                            lambda window: self._tiles_in(window)[0], self.world.get)
+                exposed = store.exposure_on(self.fires, ground)
+            self.population.decay_needs(dt_seconds, energy, exposed)
+            return
+        for h in self.humans:
+            if not h.alive: continue
+            exposed = self.is_night and is_exposed(self._near_fire(h), self.world.get(h.x, h.y))
+            decay_needs(h, dt_seconds, energy, exposed)
+
+    def think(self, h, situation, priority=PRIORITY_DISCOVERY):
+        if h.is_thinking: return
+        if self.profiler is not None:
+            self.profiler.count("thoughts_requested")
+        if self.replay is not None and self.replay.replaying:
+            self.replay.replay_think(self, h, situation)
+            return
+        h.trigger_thinking(situation, self.thought_results, priority=priority)
+        if self.replay is not None:
+            self.replay.record_think(self, h, situation)
+
+    def apply_thought_results(self):
+        """Apply every System 2 reply that arrived since the last tick, in arrival order.
+
+        While replaying, the replies come from the replay log instead.
+        """
+        if self.replay is not None and self.replay.replaying:
+            results = self.replay.due_results(self)
+        else:
+            results = self.thought_results.drain()
+        for result in results:
+            if self.replay is not None and not self.replay.replaying:
+                self.replay.record_result(self, result)
+            result.agent.apply_thought(result)
 
     def update(self, dt_seconds=1.0):
+        if self.replay is not None and not self.replay.replaying:
+            self.replay.record_tick(self, dt_seconds)
+        prof = self.profiler
+        lap = None
+        if prof is not None:
+            prof.begin_tick()
+            lap = prof.lap
+        # System 2 replies land at one fixed point, before any agent acts this tick.
+        self.apply_thought_results()
+        if lap: lap("thoughts")
         self._advance_time(dt_seconds)
+        if lap: lap("time")
+        # Needs decay for the whole population first, then per-agent behaviour.
+        self._decay_needs(dt_seconds)
+        if lap: lap("needs")
+        self._sync_human_index()
+        self.update_active_chunks()
+        if lap: lap("index")
+        agents = 0
         for h in self.humans:
             if not h.alive: continue
-            if h.move_cooldown > 0:
-                h.move_cooldown = max(0.0, h.move_cooldown - dt_seconds)
-
-            energy_factor = 1.3 if self.is_raining else 1.0
-            h.hunger += 0.75 * dt_seconds * energy_factor
-            h.thirst += 0.6 * dt_seconds * energy_factor
-            if h.hunger > 100: h.hp -= 0.5 * dt_seconds
-            if h.thirst > 100: h.hp -= 0.6 * dt_seconds
-            if self.is_night and not (self._near_fire(h) or self._is_sheltered(h)):
-                h.hp -= 0.25 * dt_seconds
-            if h.hp <= 0: h.alive = False
+            agents += 1
 
             # Discovery of fire while contemplating.
-            if h.is_thinking and h.inventory.count("🦴") >= 2 and random.random() < 0.05:
+            if h.is_thinking and h.inventory.count("🦴") >= 2 and self.streams["fire"].random() < 0.05:
                 self.items[(h.x, h.y)] = "🔥"
 
             # System 1: Cook meat if near fire.
-            if "Corpse" in h.inventory and self._near_fire(h.x, h.y):
+            if "Corpse" in h.inventory and self._near_fire(h):
                 h.inventory.remove("Corpse")
                 h.inventory.append("Cooked Meat")
                 h.hunger = 0
+            if lap: lap("discovery")
 
             # System 1: Pickup
             item = self.items.get((h.x, h.y))
             if item:
-                if item == "🍎":
-                    h.hunger = 0
-                    self.apple_regrowth[(h.x, h.y)] = 0
-                else:
-                    h.inventory.append(item)
-                    h.trigger_thinking(f"I picked up a {item}.")
-                    self.items.pop((h.x, h.y))
+                take_item(h, item)
+                if item != "🍎":
+                    self.think(h, f"I picked up a {item}.")
+                self.items.pop((h.x, h.y))
+            if lap: lap("pickup")
 
             # Hut building using sticks
-            if h.inventory.count("🥢") >= 3 and self.world[h.y][h.x] != 4:
-                for _ in range(3):
-                    h.inventory.remove("🥢")
-                self.world[h.y][h.x] = 4
+            if build_hut(h, self.world.get(h.x, h.y)):
+                self.set_tile(h.x, h.y, 4)
+            if lap: lap("huts")
 
             # Ranged stone toss
-            for other in self.humans:
-                if other.alive and other.tribe_id != h.tribe_id:
-                    dx, dy = abs(h.x-other.x), abs(h.y-other.y)
-                    if max(dx, dy) == 2 and "🦴" in h.inventory:
-                        h.inventory.remove("🦴")
-                        other.hp -= 5
-                        h.trigger_thinking("I hurled a stone at a foe!")
-
-            if self.world[h.y][h.x] == 3 and h.thirst > 0:
-                h.thirst = 0
+            if "🦴" in h.inventory:
+                foes = self.neighbors_within(
+                    h, 2, lambda o: o.tribe_id != h.tribe_id and max(abs(h.x-o.x), abs(h.y-o.y)) == 2
+                )
+                for other in foes:
+                    if "🦴" not in h.inventory:
+                        break
+                    h.inventory.remove("🦴")
+                    other.hp -= 5
+                    self.think(h, "I hurled a stone at a foe!", priority=PRIORITY_COMBAT)
+            if lap: lap("stone_toss")
+
+            drink(h, self.world.get(h.x, h.y))
 
             # Trigger knowledge checks
             resource_flags = {
@@ -396,6 +1099,7 @@ class Simulation:
                 "agriculture": len(self.farms) > 0,
             }
             self.tribe_knowledge[h.tribe_id].evaluate_progress(resource_flags)
+            if lap: lap("knowledge")
 
             # Construction logic
             tribe_res = self.tribe_resources[h.tribe_id]
@@ -403,63 +1107,53 @@ class Simulation:
                 try:
                     build = self.planner.choose_build(tribe_res, self.tribe_knowledge[h.tribe_id].tier)
                     self.buildings.append({"type": build.type, "pos": (h.x, h.y), "tribe": h.tribe_id})
-                    self.chronicle.log_event(self.year, f"Tribe {h.tribe_id} built a {build.type} at {h.x},{h.y}")
+                    if self.chronicle:
+                        self.chronicle.log_event(self.year, f"Tribe {h.tribe_id} built a {build.type} at {h.x},{h.y}")
                 except ValueError:
                     pass
+            if lap: lap("construction")
 
             # Agriculture
             if self.tribe_knowledge[h.tribe_id].tier >= 3 and (h.x, h.y) not in self.farms:
-                if random.random() > 0.95:
-                    self.farms[(h.x, h.y)] = pygame.time.get_ticks() + 5000
-                    self.chronicle.log_event(self.year, f"Farm plot started at {h.x},{h.y}")
-
-            # Farm harvest
-            ready_farms = [pos for pos, t in list(self.farms.items()) if pygame.time.get_ticks() >= t]
-            for pos in ready_farms:
-                self.items[pos] = "🍎"
-                self.farms[pos] = pygame.time.get_ticks() + 5000
+                if self.streams["farming"].random() > 0.95:
+                    self.farms.schedule((h.x, h.y), self.total_minutes + FARM_GROWTH_MINUTES)
+                    if self.chronicle:
+                        self.chronicle.log_event(self.year, f"Farm plot started at {h.x},{h.y}")
+            if lap: lap("agriculture")
 
             # Discovery & Fog
             self.reveal_area(h)
+            if lap: lap("fog")
 
             # System 2: Diplomacy & Combat
-            for other in self.humans:
-                if other.alive and other.tribe_id != h.tribe_id:
-                    if abs(h.x-other.x) < 2 and abs(h.y-other.y) < 2:
-                        self.handle_dialogue(h, other)
-                        other.hp -= (h.attack_power / 10)
-                        h.use_spear()
-                        h.trigger_thinking("Combat with a stranger!")
+            for other in self.neighbors_within(h, 1, lambda o: o.tribe_id != h.tribe_id):
+                self.handle_dialogue(h, other)
+                other.hp -= melee_damage(h)
+                h.use_spear()
+                self.think(h, "Combat with a stranger!", priority=PRIORITY_COMBAT)
+            if lap: lap("combat")
 
             vision = self._vision_range(h)
             moved = False
             if h.move_cooldown <= 0:
-                if h.thirst >= 70:
-                    target = self._find_nearest_tile(h, 3, vision)
-                    if target:
-                        self._step_toward(h, target, purposeful=True)
-                        moved = True
-                elif h.hunger >= 70:
-                    target = self._find_nearest_item(h, "🍎", vision)
-                    if target:
-                        self._step_toward(h, target, purposeful=True)
-                        moved = True
-
-                if self.world[h.y][h.x] == 3 and h.thirst < 70:
+                need = seek_need(h)
+                if need is not None:
+                    moved = self._seek(h, need, vision)
+
+                # Wading agents that are not thirsty stay put.
+                if self.world.get(h.x, h.y) == 3 and need != "water":
                     moved = True
 
                 # Movement Logic (Random but restricted when thinking)
-                if not moved and not h.is_thinking and self.rng.random() > 0.6:
-                    nx = max(0, min(MAP_W-1, h.x + self.rng.randint(-1, 1)))
-                    ny = max(0, min(MAP_H-1, h.y + self.rng.randint(-1, 1)))
-                    if self.world[ny][nx] != 3:
-                        h.x, h.y = nx, ny
-                    elif self.world[ny][nx] == 3 and self.rng.random() > 0.5:
-                        h.x, h.y = nx, ny
-                        h.move_cooldown = max(h.move_cooldown, 0.75)
-
-            if self.world[h.y][h.x] == 3 and h.thirst > 0:
-                h.thirst = 0
+                if not moved and not h.is_thinking:
+                    step = wander(self.rng, h.x, h.y, self.world.get)
+                    if step is not None:
+                        self._move_human(h, step[0], step[1])
+                        if step[2]:
+                            h.move_cooldown = max(h.move_cooldown, WADE_COOLDOWN)
+
+            drink(h, self.world.get(h.x, h.y))
+            if lap: lap("movement")
 
         if not self.first_spear_logged and any("SPEAR" in h.tools for h in self.humans):
             self.first_spear_logged = True
@@ -467,10 +1161,21 @@ class Simulation:
 
             self.apply_status_effects(h)
             self.try_cave_art(h)
-            self.try_domestication(h)
+
+        # Only humans standing next to a wild wolf can tame it.
+        for wx, wy, tame in list(self.wolves):
+            if tame:
+                continue
+            for human in self.human_index.within(wx, wy, 1, lambda o: o.alive):
+                self.try_domestication(human)
 
         for idx, (wx, wy, tame) in enumerate(self.wolves):
             self.wolves[idx] = self.update_wolf(wx, wy, tame)
+        self.tick += 1
+        if prof is not None:
+            prof.lap("wolves")
+            prof.count("agents", agents)
+            prof.end_tick()
 
     # ==========================================
     # STATUS EFFECTS & MEDICINE
@@ -492,7 +1197,7 @@ class Simulation:
     # CAVE ART & CULTURAL MEMORY
     # ==========================================
     def try_cave_art(self, human: Human):
-        if self.world[human.y][human.x] != 4:
+        if self.world.get(human.x, human.y) != 4:
             return None
         if "🖌️" not in human.inventory or not human.knowledge:
             return None
@@ -514,19 +1219,16 @@ class Simulation:
     # SEASONS & MIGRATION PRESSURE
     # ==========================================
     def apply_seasonal_changes(self):
-        season_phase = (self.day_count // SEASON_LENGTH_DAYS) % 2
-        if season_phase == 1:  # Winter
-            for y in range(MAP_H):
-                for x in range(MAP_W):
-                    if self.world[y][x] == 0:
-                        self.world[y][x] = 5  # snow
-                    elif self.world[y][x] == 3:
-                        self.world[y][x] = 5
-        else:
-            for y in range(MAP_H):
-                for x in range(MAP_W):
-                    if self.world[y][x] == 5:
-                        self.world[y][x] = 0
+        """Switch the terrain overlay to the current season.
+
+        The stored terrain is never rewritten, so water is still water after
+        winter; flipping is O(1) and only invalidates tile-derived caches.
+        """
+        phase = (self.day_count // SEASON_LENGTH_DAYS) % 2
+        if phase != self.season_phase:
+            self.season_phase = phase
+            self.world.overlay = SEASON_OVERLAYS[phase]
+            self.world_version += 1
 
     # ==========================================
     # DREAMING CYCLE
@@ -555,37 +1257,52 @@ class Simulation:
 
     def update_wolf(self, x, y, tame):
         if tame and self.humans:
-            leader = min((h for h in self.humans if h.alive), key=lambda h: abs(h.x - x) + abs(h.y - y), default=None)
+            leader = self.human_index.nearest(x, y, lambda h: h.alive, tie_key=lambda h: h.id)
             if leader:
                 dx = 1 if leader.x > x else -1 if leader.x < x else 0
                 dy = 1 if leader.y > y else -1 if leader.y < y else 0
                 return (x + dx, y + dy, True)
         else:
-            x = max(0, min(MAP_W-1, x + random.randint(-1,1)))
-            y = max(0, min(MAP_H-1, y + random.randint(-1,1)))
+            wander = self.streams["wolves"]
+            x += wander.randint(-1,1)
+            y += wander.randint(-1,1)
         return (x, y, tame)
 
-def main():
+def main(replay_log=None, chronicle_path=None):
+    """Run the interactive game; ``replay_log`` records the session for headless replay.
+
+    ``chronicle_path`` appends the tribes' history to a JSON Lines chronicle.
+    """
     pygame.init()
     screen = pygame.display.set_mode((SCREEN_W, SCREEN_H))
     pygame.display.set_caption("Early Human AI Evolution")
-    sim = Simulation()
+    sim = Simulation(chronicle=MemoryChronicle(chronicle_path) if chronicle_path else None)
+    if replay_log:
+        sim.replay = ReplayRecorder(replay_log, sim)
     clock = pygame.time.Clock()
+    terrain = TerrainLayer()
+    shade_surface = pygame.Surface((MAP_W*TILE_SIZE, MAP_H*TILE_SIZE), pygame.SRCALPHA)
+    shade_alpha = None
+    rain_surface = build_rain_surface()
     font = pygame.font.SysFont("Verdana", 14)
     bold = pygame.font.SysFont("Verdana", 16, bold=True)
 
     while True:
         dt_seconds = clock.tick(FPS) / 1000.0
         for event in pygame.event.get():
-            if event.type == pygame.QUIT: pygame.quit(); sys.exit()
+            if event.type == pygame.QUIT:
+                sim.close()
+                pygame.quit(); sys.exit()
             if event.type == pygame.MOUSEBUTTONDOWN:
                 mx, my = pygame.mouse.get_pos()
-                if my < MAP_H * TILE_SIZE:
-                    for h in sim.humans:
-                        if abs(h.x*TILE_SIZE - mx) < TILE_SIZE and abs(h.y*TILE_SIZE - my) < TILE_SIZE:
-                            sim.selected = h
+                if mx < MAP_W * TILE_SIZE and my < MAP_H * TILE_SIZE:
+                    picked = sim.human_at(*sim.camera.screen_to_world(mx, my))
+                    if picked is not None:
+                        sim.selected = picked
             if event.type == pygame.KEYDOWN and event.key == pygame.K_t:
-                sim.selected.trigger_thinking("A god speaks from the clouds.")
+                sim.think(sim.selected, "A god speaks from the clouds.", priority=PRIORITY_SOCIAL)
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                sim.profiler = None if sim.profiler is not None else TickProfiler()
             if event.type == pygame.MOUSEWHEEL:
                 pivot = pygame.mouse.get_pos()
                 factor = 1.1 if event.y > 0 else 0.9
@@ -596,44 +1313,50 @@ def main():
         if keys[pygame.K_UP]: sim.camera.pan(0, -10)
         if keys[pygame.K_DOWN]: sim.camera.pan(0, 10)
 
+        view = sim.camera.visible_tile_bounds(MAP_W*TILE_SIZE, MAP_H*TILE_SIZE)
+        sim.view_bounds = view
         sim.update(dt_seconds)
         screen.fill(BLACK)
 
-        # 1. Draw Map with viewport centered on selected human
-        offset = (sim.selected.x - MAP_W//2, sim.selected.y - MAP_H//2)
-        for y in range(MAP_H):
-            for x in range(MAP_W): draw_world_tile(screen, x, y, sim.world[y][x])
+        # 1. Draw Map from the cached terrain layer
+        screen.blit(terrain.render(sim, sim.camera), (0, 0))
+        terrain.draw_animated(screen)
 
-        # 2. Draw Items
-        for (x,y), item in sim.items.items():
-            ix, iy = sim.camera.world_to_screen(x, y)
+        # 2. Draw Items (only those the camera can see)
+        visible_items = sim.items.in_rect(*view)
+        item_xs, item_ys = sim.camera.world_to_screen_many(
+            [pos[0] for pos, _ in visible_items], [pos[1] for pos, _ in visible_items])
+        for (_, item), ix, iy in zip(visible_items, item_xs, item_ys):
             color = RED if item == "🍎" else WHITE if item == "🦴" else BROWN
             pygame.draw.circle(screen, color, (ix, iy - ISO_TILE_H / 2), 6)
 
-        # 3. Draw Fires
-        for fx, fy in sim.fires:
-            cx, cy = fx*TILE_SIZE+TILE_SIZE//2, fy*TILE_SIZE+TILE_SIZE//2
+        # 3. Draw Fires (only those the camera can see)
+        vx0, vy0, vx1, vy1 = view
+        visible_fires = [(fx, fy) for fx, fy in sim.fires if vx0 <= fx < vx1 and vy0 <= fy < vy1]
+        fire_xs, fire_ys = sim.camera.world_to_screen_many(
+            [fx for fx, _ in visible_fires], [fy for _, fy in visible_fires])
+        for cx, cy in zip(fire_xs, fire_ys):
             pygame.draw.circle(screen, (255, 140, 0), (cx, cy-4), 6)
             pygame.draw.circle(screen, (255, 215, 0), (cx, cy+2), 4)
 
         # 4. Draw Humans
-        for h in sim.humans:
-            if not h.alive: continue
+        visible_humans = [h for h in sorted(sim.human_index.in_rect(*view), key=lambda h: h.id) if h.alive]
+        agent_xs, agent_ys = sim.camera.world_to_screen_many(
+            [h.x for h in visible_humans], [h.y for h in visible_humans])
+        for h, sx, sy in zip(visible_humans, agent_xs, agent_ys):
             if h == sim.selected:
-                sx, sy = sim.camera.world_to_screen(h.x, h.y)
                 pygame.draw.circle(screen, GOLD, (int(sx), int(sy)), 22, 2)
-            draw_agent(screen, h, sim.camera)
+            draw_agent(screen, h, sim.camera, screen_pos=(sx, sy))
 
-        # Night shading
-        dark_surface = pygame.Surface((MAP_W*TILE_SIZE, MAP_H*TILE_SIZE), pygame.SRCALPHA)
+        # Night shading (overlay surfaces are reused; refilled only when the light changes)
         alpha = int((1 - sim.light_level) * 180)
-        dark_surface.fill((0, 0, 0, alpha))
-        screen.blit(dark_surface, (0,0))
+        if alpha:
+            if alpha != shade_alpha:
+                shade_surface.fill((0, 0, 0, alpha))
+                shade_alpha = alpha
+            screen.blit(shade_surface, (0,0))
 
         if sim.is_raining:
-            rain_surface = pygame.Surface((MAP_W*TILE_SIZE, MAP_H*TILE_SIZE), pygame.SRCALPHA)
-            for rx in range(0, MAP_W*TILE_SIZE, 12):
-                pygame.draw.line(rain_surface, (150, 180, 255, 120), (rx, 0), (rx-8, MAP_H*TILE_SIZE), 2)
             screen.blit(rain_surface, (0,0))
 
         # 5. Draw Sidebar
@@ -663,7 +1386,8 @@ def main():
             "---",
             f"Brain Activity: {'THINKING...' if sh.is_thinking else 'Automatic'}",
             "---",
-            "Press 'T' to interact with selected human."
+            "Press 'T' to interact with selected human.",
+            "Press 'P' to toggle the tick profiler.",
         ]
 
         y_pos = 100
@@ -673,6 +1397,11 @@ def main():
             screen.blit(font.render(line, True, color), (MAP_W*TILE_SIZE+20, y_pos))
             y_pos += 35
 
+        if sim.profiler is not None:
+            for line in sim.profiler.overlay_lines(limit=6):
+                screen.blit(font.render(line, True, GOLD), (MAP_W*TILE_SIZE+20, y_pos))
+                y_pos += 18
+
         # 6. World Logger
         log_rect = (0, MAP_H*TILE_SIZE, SCREEN_W, LOG_HEIGHT)
         pygame.draw.rect(screen, (15, 12, 10), log_rect)
@@ -686,4 +1415,4 @@ def main():
         pygame.display.flip()
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,167 @@
+"""Headless fast-forward runner for the evolution simulation.
+
+Advances :class:`game.Simulation` with a fixed time step on a virtual clock,
+as fast as the CPU allows and without opening a display, so long stretches of
+evolution can be simulated overnight instead of in real time. Runs can be
+recorded to a replay log and re-executed from it without any LLM calls.
+
+Usage::
+
+    python headless.py --seed 7 --days 30 --step 1.0 --record run.jsonl
+    python headless.py --replay run.jsonl
+    python headless.py --days 5 --profile phases.csv
+    python headless.py --days 365 --chronicle history.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import game
+from profiling import TickProfiler
+from replay import ReplayPlayer, ReplayRecorder
+from simulation_core import MemoryChronicle
+
+MINUTES_PER_DAY = 24 * 60
+
+
+@dataclass
+class HeadlessReport:
+    seed: int
+    days: float
+    step: float
+    ticks: int
+    simulated_minutes: float
+    wall_seconds: float
+
+    @property
+    def minutes_per_second(self) -> float:
+        """Simulated minutes advanced per wall-clock second."""
+        return self.simulated_minutes / self.wall_seconds if self.wall_seconds > 0 else math.inf
+
+    def summary(self) -> str:
+        return (
+            f"seed={self.seed} days={self.days:g} step={self.step:g}s ticks={self.ticks} "
+            f"wall={self.wall_seconds:.2f}s throughput={self.minutes_per_second:,.0f} sim-min/s"
+        )
+
+
+def run_headless(
+    seed: int = 0,
+    days: float = 1.0,
+    step: float = 1.0,
+    sim: Optional[game.Simulation] = None,
+    on_tick: Optional[Callable[[game.Simulation, int], None]] = None,
+    record: Optional[str] = None,
+) -> HeadlessReport:
+    """Advance a simulation by ``days`` of game time using fixed ``step`` ticks.
+
+    ``step`` is the dt passed to :meth:`game.Simulation.update` (one real second
+    equals one game minute). A fresh simulation seeded with ``seed`` is created
+    unless ``sim`` is given. ``on_tick(sim, tick)`` runs after every tick.
+    ``record`` names a replay log to write the run to. The simulation's
+    chronicle, if any, is flushed and closed when the run ends.
+    """
+    if step <= 0:
+        raise ValueError("step must be positive")
+    if sim is None:
+        sim = game.Simulation(seed=seed)
+    if record is not None:
+        sim.replay = ReplayRecorder(record, sim)
+    ticks = math.ceil(days * MINUTES_PER_DAY / step)
+    start_minutes = sim.total_minutes
+    started = time.perf_counter()
+    try:
+        for tick in range(ticks):
+            sim.update(step)
+            if on_tick is not None:
+                on_tick(sim, tick)
+    finally:
+        if record is not None:
+            sim.replay.close()
+            sim.replay = None
+        if sim.chronicle is not None:
+            sim.chronicle.close()
+    wall_seconds = time.perf_counter() - started
+    return HeadlessReport(
+        seed=seed,
+        days=days,
+        step=step,
+        ticks=ticks,
+        simulated_minutes=sim.total_minutes - start_minutes,
+        wall_seconds=wall_seconds,
+    )
+
+
+def run_replay(
+    path: str,
+    on_tick: Optional[Callable[[game.Simulation, int], None]] = None,
+    profiler: Optional[TickProfiler] = None,
+    setup: Optional[Callable[[game.Simulation], None]] = None,
+) -> tuple[game.Simulation, HeadlessReport]:
+    """Re-run a recorded session from its replay log, with no System 2 calls.
+
+    ``setup(sim)`` runs on the freshly seeded simulation before the first
+    tick; pass the same function that prepared the recorded run, since the
+    log only holds what happened after recording started.
+
+    Returns the finished simulation and a report; raises
+    :class:`replay.ReplayDivergence` if the run stops matching the log.
+    """
+    player = ReplayPlayer(path)
+    sim = game.Simulation(seed=player.seed, population_backend=player.population_backend)
+    if setup is not None:
+        setup(sim)
+    sim.replay = player
+    sim.profiler = profiler
+    started = time.perf_counter()
+    for tick, dt in enumerate(player.dts):
+        for agent_id, situation in player.inputs.get(tick, ()):
+            sim.think(player.agent(sim, agent_id), situation)
+        sim.update(dt)
+        if on_tick is not None:
+            on_tick(sim, tick)
+    player.check_finished()
+    wall_seconds = time.perf_counter() - started
+    ticks = len(player.dts)
+    return sim, HeadlessReport(
+        seed=player.seed,
+        days=sim.total_minutes / MINUTES_PER_DAY,
+        step=sim.total_minutes / ticks if ticks else 0.0,
+        ticks=ticks,
+        simulated_minutes=sim.total_minutes,
+        wall_seconds=wall_seconds,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the simulation headless at maximum speed.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--days", type=float, default=1.0, help="in-game days to simulate")
+    parser.add_argument("--step", type=float, default=1.0, help="fixed dt per tick, in seconds")
+    parser.add_argument("--record", metavar="LOG", help="write a replay log of the run")
+    parser.add_argument("--replay", metavar="LOG", help="re-run a recorded replay log instead")
+    parser.add_argument("--profile", metavar="PATH", help="write per-phase timings to PATH (.json or .csv)")
+    parser.add_argument("--chronicle", metavar="PATH", help="append the run's history to a JSON Lines chronicle")
+    args = parser.parse_args(argv)
+    profiler = TickProfiler() if args.profile else None
+    if args.replay:
+        _, report = run_replay(args.replay, profiler=profiler)
+    else:
+        chronicle = MemoryChronicle(args.chronicle) if args.chronicle else None
+        sim = game.Simulation(seed=args.seed, chronicle=chronicle)
+        sim.profiler = profiler
+        report = run_headless(seed=args.seed, days=args.days, step=args.step, sim=sim, record=args.record)
+    print(report.summary())
+    if profiler is not None:
+        profiler.export(args.profile)
+        print("\n".join(profiler.overlay_lines(limit=None)))
+    return report
+
+
+if __name__ == "__main__":
+    main()
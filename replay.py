@@ -0,0 +1,166 @@
+"""Deterministic replay logs for :class:`game.Simulation`.
+
+With every random draw coming from the simulation's seeded streams, the only
+inputs a run takes from outside are the frame times passed to ``update`` and
+the System 2 replies (which arrive on worker threads at wall-clock dependent
+ticks). :class:`ReplayRecorder` writes both to a JSON Lines log;
+:class:`ReplayPlayer` feeds them back so the run can be re-executed headless,
+with no LLM calls, as fast as the CPU allows.
+
+Log records (one JSON object per line):
+
+* header: ``{"replay": 1, "seed": ..., "population_backend": ...}``
+* ``{"t": tick, "dt": dt}`` whenever the frame time changes
+* ``{"t": tick, "kind": ..., "agent": id, "situation": ...}`` for System 2,
+  where ``kind`` is ``"input"`` (a think request made between ticks, e.g.
+  by the player), ``"pending"`` (submitted), ``"skipped"`` (rejected by the
+  scheduler) or ``"result"`` (a reply applied at the start of tick ``t``);
+  results also carry ``thought``, ``speech`` and ``craft``. Logs written
+  before cached and synchronous replies went through the result channel
+  may also hold ``"inline"`` answers, applied as soon as they were asked
+* trailer: ``{"end": ticks}``
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from collections import defaultdict, deque
+from typing import Dict, List, Optional
+
+from system2 import ThoughtResult
+
+REPLAY_VERSION = 1
+
+
+class ReplayDivergence(RuntimeError):
+    """Raised when a replayed run stops matching its log."""
+
+
+def _answer(result: ThoughtResult) -> Dict[str, Optional[str]]:
+    return {"thought": result.thought, "speech": result.speech, "craft": result.craft}
+
+
+class ReplayRecorder:
+    """Appends a simulation's external inputs to ``path`` as it runs.
+
+    Attach with ``sim.replay = ReplayRecorder(path, sim)`` before the first
+    ``update`` and :meth:`close` when done. The simulation must have been
+    created with a ``seed``.
+    """
+
+    replaying = False
+
+    def __init__(self, path: str | os.PathLike[str], sim):
+        if sim.seed is None:
+            raise ValueError("Only simulations created with a seed can be recorded")
+        if sim.tick:
+            raise ValueError("Recording must start before the first update")
+        backend = sim.population.backend if sim.population is not None else None
+        self._file = open(path, "w", encoding="utf-8")
+        self._write({"replay": REPLAY_VERSION, "seed": sim.seed, "population_backend": backend})
+        self._dt: Optional[float] = None
+        self._open_tick: Optional[int] = None
+        self.ticks = 0
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def record_tick(self, sim, dt):
+        self._open_tick = sim.tick
+        self.ticks = sim.tick + 1
+        if dt != self._dt:
+            self._dt = dt
+            self._write({"t": sim.tick, "dt": dt})
+
+    def record_think(self, sim, h, situation):
+        if sim.tick != self._open_tick:
+            self._write({"t": sim.tick, "kind": "input", "agent": h.id, "situation": situation})
+        self._write({"t": sim.tick, "kind": "pending" if h.is_thinking else "skipped",
+                     "agent": h.id, "situation": situation})
+
+    def record_result(self, sim, result):
+        self._write({"t": sim.tick, "kind": "result", "agent": result.agent.id,
+                     "situation": result.situation, **_answer(result)})
+
+    def close(self):
+        if not self._file.closed:
+            self._write({"end": self.ticks})
+            self._file.close()
+
+    def __enter__(self) -> "ReplayRecorder":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReplayPlayer:
+    """Serves a recorded log back to a simulation in place of System 2."""
+
+    replaying = True
+
+    def __init__(self, path: str | os.PathLike[str]):
+        self.dts: List[float] = []
+        self.inputs: Dict[int, List[tuple]] = defaultdict(list)
+        self._thinks: Dict[int, deque] = defaultdict(deque)
+        self._results: Dict[int, List[dict]] = defaultdict(list)
+        self._agents: Dict[int, object] = {}
+        end = None
+        dt_changes = []
+        with open(path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("replay") != REPLAY_VERSION:
+                raise ValueError(f"{os.fspath(path)} is not a version {REPLAY_VERSION} replay log")
+            self.seed = header["seed"]
+            self.population_backend = header["population_backend"]
+            for line in f:
+                record = json.loads(line)
+                if "end" in record:
+                    end = record["end"]
+                elif "dt" in record:
+                    dt_changes.append((record["t"], record["dt"]))
+                elif record["kind"] == "input":
+                    self.inputs[record["t"]].append((record["agent"], record["situation"]))
+                elif record["kind"] == "result":
+                    self._results[record["t"]].append(record)
+                else:
+                    self._thinks[record["t"]].append(record)
+        if end is None:
+            # A crashed session leaves no trailer; replay what was recorded.
+            end = max((t for t, _ in dt_changes), default=-1) + 1
+        for i, (t, dt) in enumerate(dt_changes):
+            stop = dt_changes[i + 1][0] if i + 1 < len(dt_changes) else end
+            self.dts.extend([dt] * (stop - t))
+
+    def agent(self, sim, agent_id):
+        if len(self._agents) != len(sim.humans):
+            self._agents = {h.id: h for h in sim.humans}
+        return self._agents[agent_id]
+
+    def replay_think(self, sim, h, situation):
+        queue = self._thinks.get(sim.tick)
+        if not queue:
+            raise ReplayDivergence(f"Tick {sim.tick}: {h.name} thought about {situation!r}, which the log never saw")
+        record = queue.popleft()
+        if record["agent"] != h.id or record["situation"] != situation:
+            raise ReplayDivergence(
+                f"Tick {sim.tick}: expected agent {record['agent']} on {record['situation']!r}, "
+                f"got {h.id} on {situation!r}"
+            )
+        if record["kind"] == "inline":
+            h.apply_thought(ThoughtResult(h, situation, record["thought"], record["speech"], record["craft"]))
+        elif record["kind"] == "pending":
+            h.is_thinking = True
+
+    def due_results(self, sim):
+        return [
+            ThoughtResult(self.agent(sim, r["agent"]), r["situation"], r["thought"], r["speech"], r["craft"])
+            for r in self._results.pop(sim.tick, ())
+        ]
+
+    def check_finished(self):
+        """Raise if the log holds System 2 events the replay never reached."""
+        left = sum(len(q) for q in self._thinks.values()) + sum(len(r) for r in self._results.values())
+        if left:
+            raise ReplayDivergence(f"{left} recorded System 2 events were never replayed")
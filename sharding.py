@@ -0,0 +1,508 @@
+"""Prototype multi-process System 1 engine over shared tile buffers.
+
+The world is cut into vertical strips along ``ChunkManager``-sized chunk
+columns. Each shard owns the agents standing in its strip and the items lying
+there, and is advanced by a worker process (or in-process when ``workers`` is
+0). Tiles live in two ``multiprocessing.shared_memory`` buffers used as a
+double buffer: during tick ``t`` every shard reads the whole map from one
+buffer and writes only its own strip of the other, so no shard ever sees a
+half-updated neighbour.
+
+Each tick is a barrier. Shards report agents that walked out of their strip
+(emigrants) and agents within ``HALO`` tiles of their edges; the coordinator
+hands emigrants to their new owner and gives every shard a read-only halo of
+its neighbours' edge agents for the next tick.
+
+Results do not depend on how the map is split or on the number of workers:
+
+* agents update from the previous tick's state of everyone around them and
+  only ever write to themselves (damage is pulled from foes, not pushed);
+* apples are sought among the previous tick's items, with items within
+  ``SEEK_REACH`` of a strip edge passed to the neighbour like the agent halo;
+* all agents on a tile belong to the shard owning that tile, and are
+  processed in id order, so item pickups resolve the same way everywhere;
+* each agent's random draws come from a stream keyed by
+  ``(seed, agent id, tick)``, not by shard.
+
+This engine runs a subset of the rules only: needs (with rain and night
+cold), drinking, eating, gathering, hut building, melee and movement toward
+water and apples or at random. Those rules and their constants live in
+``simulation_core`` and are the ones :class:`game.Simulation` applies. Stone
+throwing, spears, fire, farming, wolves, System 2 and tribe-wide state are
+not simulated at all.
+
+It is not wired into the game: :meth:`ShardedSimulation.from_simulation`
+copies a snapshot of a :class:`game.Simulation` in, but nothing is written
+back and ``Simulation.update`` never delegates here. Per-agent random streams
+also differ from the simulation's, so a sharded run does not reproduce a
+serial one tick for tick.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import multiprocessing
+import random
+from dataclasses import dataclass, field, replace
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; plain memoryviews are used instead.
+    np = None
+
+from simulation_core import (
+    TILE_HUT,
+    TILE_WATER,
+    WADE_COOLDOWN,
+    DistanceField,
+    build_hut,
+    decay_needs,
+    drink,
+    energy_factor,
+    is_exposed,
+    melee_damage,
+    near_fire,
+    seek_need,
+    seek_step,
+    take_item,
+    vision_range,
+    wander,
+)
+
+HALO = 1  # interaction radius, in tiles
+SEEK_REACH = 4  # widest vision_range: how far agents look for water and apples
+CLEAR = (False, False, ())  # weather as (is_night, is_raining, fires): a dry day without camp fires
+
+NEIGHBOURS = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+
+@dataclass
+class ShardAgent:
+    """Picklable System 1 state of one agent."""
+
+    id: int
+    tribe_id: int
+    x: int
+    y: int
+    hp: float = 100.0
+    hunger: float = 0.0
+    thirst: float = 0.0
+    alive: bool = True
+    inventory: List[str] = field(default_factory=list)
+    attack_power: float = 10.0
+    move_cooldown: float = 0.0
+    is_thinking: bool = False
+
+
+def shard_bounds(width: int, shards: int, chunk_size: int = 8) -> List[Tuple[int, int]]:
+    """Split ``[0, width)`` into ``shards`` strips of whole chunk columns."""
+    columns = -(-width // chunk_size)
+    shards = max(1, min(shards, columns))
+    bounds = []
+    for s in range(shards):
+        c0, c1 = columns * s // shards, columns * (s + 1) // shards
+        bounds.append((c0 * chunk_size, min(width, c1 * chunk_size)))
+    return bounds
+
+
+def _agent_rng(seed: int, agent_id: int, tick: int) -> random.Random:
+    digest = hashlib.blake2b(f"{seed}:{agent_id}:{tick}".encode("ascii"), digest_size=8).digest()
+    return random.Random(int.from_bytes(digest, "little"))
+
+
+class TileBuffers:
+    """Two row-major ``width * height`` tile grids in shared memory."""
+
+    def __init__(self, width: int, height: int, names: Optional[Sequence[str]] = None, tiles=None):
+        self.width, self.height = width, height
+        size = width * height
+        if names is None:
+            self._owner = True
+            self._shms = [shared_memory.SharedMemory(create=True, size=size) for _ in range(2)]
+            if tiles is not None:
+                for shm in self._shms:
+                    shm.buf[:size] = bytes(tiles)
+        else:
+            self._owner = False
+            # Workers are our own children and share the parent's resource tracker.
+            self._shms = [shared_memory.SharedMemory(name=name) for name in names]
+        self.views = [shm.buf[:size] for shm in self._shms]
+        self.grids = [np.ndarray((height, width), np.uint8, buffer=v) for v in self.views] if np is not None else None
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return tuple(shm.name for shm in self._shms)
+
+    def copy_strip(self, src: int, dst: int, x0: int, x1: int):
+        if self.grids is not None:
+            self.grids[dst][:, x0:x1] = self.grids[src][:, x0:x1]
+            return
+        w, read, write = self.width, self.views[src], self.views[dst]
+        for y in range(self.height):
+            write[y * w + x0:y * w + x1] = read[y * w + x0:y * w + x1]
+
+    def close(self):
+        self.grids = None
+        for view in self.views:
+            view.release()
+        self.views = []
+        for shm in self._shms:
+            shm.close()
+            if self._owner:
+                shm.unlink()
+        self._shms = []
+
+
+def _seek_field(need, x, y, reach, tiles, width, height, items):
+    """Distance field toward ``need`` over the tiles within ``reach`` of ``(x, y)``.
+
+    Paths of at most ``reach`` steps never leave that square, so near the
+    agent it agrees with the simulation's window-wide resource fields.
+    """
+    x0, y0 = max(0, x - reach), max(0, y - reach)
+    x1, y1 = min(width, x + reach + 1), min(height, y + reach + 1)
+    w = x1 - x0
+    box = [tiles[row * width + x0:row * width + x1] for row in range(y0, y1)]
+    if need == "water":
+        sources = [(x0 + i, y0 + j) for j, row in enumerate(box) for i, t in enumerate(row) if t == TILE_WATER]
+        passable = None
+    else:
+        sources = [(px, py) for py in range(y0, y1) for px in range(x0, x1) if items.get((px, py)) == "🍎"]
+        passable = bytearray(t != TILE_WATER for row in box for t in row)
+    field = DistanceField(w, y1 - y0, origin=(x0, y0))
+    field.rebuild(sources, passable, reach)
+    return field
+
+
+def step_agent(agent, tiles, width, height, neighbours, items, rng, dt, weather=CLEAR, seen=None):
+    """Advance one agent a tick; returns ``(new_agent, built_hut)``.
+
+    Applies the same System 1 rules as :class:`game.Simulation`, from
+    ``simulation_core``. ``neighbours`` holds the previous-tick state of
+    nearby agents and ``tiles`` the previous-tick map. ``items`` (the owning
+    shard's) is mutated when something is picked up or eaten; apples are
+    sought in ``seen``, the previous tick's items (``items`` by default).
+    Melee damage is pulled from foes and, as in the simulation, only kills at
+    the next decay.
+    """
+    a = replace(agent, inventory=list(agent.inventory))
+    is_night, is_raining, fires = weather
+    here = tiles[a.y * width + a.x]
+    warm = near_fire(fires, a.x, a.y)
+    decay_needs(a, dt, energy_factor(is_raining), is_night and is_exposed(warm, here))
+    if not a.alive:
+        return a, False
+
+    item = items.pop((a.x, a.y), None)
+    if item is not None:
+        take_item(a, item)
+    built = build_hut(a, here)
+    drink(a, here)
+
+    if a.move_cooldown <= 0:
+        vision = vision_range(is_night, warm)
+        need = seek_need(a)
+        moved = False
+        if need is not None:
+            field = _seek_field(need, a.x, a.y, vision, tiles, width, height, items if seen is None else seen)
+            nxt = seek_step(field, a.x, a.y, vision)
+            if nxt is not None:
+                moved = True
+                if nxt != (a.x, a.y):
+                    a.x, a.y = nxt
+                    if tiles[a.y * width + a.x] == TILE_WATER:
+                        a.move_cooldown = max(a.move_cooldown, WADE_COOLDOWN)
+        if tiles[a.y * width + a.x] == TILE_WATER and need != "water":
+            moved = True
+        if not moved and not a.is_thinking:
+            step = wander(rng, a.x, a.y, lambda x, y: tiles[y * width + x] if 0 <= x < width and 0 <= y < height else TILE_WATER)
+            # The window has an edge the simulation's world does not; stop at it.
+            if step is not None and 0 <= step[0] < width and 0 <= step[1] < height:
+                a.x, a.y = step[0], step[1]
+                if step[2]:
+                    a.move_cooldown = max(a.move_cooldown, WADE_COOLDOWN)
+    drink(a, tiles[a.y * width + a.x])
+
+    for other in neighbours:
+        if other.alive and other.tribe_id != a.tribe_id and max(abs(other.x - agent.x), abs(other.y - agent.y)) <= HALO:
+            a.hp -= melee_damage(other)
+    return a, built
+
+
+class Shard:
+    """Agents and items of one map strip, plus the logic to advance them."""
+
+    def __init__(self, index: int, x0: int, x1: int, agents: Iterable[ShardAgent] = (), items=None):
+        self.index, self.x0, self.x1 = index, x0, x1
+        self.agents: Dict[int, ShardAgent] = {a.id: a for a in agents}
+        self.items: Dict[Tuple[int, int], str] = dict(items or {})
+
+    def owns(self, x: int) -> bool:
+        return self.x0 <= x < self.x1
+
+    def step(
+        self,
+        buffers: TileBuffers,
+        tick: int,
+        dt: float,
+        seed: int,
+        halo: Sequence[ShardAgent],
+        item_halo: Dict[Tuple[int, int], str],
+        weather=CLEAR,
+    ):
+        """Advance this shard; returns ``(emigrants, edge_agents, edge_items)``."""
+        src, dst = tick % 2, (tick + 1) % 2
+        buffers.copy_strip(src, dst, self.x0, self.x1)
+        tiles, out, width = buffers.views[src], buffers.views[dst], buffers.width
+
+        # Previous-tick positions of everyone this shard can see, bucketed by tile.
+        near: Dict[Tuple[int, int], List[ShardAgent]] = {}
+        for other in list(self.agents.values()) + list(halo):
+            near.setdefault((other.x, other.y), []).append(other)
+        # Apples are sought where they lay at the end of the last tick, here and next door.
+        seen = dict(self.items)
+        seen.update(item_halo)
+
+        stepped = {}
+        for agent_id in sorted(self.agents):
+            agent = self.agents[agent_id]
+            if not agent.alive:
+                stepped[agent_id] = agent
+                continue
+            neighbours = [
+                other
+                for dx, dy in ((0, 0),) + NEIGHBOURS
+                for other in near.get((agent.x + dx, agent.y + dy), ())
+                if other.id != agent_id
+            ]
+            rng = _agent_rng(seed, agent_id, tick)
+            new, built = step_agent(agent, tiles, width, buffers.height, neighbours, self.items, rng, dt, weather, seen)
+            if built:
+                out[agent.y * width + agent.x] = TILE_HUT
+            stepped[agent_id] = new
+
+        emigrants = [a for a in stepped.values() if not self.owns(a.x)]
+        self.agents = {i: a for i, a in stepped.items() if self.owns(a.x)}
+        edge = [a for a in self.agents.values() if a.x < self.x0 + HALO or a.x >= self.x1 - HALO]
+        edge_items = {
+            pos: item for pos, item in self.items.items() if pos[0] < self.x0 + SEEK_REACH or pos[0] >= self.x1 - SEEK_REACH
+        }
+        return emigrants, edge, edge_items
+
+    def admit(self, migrants: Iterable[ShardAgent]):
+        for a in migrants:
+            self.agents[a.id] = a
+
+
+def _worker_main(conn, names, width, height, shards):
+    buffers = TileBuffers(width, height, names=names)
+    by_index = {s.index: s for s in shards}
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == "step":
+                _, tick, dt, seed, weather, inbound = message
+                results = {}
+                for index, (migrants, halo, item_halo) in inbound.items():
+                    shard = by_index[index]
+                    shard.admit(migrants)
+                    results[index] = shard.step(buffers, tick, dt, seed, halo, item_halo, weather)
+                conn.send(results)
+            elif message[0] == "collect":
+                conn.send({i: (list(s.agents.values()), dict(s.items)) for i, s in by_index.items()})
+            else:
+                break
+    finally:
+        buffers.close()
+        conn.close()
+
+
+class ShardedSimulation:
+    """Coordinator that advances a sharded world in lock-step ticks.
+
+    ``shards`` strips of ``chunk_size`` columns are spread round-robin over
+    ``workers`` processes (0 runs every shard in this process). Use as a
+    context manager, or call :meth:`close`, to stop workers and free the
+    shared buffers.
+
+    Day and night, rain and camp fires are not simulated here; the owner sets
+    ``is_night``, ``is_raining`` and ``fires`` (world coordinates), which
+    :meth:`from_simulation` copies over.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        tiles,
+        agents: Iterable[ShardAgent],
+        items=None,
+        seed: int = 0,
+        shards: int = 4,
+        workers: int = 0,
+        chunk_size: int = 8,
+        origin: Tuple[int, int] = (0, 0),
+    ):
+        self.width, self.height, self.seed = width, height, seed
+        self.origin = origin
+        self.tick = 0
+        self.is_night, self.is_raining = False, False
+        self.fires: Tuple[Tuple[int, int], ...] = ()
+        ox, oy = origin
+        outside = [a.id for a in agents if not (0 <= a.x - ox < width and 0 <= a.y - oy < height)]
+        if outside:
+            raise ValueError(f"Agents {outside} stand outside the {width}x{height} window at {origin}")
+        outside = [pos for pos in items or () if not (0 <= pos[0] - ox < width and 0 <= pos[1] - oy < height)]
+        if outside:
+            raise ValueError(f"Items at {outside} lie outside the {width}x{height} window at {origin}")
+        # Shards work in window coordinates; agents() and items() translate back.
+        agents = [replace(a, x=a.x - ox, y=a.y - oy) for a in agents]
+        items = {(x - ox, y - oy): item for (x, y), item in (items or {}).items()}
+        self.bounds = shard_bounds(width, shards, chunk_size)
+        self.buffers = TileBuffers(width, height, tiles=tiles)
+        self._shards = [
+            Shard(i, x0, x1, [a for a in agents if x0 <= a.x < x1], {p: v for p, v in items.items() if x0 <= p[0] < x1})
+            for i, (x0, x1) in enumerate(self.bounds)
+        ]
+        self._pending: Dict[int, Tuple[List[ShardAgent], List[ShardAgent]]] = {s.index: ([], []) for s in self._shards}
+        self._edges: List[ShardAgent] = [a for s in self._shards for a in s.agents.values()]
+        self._edge_items: Dict[Tuple[int, int], str] = items
+        self._workers = []
+        if workers > 0:
+            ctx = multiprocessing.get_context()
+            for w in range(min(workers, len(self._shards))):
+                mine = self._shards[w::workers]
+                parent, child = ctx.Pipe()
+                proc = ctx.Process(
+                    target=_worker_main,
+                    args=(child, self.buffers.names, width, height, mine),
+                    daemon=True,
+                )
+                proc.start()
+                child.close()
+                self._workers.append((proc, parent, [s.index for s in mine]))
+
+    @classmethod
+    def from_simulation(cls, sim, window: Optional[Tuple[int, int, int, int]] = None, **kwargs) -> "ShardedSimulation":
+        """Shard the System 1 state of a :class:`game.Simulation`.
+
+        The unbounded world is cut down to ``window``, an end-exclusive
+        ``(x0, y0, x1, y1)`` tile rectangle. By default it is the smallest
+        run of whole chunks holding every agent and item (the chunk at the
+        origin for an empty world); an explicit window that leaves any of
+        them out raises :class:`ValueError`. Only the rules this module
+        implements will run; see the module docstring.
+        """
+        agents = [
+            ShardAgent(h.id, h.tribe_id, h.x, h.y, float(h.hp), float(h.hunger), float(h.thirst), bool(h.alive),
+                       list(h.inventory), float(h.attack_power), float(h.move_cooldown), bool(h.is_thinking))
+            for h in sim.humans
+        ]
+        items = sim.all_items()
+        if window is None:
+            keys = [sim.world.chunk_of(a.x, a.y) for a in agents] + [sim.world.chunk_of(*pos) for pos in items]
+            keys = keys or [sim.world.chunk_of(0, 0)]
+            lo = sim.world.chunk_bounds((min(k[0] for k in keys), min(k[1] for k in keys)))
+            hi = sim.world.chunk_bounds((max(k[0] for k in keys), max(k[1] for k in keys)))
+            window = (lo[0], lo[1], hi[2], hi[3])
+        x0, y0, x1, y1 = window
+        kwargs.setdefault("seed", sim.seed if sim.seed is not None else 0)
+        kwargs.setdefault("chunk_size", sim.world.chunk_size)
+        sharded = cls(x1 - x0, y1 - y0, sim.world.region(*window), agents, items, origin=(x0, y0), **kwargs)
+        sharded.is_night, sharded.is_raining, sharded.fires = sim.is_night, sim.is_raining, tuple(sorted(sim.fires))
+        return sharded
+
+    def _halo_for(self, x0: int, x1: int) -> List[ShardAgent]:
+        return [a for a in self._edges if x0 - HALO <= a.x < x0 or x1 <= a.x < x1 + HALO]
+
+    def _item_halo_for(self, x0: int, x1: int) -> Dict[Tuple[int, int], str]:
+        return {
+            pos: item for pos, item in self._edge_items.items()
+            if x0 - SEEK_REACH <= pos[0] < x0 or x1 <= pos[0] < x1 + SEEK_REACH
+        }
+
+    def step(self, dt: float = 1.0):
+        """Run one tick on every shard and exchange migrants and halos at the barrier."""
+        ox, oy = self.origin
+        weather = (self.is_night, self.is_raining, tuple((x - ox, y - oy) for x, y in self.fires))
+        inbound = {
+            s.index: (self._pending[s.index][0], self._halo_for(s.x0, s.x1), self._item_halo_for(s.x0, s.x1))
+            for s in self._shards
+        }
+        results: Dict[int, Tuple[List[ShardAgent], List[ShardAgent], Dict[Tuple[int, int], str]]] = {}
+        if self._workers:
+            for _, conn, indices in self._workers:
+                conn.send(("step", self.tick, dt, self.seed, weather, {i: inbound[i] for i in indices}))
+            for _, conn, _ in self._workers:
+                results.update(conn.recv())
+        else:
+            for shard in self._shards:
+                migrants, halo, item_halo = inbound[shard.index]
+                shard.admit(migrants)
+                results[shard.index] = shard.step(self.buffers, self.tick, dt, self.seed, halo, item_halo, weather)
+
+        self._pending = {s.index: ([], []) for s in self._shards}
+        self._edges = []
+        self._edge_items = {}
+        for index in sorted(results):
+            emigrants, edge, edge_items = results[index]
+            self._edges.extend(edge)
+            self._edge_items.update(edge_items)
+            for a in emigrants:
+                owner = next(s for s in self._shards if s.owns(a.x))
+                self._pending[owner.index][0].append(a)
+                self._edges.append(a)
+        self.tick += 1
+
+    def run(self, ticks: int, dt: float = 1.0):
+        for _ in range(ticks):
+            self.step(dt)
+
+    def agents(self) -> List[ShardAgent]:
+        """Every agent, including those still in transit between shards, by id."""
+        ox, oy = self.origin
+        found = [a for agents, _ in self._collect().values() for a in agents]
+        found += [a for migrants, _ in self._pending.values() for a in migrants]
+        return sorted((replace(a, x=a.x + ox, y=a.y + oy) for a in found), key=lambda a: a.id)
+
+    def items(self) -> Dict[Tuple[int, int], str]:
+        ox, oy = self.origin
+        merged = {}
+        for _, items in self._collect().values():
+            merged.update(((x + ox, y + oy), item) for (x, y), item in items.items())
+        return dict(sorted(merged.items()))
+
+    def tiles(self) -> bytes:
+        """The window's tiles, row-major, as of the last completed tick."""
+        return bytes(self.buffers.views[self.tick % 2])
+
+    def _collect(self):
+        if not self._workers:
+            return {s.index: (list(s.agents.values()), dict(s.items)) for s in self._shards}
+        collected = {}
+        for _, conn, _ in self._workers:
+            conn.send(("collect",))
+        for _, conn, _ in self._workers:
+            collected.update(conn.recv())
+        return collected
+
+    def close(self):
+        for proc, conn, _ in self._workers:
+            try:
+                conn.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+            proc.join(timeout=5)
+            conn.close()
+        self._workers = []
+        if self.buffers is not None:
+            self.buffers.close()
+            self.buffers = None
+
+    def __enter__(self) -> "ShardedSimulation":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -6,49 +6,1176 @@ pygame front-end so it can be unit tested without a display.
 
 from __future__ import annotations
 
+import hashlib
+import heapq
 import json
-import math
+import mmap
 import os
 import random
+import tempfile
+import time
+from array import array
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
+from concurrent.futures import Executor
 from dataclasses import dataclass, field
-from typing import Dict, List, Tuple
+from typing import Callable, Deque, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; array.array fallbacks are used instead.
+    np = None
 
 # Tile identifiers
 TILE_GRASS = 0
 TILE_TREE = 1
 TILE_STONE = 2
 TILE_WATER = 3
+TILE_HUT = 4
+
+TILE_TYPES = (TILE_GRASS, TILE_TREE, TILE_STONE, TILE_WATER)
+
+
+def chunk_seed(world_seed: int, cx: int, cy: int) -> int:
+    """Derive a chunk's seed purely from the world seed and its coordinates."""
+    digest = hashlib.blake2b(f"{world_seed}:{cx}:{cy}".encode("ascii"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class RandomStreams:
+    """Independent seeded ``random.Random`` streams, one per subsystem name.
+
+    Each stream is derived from ``(seed, name)`` alone, so adding draws to one
+    subsystem never shifts the numbers another one sees.
+    """
+
+    def __init__(self, seed: int):
+        self.seed = seed
+        self._streams: Dict[str, random.Random] = {}
+
+    def __getitem__(self, name: str) -> random.Random:
+        stream = self._streams.get(name)
+        if stream is None:
+            digest = hashlib.blake2b(f"{self.seed}:{name}".encode("utf-8"), digest_size=8).digest()
+            stream = self._streams[name] = random.Random(int.from_bytes(digest, "little"))
+        return stream
+
+    def getstate(self) -> Dict[str, tuple]:
+        return {name: stream.getstate() for name, stream in self._streams.items()}
+
+    def setstate(self, states: Dict[str, tuple]):
+        for name, state in states.items():
+            self[name].setstate(state)
+
+
+def generate_chunk(
+    world_seed: int, cx: int, cy: int, chunk_size: int, tile_weights: Tuple[int, int, int, int]
+) -> bytearray:
+    """Generate one chunk's tiles; a pure function, so safe to run in any worker."""
+    rng = random.Random(chunk_seed(world_seed, cx, cy))
+    # One batched weighted draw per chunk keeps generation seeded and cheap.
+    return bytearray(rng.choices(TILE_TYPES, weights=tile_weights, k=chunk_size * chunk_size))
+
+
+@dataclass
+class ChunkCacheStats:
+    """Counters used to size the resident chunk budget for long runs."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    page_outs: int = 0
+    page_ins: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ChunkRegionFile:
+    """Memory-mapped region file that holds modified chunks evicted from memory.
+
+    Every chunk occupies one fixed-size slot; the file doubles in size when it
+    runs out of slots. The file is scratch space for a single session and is
+    truncated when opened.
+    """
+
+    def __init__(self, chunk_bytes: int, path: str | os.PathLike[str] | None = None, initial_slots: int = 64):
+        self.chunk_bytes = chunk_bytes
+        self.slots: Dict[Tuple[int, int], int] = {}
+        self._file = open(path, "w+b") if path is not None else tempfile.TemporaryFile()
+        self._capacity = max(1, initial_slots)
+        self._file.truncate(self._capacity * chunk_bytes)
+        self._map = mmap.mmap(self._file.fileno(), self._capacity * chunk_bytes)
+
+    def __contains__(self, key: Tuple[int, int]) -> bool:
+        return key in self.slots
+
+    def _grow(self):
+        self._map.close()
+        self._capacity *= 2
+        self._file.truncate(self._capacity * self.chunk_bytes)
+        self._map = mmap.mmap(self._file.fileno(), self._capacity * self.chunk_bytes)
+
+    def write(self, key: Tuple[int, int], data: bytearray):
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = len(self.slots)
+            if slot >= self._capacity:
+                self._grow()
+            self.slots[key] = slot
+        offset = slot * self.chunk_bytes
+        self._map[offset:offset + self.chunk_bytes] = data
+
+    def read(self, key: Tuple[int, int]) -> Optional[bytearray]:
+        slot = self.slots.get(key)
+        if slot is None:
+            return None
+        offset = slot * self.chunk_bytes
+        return bytearray(self._map[offset:offset + self.chunk_bytes])
+
+    def close(self):
+        self._map.close()
+        self._file.close()
 
 
 @dataclass
 class ChunkManager:
-    """Lazily generates tiles in chunk-sized grids to support an infinite map."""
+    """Lazily generates tiles in chunk-sized grids to support an infinite map.
+
+    Each chunk is a flat ``bytearray`` of ``chunk_size * chunk_size`` tile ids
+    stored row-major, so a 32x32 chunk costs 1 KiB instead of 1,024 boxed ints.
+
+    When ``max_resident_chunks`` is set, least recently used chunks are evicted
+    once the budget is exceeded. Untouched chunks are simply dropped and later
+    regenerated from their seed; chunks changed through
+    :meth:`set_tile` are paged out to a memory-mapped region file
+    (``region_path``, or an anonymous temporary file).
+
+    Terrain is a pure function of ``(world_seed, cx, cy)``, so the visiting
+    order never changes the map and :meth:`prefetch` can generate chunks on a
+    thread or process pool. ``world_seed`` defaults to a draw from ``rng``.
+    """
 
     chunk_size: int = 32
     tile_weights: Tuple[int, int, int, int] = (60, 15, 10, 15)
     rng: random.Random = field(default_factory=random.Random)
-    chunks: Dict[Tuple[int, int], List[List[int]]] = field(default_factory=dict)
+    chunks: "OrderedDict[Tuple[int, int], bytearray]" = field(default_factory=OrderedDict)
+    max_resident_chunks: Optional[int] = None
+    region_path: str | os.PathLike[str] | None = None
+    stats: ChunkCacheStats = field(default_factory=ChunkCacheStats)
+    world_seed: Optional[int] = None
+
+    def __post_init__(self):
+        if self.max_resident_chunks is not None and self.max_resident_chunks < 1:
+            raise ValueError("max_resident_chunks must be at least 1")
+        if self.world_seed is None:
+            self.world_seed = self.rng.getrandbits(64)
+        self._modified: Set[Tuple[int, int]] = set()
+        self._region: Optional[ChunkRegionFile] = None
 
     def _chunk_coords(self, x: int, y: int) -> Tuple[int, int]:
-        return (math.floor(x / self.chunk_size), math.floor(y / self.chunk_size))
+        return (x // self.chunk_size, y // self.chunk_size)
+
+    def _generate_chunk(self, key: Tuple[int, int]) -> bytearray:
+        return generate_chunk(self.world_seed, key[0], key[1], self.chunk_size, self.tile_weights)
 
-    def _ensure_chunk(self, cx: int, cy: int) -> List[List[int]]:
+    def _load_chunk(self, key: Tuple[int, int]) -> bytearray:
+        if self._region is not None and key in self._region:
+            self.stats.page_ins += 1
+            return self._region.read(key)
+        return self._generate_chunk(key)
+
+    def _evict(self):
+        key, chunk = self.chunks.popitem(last=False)
+        self.stats.evictions += 1
+        if key in self._modified:
+            if self._region is None:
+                self._region = ChunkRegionFile(len(chunk), self.region_path)
+            self._region.write(key, chunk)
+            self.stats.page_outs += 1
+
+    def _ensure_chunk(self, cx: int, cy: int) -> bytearray:
         key = (cx, cy)
-        if key not in self.chunks:
-            tiles = [
-                [self.rng.choices([TILE_GRASS, TILE_TREE, TILE_STONE, TILE_WATER], weights=self.tile_weights)[0]
-                 for _ in range(self.chunk_size)]
-                for _ in range(self.chunk_size)
-            ]
-            self.chunks[key] = tiles
-        return self.chunks[key]
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.stats.hits += 1
+            if self.max_resident_chunks is not None:
+                self.chunks.move_to_end(key)
+            return chunk
+        self.stats.misses += 1
+        chunk = self.chunks[key] = self._load_chunk(key)
+        self._enforce_budget()
+        return chunk
+
+    def _enforce_budget(self):
+        if self.max_resident_chunks is not None:
+            while len(self.chunks) > self.max_resident_chunks:
+                self._evict()
+
+    def prefetch(self, chunk_keys: Iterable[Tuple[int, int]], executor: Optional[Executor] = None) -> int:
+        """Generate missing chunks ahead of use, optionally on ``executor``.
+
+        Paged-out chunks are read back from the region file; the rest are
+        generated, in parallel when an executor is given. Returns the number
+        of chunks made resident.
+        """
+        pending = []
+        loaded = 0
+        for key in dict.fromkeys(chunk_keys):
+            if key in self.chunks:
+                continue
+            if self._region is not None and key in self._region:
+                self.chunks[key] = self._load_chunk(key)
+                loaded += 1
+            else:
+                pending.append(key)
+        if executor is None:
+            generated = [self._generate_chunk(key) for key in pending]
+        else:
+            count = len(pending)
+            generated = executor.map(
+                generate_chunk,
+                [self.world_seed] * count,
+                [key[0] for key in pending],
+                [key[1] for key in pending],
+                [self.chunk_size] * count,
+                [self.tile_weights] * count,
+            )
+        for key, chunk in zip(pending, generated):
+            self.chunks[key] = chunk
+        self._enforce_budget()
+        return loaded + len(pending)
 
     def get_tile(self, x: int, y: int) -> int:
         cx, cy = self._chunk_coords(x, y)
         chunk = self._ensure_chunk(cx, cy)
         lx = x - cx * self.chunk_size
         ly = y - cy * self.chunk_size
-        return chunk[ly][lx]
+        return chunk[ly * self.chunk_size + lx]
+
+    def get_tiles(self, x0: int, y0: int, x1: int, y1: int) -> memoryview:
+        """Return the tiles in ``[x0, x1) x [y0, y1)`` as a read-only 2D view.
+
+        The view is indexed ``view[row, col]`` relative to ``(x0, y0)`` and is
+        assembled with one slice copy per chunk row instead of per-tile lookups.
+        """
+        width, height = x1 - x0, y1 - y0
+        if width <= 0 or height <= 0:
+            raise ValueError("Tile region must have positive width and height")
+        size = self.chunk_size
+        out = bytearray(width * height)
+        for cy in range(y0 // size, (y1 - 1) // size + 1):
+            row_lo, row_hi = max(y0, cy * size), min(y1, (cy + 1) * size)
+            for cx in range(x0 // size, (x1 - 1) // size + 1):
+                col_lo, col_hi = max(x0, cx * size), min(x1, (cx + 1) * size)
+                chunk = self._ensure_chunk(cx, cy)
+                src_x = col_lo - cx * size
+                dst_x = col_lo - x0
+                span = col_hi - col_lo
+                for y in range(row_lo, row_hi):
+                    src = (y - cy * size) * size + src_x
+                    dst = (y - y0) * width + dst_x
+                    out[dst:dst + span] = chunk[src:src + span]
+        return memoryview(out).toreadonly().cast("B", (height, width))
+
+    def set_tile(self, x: int, y: int, tile: int):
+        """Overwrite a tile; the owning chunk is then paged out instead of dropped."""
+        cx, cy = self._chunk_coords(x, y)
+        chunk = self._ensure_chunk(cx, cy)
+        chunk[(y - cy * self.chunk_size) * self.chunk_size + (x - cx * self.chunk_size)] = tile
+        self._modified.add((cx, cy))
+
+    def chunk(self, key: Tuple[int, int]) -> bytearray:
+        """Tiles of chunk ``key``, loading or generating it if needed."""
+        return self._ensure_chunk(*key)
+
+    def modified_keys(self) -> List[Tuple[int, int]]:
+        """Keys of every chunk changed since generation, sorted."""
+        return sorted(self._modified)
+
+    def install(self, key: Tuple[int, int], data: bytes):
+        """Make ``data`` the contents of chunk ``key`` and treat it as modified."""
+        if len(data) != self.chunk_size * self.chunk_size:
+            raise ValueError(f"Chunk {key} has {len(data)} tiles, expected {self.chunk_size ** 2}")
+        self.chunks[key] = bytearray(data)
+        self.chunks.move_to_end(key)
+        self._modified.add(key)
+        self._enforce_budget()
+
+    def discard(self, key: Tuple[int, int]) -> bool:
+        """Drop chunk ``key`` from memory unless modified; True if it was resident."""
+        return key not in self._modified and self.chunks.pop(key, None) is not None
+
+    def close(self):
+        """Release the region file backing paged-out chunks."""
+        if self._region is not None:
+            self._region.close()
+            self._region = None
+
+
+def tile_overlay(mapping: Dict[int, int]) -> bytes:
+    """Translation table sending each tile id in ``mapping`` to its replacement."""
+    table = bytearray(range(256))
+    for base, shown in mapping.items():
+        table[base] = shown
+    return bytes(table)
+
+
+class _WorldRow:
+    __slots__ = ("_world", "_y")
+
+    def __init__(self, world: "ChunkedWorld", y: int):
+        self._world = world
+        self._y = y
+
+    def __getitem__(self, x: int) -> int:
+        return self._world.get(x, self._y)
+
+    def __setitem__(self, x: int, tile: int):
+        self._world.set(x, self._y, tile)
+
+
+class ChunkedWorld:
+    """Unbounded tile map for the simulation, backed by a :class:`ChunkManager`.
+
+    ``world[y][x]`` reads and writes like a list of rows, but any integer
+    coordinate is valid; there is no edge. Every write, whichever way it is
+    made, is reported to ``on_write(x, y)`` so the owner can version its
+    caches. Changed chunks stay resident (they are the world's real state);
+    untouched ones can be :meth:`release`-d and are regenerated on demand.
+
+    ``overlay`` is an optional :func:`tile_overlay` table applied on every
+    read, so derived looks such as seasons never touch the stored terrain
+    and swapping them is O(1). Writes always go to the base terrain.
+    """
+
+    def __init__(self, chunks: ChunkManager, on_write: Optional[Callable[[int, int], None]] = None):
+        self.chunks = chunks
+        self.chunk_size = chunks.chunk_size
+        self.on_write = on_write
+        self.overlay: Optional[bytes] = None
+
+    def __getitem__(self, y: int) -> _WorldRow:
+        return _WorldRow(self, y)
+
+    def get(self, x: int, y: int) -> int:
+        tile = self.chunks.get_tile(x, y)
+        return tile if self.overlay is None else self.overlay[tile]
+
+    def base(self, x: int, y: int) -> int:
+        """The stored tile, ignoring ``overlay``."""
+        return self.chunks.get_tile(x, y)
+
+    def set(self, x: int, y: int, tile: int):
+        self.chunks.set_tile(x, y, tile)
+        if self.on_write is not None:
+            self.on_write(x, y)
+
+    def chunk_of(self, x: int, y: int) -> Tuple[int, int]:
+        return (x // self.chunk_size, y // self.chunk_size)
+
+    def chunk_bounds(self, key: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        """Tile rectangle ``(x0, y0, x1, y1)``, end-exclusive, covered by chunk ``key``."""
+        size = self.chunk_size
+        return (key[0] * size, key[1] * size, (key[0] + 1) * size, (key[1] + 1) * size)
+
+    def chunks_in(self, x0: int, y0: int, x1: int, y1: int) -> List[Tuple[int, int]]:
+        """Keys of the chunks overlapping the end-exclusive tile rectangle."""
+        if x1 <= x0 or y1 <= y0:
+            return []
+        size = self.chunk_size
+        return [
+            (cx, cy)
+            for cy in range(y0 // size, (y1 - 1) // size + 1)
+            for cx in range(x0 // size, (x1 - 1) // size + 1)
+        ]
+
+    def group_windows(self, keys: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], Tuple[int, int, int, int]]:
+        """Map each chunk to the bounding tile window of its 8-connected group.
+
+        Separate clusters of chunks get separate windows, so work done per
+        window scales with the occupied area rather than the span between
+        clusters.
+        """
+        pending = set(keys)
+        windows = {}
+        while pending:
+            start = min(pending)
+            pending.discard(start)
+            group, stack = [start], [start]
+            while stack:
+                cx, cy = stack.pop()
+                for dy in (-1, 0, 1):
+                    for dx in (-1, 0, 1):
+                        key = (cx + dx, cy + dy)
+                        if key in pending:
+                            pending.discard(key)
+                            group.append(key)
+                            stack.append(key)
+            lo = self.chunk_bounds((min(k[0] for k in group), min(k[1] for k in group)))
+            hi = self.chunk_bounds((max(k[0] for k in group), max(k[1] for k in group)))
+            window = (lo[0], lo[1], hi[2], hi[3])
+            for key in group:
+                windows[key] = window
+        return windows
+
+    def region(self, x0: int, y0: int, x1: int, y1: int, base: bool = False) -> bytes:
+        """Row-major tile bytes of ``[x0, x1) x [y0, y1)``, overlaid unless ``base``."""
+        tiles = self.chunks.get_tiles(x0, y0, x1, y1).tobytes()
+        return tiles if base or self.overlay is None else tiles.translate(self.overlay)
+
+    def resident(self) -> List[Tuple[int, int]]:
+        return list(self.chunks.chunks)
+
+    def release(self, keys: Iterable[Tuple[int, int]]) -> int:
+        """Drop unmodified chunks from memory; returns how many were released."""
+        return sum(self.chunks.discard(key) for key in keys)
+
+    def modified_keys(self) -> List[Tuple[int, int]]:
+        """Keys of every chunk changed since generation, sorted."""
+        return self.chunks.modified_keys()
+
+    def modified(self) -> Dict[Tuple[int, int], bytes]:
+        """Contents of every chunk changed since generation, in key order."""
+        return {key: bytes(self.chunks.chunk(key)) for key in self.modified_keys()}
+
+    def restore(self, key: Tuple[int, int], data: bytes):
+        """Install saved contents for a modified chunk (see :meth:`modified`)."""
+        self.chunks.install(key, data)
+
+    def close(self):
+        self.chunks.close()
+
+
+class SpatialHash:
+    """Grid-bucketed index of objects standing on integer tile positions.
+
+    Objects are bucketed into ``cell_size`` square cells so radius and
+    nearest-neighbour queries only touch the cells around the query point.
+    """
+
+    def __init__(self, cell_size: int = 4):
+        if cell_size < 1:
+            raise ValueError("cell_size must be at least 1")
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], Dict[Hashable, None]] = {}
+        self.positions: Dict[Hashable, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, obj: Hashable) -> bool:
+        return obj in self.positions
+
+    def _cell(self, x: int, y: int) -> Tuple[int, int]:
+        return (x // self.cell_size, y // self.cell_size)
+
+    def move(self, obj: Hashable, x: int, y: int):
+        """Insert ``obj`` at ``(x, y)`` or relocate it if already indexed."""
+        old = self.positions.get(obj)
+        if old == (x, y):
+            return
+        new_cell = self._cell(x, y)
+        if old is not None:
+            old_cell = self._cell(*old)
+            if old_cell != new_cell:
+                self._discard_from_cell(old_cell, obj)
+                self.cells.setdefault(new_cell, {})[obj] = None
+        else:
+            self.cells.setdefault(new_cell, {})[obj] = None
+        self.positions[obj] = (x, y)
+
+    def remove(self, obj: Hashable):
+        pos = self.positions.pop(obj, None)
+        if pos is not None:
+            self._discard_from_cell(self._cell(*pos), obj)
+
+    def _discard_from_cell(self, cell: Tuple[int, int], obj: Hashable):
+        bucket = self.cells[cell]
+        del bucket[obj]
+        if not bucket:
+            del self.cells[cell]
+
+    def within(
+        self, x: int, y: int, radius: int, predicate: Optional[Callable[[Hashable], bool]] = None
+    ) -> List[Hashable]:
+        """Objects whose Chebyshev distance to ``(x, y)`` is at most ``radius``."""
+        cx0, cy0 = self._cell(x - radius, y - radius)
+        cx1, cy1 = self._cell(x + radius, y + radius)
+        found = []
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = self.cells.get((cx, cy))
+                if not bucket:
+                    continue
+                for obj in bucket:
+                    ox, oy = self.positions[obj]
+                    if abs(ox - x) <= radius and abs(oy - y) <= radius and (predicate is None or predicate(obj)):
+                        found.append(obj)
+        return found
+
+    def in_rect(self, x0: int, y0: int, x1: int, y1: int) -> List[Hashable]:
+        """Objects with ``x0 <= x < x1`` and ``y0 <= y < y1``."""
+        if x1 <= x0 or y1 <= y0:
+            return []
+        cx0, cy0 = self._cell(x0, y0)
+        cx1, cy1 = self._cell(x1 - 1, y1 - 1)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self.cells):
+            cells = [c for c in self.cells if cx0 <= c[0] <= cx1 and cy0 <= c[1] <= cy1]
+        else:
+            cells = [(cx, cy) for cy in range(cy0, cy1 + 1) for cx in range(cx0, cx1 + 1)]
+        found = []
+        for cell in cells:
+            bucket = self.cells.get(cell)
+            if not bucket:
+                continue
+            for obj in bucket:
+                ox, oy = self.positions[obj]
+                if x0 <= ox < x1 and y0 <= oy < y1:
+                    found.append(obj)
+        return found
+
+    def nearest(
+        self,
+        x: int,
+        y: int,
+        predicate: Optional[Callable[[Hashable], bool]] = None,
+        tie_key: Optional[Callable[[Hashable], object]] = None,
+        max_distance: Optional[int] = None,
+    ) -> Optional[Hashable]:
+        """Closest object by Manhattan distance, searching outward ring by ring.
+
+        Ties are broken by ``tie_key`` (lowest first) so results do not depend
+        on bucket order. Objects farther than ``max_distance`` are ignored.
+        """
+        ccx, ccy = self._cell(x, y)
+        best, best_rank = None, None
+        remaining = len(self.cells)
+        ring = 0
+        while remaining:
+            # Nothing in this ring can be closer than its inner edge.
+            inner_edge = (ring - 1) * self.cell_size + 1
+            if best is not None and inner_edge > best_rank[0]:
+                break
+            if max_distance is not None and inner_edge > max_distance:
+                break
+            if 8 * ring >= remaining:
+                # Sparse index: cheaper to visit every remaining cell directly.
+                ring_cells = [c for c in self.cells if max(abs(c[0] - ccx), abs(c[1] - ccy)) >= ring]
+            else:
+                ring_cells = self._ring(ccx, ccy, ring)
+            for cell in ring_cells:
+                bucket = self.cells.get(cell)
+                if not bucket:
+                    continue
+                remaining -= 1
+                for obj in bucket:
+                    if predicate is not None and not predicate(obj):
+                        continue
+                    ox, oy = self.positions[obj]
+                    dist = abs(ox - x) + abs(oy - y)
+                    if max_distance is not None and dist > max_distance:
+                        continue
+                    rank = (dist, tie_key(obj) if tie_key else 0)
+                    if best_rank is None or rank < best_rank:
+                        best, best_rank = obj, rank
+            ring += 1
+        return best
+
+    @staticmethod
+    def _ring(ccx: int, ccy: int, ring: int) -> List[Tuple[int, int]]:
+        if ring == 0:
+            return [(ccx, ccy)]
+        cells = [(ccx + dx, ccy - ring) for dx in range(-ring, ring + 1)]
+        cells += [(ccx + dx, ccy + ring) for dx in range(-ring, ring + 1)]
+        cells += [(ccx - ring, ccy + dy) for dy in range(-ring + 1, ring)]
+        cells += [(ccx + ring, ccy + dy) for dy in range(-ring + 1, ring)]
+        return cells
+
+
+class ItemIndex(MutableMapping):
+    """Mapping of tile position to item that also indexes items by type and cell.
+
+    Behaves like the plain ``{(x, y): item}`` dict it replaces, while keeping a
+    :class:`SpatialHash` per item type so :meth:`nearest` only looks at cells
+    around the query point instead of scanning every item on the map.
+    ``on_remove(pos, item)`` is called whenever a position is emptied.
+    """
+
+    CHANGE_LOG = 256
+
+    def __init__(
+        self, cell_size: int = 4, on_remove: Optional[Callable[[Tuple[int, int], str], None]] = None
+    ):
+        self.cell_size = cell_size
+        self.on_remove = on_remove
+        self._items: Dict[Tuple[int, int], str] = {}
+        self._by_type: Dict[str, SpatialHash] = {}
+        self._versions: Dict[str, int] = {}
+        self._changes: Dict[str, Deque[Tuple[int, Tuple[int, int]]]] = {}
+
+    def _log_change(self, item: str, pos: Tuple[int, int]):
+        version = self._versions[item] = self._versions.get(item, 0) + 1
+        log = self._changes.get(item)
+        if log is None:
+            log = self._changes[item] = deque(maxlen=self.CHANGE_LOG)
+        log.append((version, pos))
+
+    def __getitem__(self, pos: Tuple[int, int]) -> str:
+        return self._items[pos]
+
+    def __setitem__(self, pos: Tuple[int, int], item: str):
+        old = self._items.get(pos)
+        if old == item:
+            return
+        if old is not None:
+            self._unindex(pos, old)
+        self._items[pos] = item
+        self._log_change(item, pos)
+        index = self._by_type.get(item)
+        if index is None:
+            index = self._by_type[item] = SpatialHash(self.cell_size)
+        index.move(pos, pos[0], pos[1])
+
+    def __delitem__(self, pos: Tuple[int, int]):
+        item = self._items.pop(pos)
+        self._unindex(pos, item)
+        if self.on_remove is not None:
+            self.on_remove(pos, item)
+
+    def _unindex(self, pos: Tuple[int, int], item: str):
+        self._log_change(item, pos)
+        index = self._by_type[item]
+        index.remove(pos)
+        if not index:
+            del self._by_type[item]
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, pos: object) -> bool:
+        return pos in self._items
+
+    def get(self, pos, default=None):
+        return self._items.get(pos, default)
+
+    def items(self):
+        return self._items.items()
+
+    def clear(self):
+        removed = list(self._items.items()) if self.on_remove is not None else ()
+        for item in self._by_type:
+            self._versions[item] += 1
+        self._items.clear()
+        self._by_type.clear()
+        for pos, item in removed:
+            self.on_remove(pos, item)
+
+    def count(self, item: str) -> int:
+        index = self._by_type.get(item)
+        return len(index) if index else 0
+
+    def version(self, item: str) -> int:
+        """Counter bumped whenever an ``item`` is placed or removed anywhere."""
+        return self._versions.get(item, 0)
+
+    def changes_since(self, item: str, version: int) -> Optional[List[Tuple[int, int]]]:
+        """Positions where ``item`` was placed or removed since ``version``.
+
+        Returns None when the log no longer covers that far back (or after a
+        :meth:`clear`), in which case callers should start over.
+        """
+        current = self._versions.get(item, 0)
+        if current == version:
+            return []
+        changed = [pos for v, pos in self._changes.get(item, ()) if v > version]
+        return changed if len(changed) == current - version else None
+
+    def positions(self, item: str) -> Iterable[Tuple[int, int]]:
+        index = self._by_type.get(item)
+        return index.positions.keys() if index else ()
+
+    def in_rect(self, x0: int, y0: int, x1: int, y1: int) -> List[Tuple[Tuple[int, int], str]]:
+        """``(pos, item)`` pairs inside the end-exclusive tile rectangle."""
+        return [(pos, item) for item, index in self._by_type.items() for pos in index.in_rect(x0, y0, x1, y1)]
+
+    def take_rect(self, x0: int, y0: int, x1: int, y1: int) -> List[Tuple[Tuple[int, int], str]]:
+        """Remove and return the items inside the rectangle without calling ``on_remove``.
+
+        For moving items elsewhere (e.g. parking an inactive chunk); nothing
+        was consumed, so nothing should regrow.
+        """
+        taken = sorted(self.in_rect(x0, y0, x1, y1))
+        for pos, item in taken:
+            del self._items[pos]
+            self._unindex(pos, item)
+        return taken
+
+    def nearest(self, item: str, x: int, y: int, max_dist: int) -> Optional[Tuple[int, int]]:
+        """Closest position holding ``item`` within Manhattan ``max_dist``."""
+        index = self._by_type.get(item)
+        if index is None:
+            return None
+        return index.nearest(x, y, tie_key=lambda pos: (pos[1], pos[0]), max_distance=max_dist)
+
+
+class RegrowthScheduler:
+    """Priority queue of positions waiting to regrow, ordered by due time.
+
+    Each position is scheduled at most once; per tick only the entries that
+    are due are popped, so the cost follows the number of events rather than
+    the map area.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, Tuple[int, int]]] = []
+        self._due: Dict[Tuple[int, int], float] = {}
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def __contains__(self, pos: object) -> bool:
+        return pos in self._due
+
+    def due_time(self, pos: Tuple[int, int]) -> Optional[float]:
+        return self._due.get(pos)
+
+    def schedule(self, pos: Tuple[int, int], due: float) -> bool:
+        if pos in self._due:
+            return False
+        self._due[pos] = due
+        heapq.heappush(self._heap, (due, pos))
+        return True
+
+    def cancel(self, pos: Tuple[int, int]):
+        # Stale heap entries are skipped when they surface in pop_due.
+        self._due.pop(pos, None)
+
+    def entries(self) -> List[Tuple[float, Tuple[int, int]]]:
+        """Live ``(due, pos)`` entries in the order :meth:`pop_due` would return them."""
+        return sorted((due, pos) for pos, due in self._due.items())
+
+    def pop_due(self, now: float) -> List[Tuple[int, int]]:
+        ready = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            due, pos = heapq.heappop(heap)
+            if self._due.get(pos) == due:
+                del self._due[pos]
+                ready.append(pos)
+        return ready
+
+
+UNREACHABLE = 0xFFFF
+
+
+class DistanceField:
+    """Step distance from every tile of a bounded grid to its nearest source.
+
+    Built with a multi-source 8-connected BFS, matching how agents move, so
+    following :meth:`step` walks a shortest path around impassable tiles.
+    The grid covers ``width x height`` tiles starting at world tile
+    ``origin``; every method takes and returns world coordinates.
+    """
+
+    NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, 1), (1, -1), (-1, -1))
+
+    def __init__(self, width: int, height: int, origin: Tuple[int, int] = (0, 0)):
+        self.width = width
+        self.height = height
+        self.origin = origin
+        self.max_distance: Optional[int] = None
+        self.dist = array("H", [UNREACHABLE]) * (width * height)
+
+    def rebuild(
+        self,
+        sources: Iterable[Tuple[int, int]],
+        passable: Optional[bytearray] = None,
+        max_distance: Optional[int] = None,
+    ):
+        """Recompute distances; ``passable`` is a row-major mask of walkable tiles.
+
+        Sources always have distance 0, even on impassable tiles such as water.
+        With ``max_distance`` the search stops there and farther tiles read as
+        unreachable, which bounds the cost on large windows.
+        """
+        self.max_distance = max_distance
+        width, height = self.width, self.height
+        ox, oy = self.origin
+        dist = array("H", [UNREACHABLE]) * (width * height)
+        queue = deque()
+        for x, y in sources:
+            x, y = x - ox, y - oy
+            if 0 <= x < width and 0 <= y < height and dist[y * width + x]:
+                dist[y * width + x] = 0
+                queue.append((x, y))
+        limit = UNREACHABLE - 1 if max_distance is None else max_distance
+        while queue:
+            x, y = queue.popleft()
+            d = dist[y * width + x] + 1
+            if d > limit:
+                break
+            for dx, dy in self.NEIGHBOURS:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < width and 0 <= ny < height:
+                    idx = ny * width + nx
+                    if dist[idx] > d and (passable is None or passable[idx]):
+                        dist[idx] = d
+                        queue.append((nx, ny))
+        self.dist = dist
+
+    def refresh(
+        self,
+        changed: Iterable[Tuple[int, int]],
+        sources: Iterable[Tuple[int, int]],
+        passable: Optional[bytearray] = None,
+    ):
+        """Bring distances up to date after sources or passability changed at ``changed``.
+
+        With a ``max_distance`` cutoff a change can only affect tiles within
+        that many steps, so only those are cleared and re-searched, seeded
+        from the untouched tiles bordering them; the result equals a full
+        :meth:`rebuild`. ``sources`` must include every source in the cleared
+        area (others are ignored) and ``passable`` must be current.
+        """
+        limit = self.max_distance
+        if limit is None:
+            raise ValueError("refresh needs a field rebuilt with max_distance")
+        width, height = self.width, self.height
+        ox, oy = self.origin
+        dist = self.dist
+        region: Set[int] = set()
+        for x, y in changed:
+            cx, cy = x - ox, y - oy
+            lo, hi = max(0, cx - limit), min(width, cx + limit + 1)
+            for row in range(max(0, cy - limit), min(height, cy + limit + 1)):
+                region.update(range(row * width + lo, row * width + hi))
+        if not region:
+            return
+        for idx in region:
+            dist[idx] = UNREACHABLE
+        buckets: List[List[int]] = [[] for _ in range(limit + 1)]
+        for x, y in sources:
+            x, y = x - ox, y - oy
+            if 0 <= x < width and 0 <= y < height:
+                idx = y * width + x
+                if idx in region and dist[idx]:
+                    dist[idx] = 0
+                    buckets[0].append(idx)
+        border = set()
+        for idx in region:
+            x, y = idx % width, idx // width
+            for dx, dy in self.NEIGHBOURS:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < width and 0 <= ny < height and ny * width + nx not in region:
+                    border.add(ny * width + nx)
+        for idx in border:
+            if dist[idx] < limit:
+                buckets[dist[idx]].append(idx)
+        for d in range(limit):
+            nd = d + 1
+            for idx in buckets[d]:
+                if dist[idx] != d:
+                    continue
+                x, y = idx % width, idx // width
+                for dx, dy in self.NEIGHBOURS:
+                    nx, ny = x + dx, y + dy
+                    if 0 <= nx < width and 0 <= ny < height:
+                        n = ny * width + nx
+                        if n in region and dist[n] > nd and (passable is None or passable[n]):
+                            dist[n] = nd
+                            buckets[nd].append(n)
+
+    def distance(self, x: int, y: int) -> Optional[int]:
+        x, y = x - self.origin[0], y - self.origin[1]
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        d = self.dist[y * self.width + x]
+        return None if d == UNREACHABLE else d
+
+    def step(self, x: int, y: int) -> Optional[Tuple[int, int]]:
+        """Neighbouring tile that is strictly closer to a source, if any."""
+        ox, oy = self.origin
+        x, y = x - ox, y - oy
+        best, best_d = None, UNREACHABLE
+        if 0 <= x < self.width and 0 <= y < self.height:
+            best_d = self.dist[y * self.width + x]
+        for dx, dy in self.NEIGHBOURS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < self.width and 0 <= ny < self.height:
+                d = self.dist[ny * self.width + nx]
+                if d < best_d:
+                    best, best_d = (nx + ox, ny + oy), d
+        return best
+
+
+# ==========================================
+# SYSTEM 1 RULES
+# ==========================================
+# Shared by game.Simulation and the sharded engine in sharding.py, so the two
+# cannot drift apart. Rates are per simulated second.
+HUNGER_RATE = 0.75
+THIRST_RATE = 0.6
+STARVING_DAMAGE = 0.5  # while hunger is above 100
+PARCHED_DAMAGE = 0.6  # while thirst is above 100
+EXPOSURE_DAMAGE = 0.25  # at night, away from fire and shelter
+RAIN_ENERGY_FACTOR = 1.3  # rain makes hunger and thirst grow faster
+FIRE_WARMTH = 2  # Chebyshev reach of a fire's warmth and light
+SEEK_NEED = 70  # hunger or thirst at which an agent heads for food or water
+HUT_STICKS = 3
+WADE_COOLDOWN = 0.75  # seconds an agent is slowed after stepping into water
+
+
+def energy_factor(is_raining: bool) -> float:
+    return RAIN_ENERGY_FACTOR if is_raining else 1.0
+
+
+def near_fire(fires: Iterable[Tuple[int, int]], x: int, y: int) -> bool:
+    return any(abs(fx - x) <= FIRE_WARMTH and abs(fy - y) <= FIRE_WARMTH for fx, fy in fires)
+
+
+def is_exposed(warm: bool, ground: int) -> bool:
+    """Whether the night cold reaches an agent; fires and trees protect."""
+    return not (warm or ground == TILE_TREE)
+
+
+def vision_range(is_night: bool, warm: bool) -> int:
+    return 2 if is_night and not warm else 4
+
+
+def decay_needs(agent, dt: float, energy: float = 1.0, exposed: bool = False):
+    """One tick of cooldown, hunger, thirst and damage for a living agent.
+
+    Marks the agent dead when its hp runs out. :meth:`PopulationStore.decay_needs`
+    applies the same rule column-wise.
+    """
+    if agent.move_cooldown > 0:
+        agent.move_cooldown = max(0.0, agent.move_cooldown - dt)
+    agent.hunger += HUNGER_RATE * dt * energy
+    agent.thirst += THIRST_RATE * dt * energy
+    if agent.hunger > 100: agent.hp -= STARVING_DAMAGE * dt
+    if agent.thirst > 100: agent.hp -= PARCHED_DAMAGE * dt
+    if exposed: agent.hp -= EXPOSURE_DAMAGE * dt
+    if agent.hp <= 0: agent.alive = False
+
+
+def melee_damage(attacker) -> float:
+    """Damage one tick of melee with ``attacker`` deals to a foe."""
+    return attacker.attack_power / 10
+
+
+def take_item(agent, item: str):
+    """Apples are eaten on the spot; anything else is carried."""
+    if item == "🍎":
+        agent.hunger = 0
+    else:
+        agent.inventory.append(item)
+
+
+def drink(agent, ground: int):
+    if ground == TILE_WATER and agent.thirst > 0:
+        agent.thirst = 0
+
+
+def build_hut(agent, ground: int) -> bool:
+    """Spend sticks on a hut where the agent stands; True if one was built."""
+    if agent.inventory.count("🥢") < HUT_STICKS or ground == TILE_HUT:
+        return False
+    for _ in range(HUT_STICKS):
+        agent.inventory.remove("🥢")
+    return True
+
+
+def seek_need(agent) -> Optional[str]:
+    """Resource field an agent walks toward: water before food, or None."""
+    if agent.thirst >= SEEK_NEED:
+        return "water"
+    if agent.hunger >= SEEK_NEED:
+        return "apple"
+    return None
+
+
+def seek_step(field: DistanceField, x: int, y: int, max_dist: int) -> Optional[Tuple[int, int]]:
+    """Next tile toward the nearest source of ``field`` within ``max_dist`` steps.
+
+    Returns ``(x, y)`` itself when already at a source and None when nothing
+    is in reach.
+    """
+    if field.distance(x, y) == 0:
+        return (x, y)
+    nxt = field.step(x, y)
+    if nxt is None or field.distance(*nxt) + 1 > max_dist:
+        return None
+    return nxt
+
+
+def wander(rng: random.Random, x: int, y: int, tile_at: Callable[[int, int], int]) -> Optional[Tuple[int, int, bool]]:
+    """Random step of an idle agent as ``(x, y, wading)``, or None to stay put.
+
+    A step into water is only taken half the time.
+    """
+    if rng.random() <= 0.6:
+        return None
+    nx, ny = x + rng.randint(-1, 1), y + rng.randint(-1, 1)
+    if tile_at(nx, ny) != TILE_WATER:
+        return (nx, ny, False)
+    if rng.random() > 0.5:
+        return (nx, ny, True)
+    return None
+
+
+class PopulationStore:
+    """Struct-of-arrays storage for the per-agent scalar stats.
+
+    Each stat is one contiguous column indexed by an agent's row, so a tick of
+    needs decay is a few whole-column operations instead of a Python loop over
+    agent objects. ``backend`` is ``"numpy"``, ``"array"`` (stdlib
+    ``array.array`` columns with plain loops) or ``"auto"`` to prefer NumPy.
+    """
+
+    INT_FIELDS = ("x", "y")
+    FLOAT_FIELDS = ("hp", "hunger", "thirst", "move_cooldown")
+    FIELDS = INT_FIELDS + FLOAT_FIELDS + ("alive",)
+
+    def __init__(self, backend: str = "auto", capacity: int = 64):
+        if backend == "auto":
+            backend = "numpy" if np is not None else "array"
+        if backend == "numpy" and np is None:
+            raise ImportError("The numpy population backend requires NumPy to be installed")
+        if backend not in ("numpy", "array"):
+            raise ValueError(f"Unknown population backend: {backend}")
+        self.backend = backend
+        self.size = 0
+        self._capacity = 0
+        self._grow(max(1, capacity))
+
+    def _column(self, name: str, length: int):
+        if self.backend == "numpy":
+            dtype = np.int64 if name in self.INT_FIELDS else np.bool_ if name == "alive" else np.float64
+            return np.zeros(length, dtype=dtype)
+        typecode = "q" if name in self.INT_FIELDS else "b" if name == "alive" else "d"
+        return array(typecode, [0]) * length
+
+    def _grow(self, capacity: int):
+        for name in self.FIELDS:
+            column = self._column(name, capacity)
+            if self._capacity:
+                column[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, column)
+        self._capacity = capacity
+
+    def add(self, **values) -> int:
+        """Append a row initialised from ``values`` and return its index."""
+        if self.size == self._capacity:
+            self._grow(self._capacity * 2)
+        row = self.size
+        self.size += 1
+        for name in self.FIELDS:
+            getattr(self, name)[row] = values.get(name, 0)
+        return row
+
+    def cold_exposure(self, fires: Iterable[Tuple[int, int]], tiles: bytes, width: int, radius: int = FIRE_WARMTH):
+        """Per-row flags for agents neither within ``radius`` of a fire nor on a tree.
+
+        ``tiles`` is the row-major map; trees (tile 1) count as shelter.
+        """
+        n = self.size
+        if self.backend == "numpy":
+            ground = np.frombuffer(tiles, dtype=np.uint8)[self.y[:n] * width + self.x[:n]]
+        else:
+            ground = bytes(tiles[self.y[row] * width + self.x[row]] for row in range(n))
+        return self.exposure_on(fires, ground, radius)
+
+    def ground_under(self, windows: Iterable[Tuple[int, int, int, int]], tiles_in, tile_at):
+        """Tile id under each living row (0 for dead rows), for :meth:`exposure_on`.
+
+        With NumPy, rows inside each end-exclusive ``windows`` rectangle are
+        gathered in one indexed read of ``tiles_in(window)``, its row-major
+        tiles; rows outside every window, and every row of the array backend,
+        use ``tile_at(x, y)``.
+        """
+        n = self.size
+        if self.backend != "numpy":
+            return bytes(tile_at(self.x[row], self.y[row]) if self.alive[row] else 0 for row in range(n))
+        xs, ys = self.x[:n], self.y[:n]
+        ground = np.zeros(n, dtype=np.uint8)
+        pending = self.alive[:n].copy()
+        for window in windows:
+            x0, y0, x1, y1 = window
+            inside = pending & (xs >= x0) & (xs < x1) & (ys >= y0) & (ys < y1)
+            if inside.any():
+                tiles = np.frombuffer(tiles_in(window), dtype=np.uint8)
+                ground[inside] = tiles[(ys[inside] - y0) * (x1 - x0) + (xs[inside] - x0)]
+                pending &= ~inside
+        for row in np.flatnonzero(pending):
+            ground[row] = tile_at(int(xs[row]), int(ys[row]))
+        return ground
+
+    def exposure_on(self, fires: Iterable[Tuple[int, int]], ground, radius: int = FIRE_WARMTH):
+        """Like :meth:`cold_exposure`, given the tile id under each row in ``ground``.
+
+        Lets callers with an unbounded map look up just the occupied tiles.
+        """
+        n = self.size
+        if self.backend == "numpy":
+            xs, ys = self.x[:n], self.y[:n]
+            covered = np.asarray(ground, dtype=np.uint8)[:n] == TILE_TREE
+            for fx, fy in fires:
+                covered |= (np.abs(xs - fx) <= radius) & (np.abs(ys - fy) <= radius)
+            return ~covered
+        fires = list(fires)
+        exposed = array("b", [0]) * n
+        for row in range(n):
+            x, y = self.x[row], self.y[row]
+            if ground[row] == TILE_TREE:
+                continue
+            if not any(abs(x - fx) <= radius and abs(y - fy) <= radius for fx, fy in fires):
+                exposed[row] = 1
+        return exposed
+
+    def decay_needs(self, dt: float, energy_factor: float = 1.0, exposed: Optional[Sequence] = None) -> List[int]:
+        """Apply one tick of cooldown, hunger, thirst and damage to living rows.
+
+        Returns the rows that died this tick.
+        """
+        n = self.size
+        hunger_rate, thirst_rate = HUNGER_RATE * dt * energy_factor, THIRST_RATE * dt * energy_factor
+        if self.backend == "numpy":
+            live = self.alive[:n].copy()
+            cooldown, hunger, thirst, hp = (self.move_cooldown[:n], self.hunger[:n], self.thirst[:n], self.hp[:n])
+            cooldown[live] = np.maximum(cooldown[live] - dt, 0.0)
+            hunger[live] += hunger_rate
+            thirst[live] += thirst_rate
+            hp[live & (hunger > 100)] -= STARVING_DAMAGE * dt
+            hp[live & (thirst > 100)] -= PARCHED_DAMAGE * dt
+            if exposed is not None:
+                hp[live & np.asarray(exposed, dtype=bool)] -= EXPOSURE_DAMAGE * dt
+            died = live & (hp <= 0)
+            self.alive[:n][died] = False
+            return np.flatnonzero(died).tolist()
+        died = []
+        alive, cooldown, hunger, thirst, hp = self.alive, self.move_cooldown, self.hunger, self.thirst, self.hp
+        for row in range(n):
+            if not alive[row]:
+                continue
+            cooldown[row] = max(0.0, cooldown[row] - dt)
+            hunger[row] += hunger_rate
+            thirst[row] += thirst_rate
+            if hunger[row] > 100:
+                hp[row] -= STARVING_DAMAGE * dt
+            if thirst[row] > 100:
+                hp[row] -= PARCHED_DAMAGE * dt
+            if exposed is not None and exposed[row]:
+                hp[row] -= EXPOSURE_DAMAGE * dt
+            if hp[row] <= 0:
+                alive[row] = 0
+                died.append(row)
+        return died
 
 
 @dataclass
@@ -69,23 +1196,121 @@ class KnowledgeBase:
             self.tier = 4
 
 
+def import_legacy_chronicle(src: str | os.PathLike[str], dest: str | os.PathLike[str]) -> int:
+    """Convert a legacy ``chronicle.json`` array into JSON Lines at ``dest``.
+
+    ``src`` and ``dest`` may be the same path; the file is replaced atomically.
+    Returns the number of imported events.
+    """
+    with open(src, "r", encoding="utf-8") as f:
+        events = json.load(f)
+    tmp_path = f"{os.fspath(dest)}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, dest)
+    return len(events)
+
+
+def _is_legacy_chronicle(path: str | os.PathLike[str]) -> bool:
+    with open(path, "r", encoding="utf-8") as f:
+        head = f.read(64).lstrip()
+    return head.startswith("[")
+
+
+def _last_line_end(f, end: int, block: int = 4096) -> int:
+    """Offset just past the last newline before ``end`` in binary file ``f`` (0 if none)."""
+    while end > 0:
+        start = max(0, end - block)
+        f.seek(start)
+        newline = f.read(end - start).rfind(b"\n")
+        if newline >= 0:
+            return start + newline + 1
+        end = start
+    return 0
+
+
 @dataclass
 class MemoryChronicle:
-    """JSON-backed event history shared across sessions."""
+    """Append-only JSON Lines event history shared across sessions.
+
+    Events are buffered and appended ``flush_every`` at a time, so logging is
+    O(1) amortized regardless of history length. After a flush the file is
+    fsynced if ``fsync_interval`` seconds have passed since the last sync
+    (``0`` syncs every flush, ``None`` leaves it to the OS). A legacy JSON
+    array file found at ``path`` is converted in place on open.
+    """
 
     path: str | os.PathLike[str]
+    flush_every: int = 32
+    fsync_interval: Optional[float] = 5.0
 
     def __post_init__(self):
-        if not os.path.exists(self.path):
-            with open(self.path, "w", encoding="utf-8") as f:
-                json.dump([], f)
+        self._buffer: List[str] = []
+        self._file = None
+        self._last_sync = time.monotonic()
+        if os.path.exists(self.path) and _is_legacy_chronicle(self.path):
+            import_legacy_chronicle(self.path, self.path)
 
     def log_event(self, year: int, description: str):
+        self._buffer.append(json.dumps({"year": year, "event": description}, ensure_ascii=False) + "\n")
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def _open_for_append(self):
+        # A crash mid-append leaves a torn last line; cut it off so the next
+        # event starts on a line of its own instead of being glued to it.
+        if os.path.exists(self.path):
+            with open(self.path, "rb+") as f:
+                end = f.seek(0, os.SEEK_END)
+                if end:
+                    f.seek(end - 1)
+                    if f.read(1) != b"\n":
+                        f.truncate(_last_line_end(f, end))
+        return open(self.path, "a", encoding="utf-8")
+
+    def flush(self):
+        if not self._buffer:
+            return
+        if self._file is None:
+            self._file = self._open_for_append()
+        self._file.writelines(self._buffer)
+        self._buffer.clear()
+        self._file.flush()
+        now = time.monotonic()
+        if self.fsync_interval is not None and now - self._last_sync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_sync = now
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "MemoryChronicle":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self) -> Iterator[Dict[str, object]]:
+        """Stream events from disk, including any still buffered, one at a time."""
+        self.flush()
+        if not os.path.exists(self.path):
+            return
         with open(self.path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        data.append({"year": year, "event": description})
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-append can leave a torn final line; skip it.
+                    continue
 
 
 @dataclass
@@ -96,7 +1321,14 @@ class BuildOrder:
 
 
 class BuildingPlanner:
-    """Decides what to construct when resources allow."""
+    """Decides what to construct when resources allow.
+
+    ``rng`` picks among the affordable buildings; defaults to the global
+    ``random`` module.
+    """
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else random
 
     def choose_build(self, resources: Dict[str, int], known_tier: int) -> BuildOrder:
         if resources.get("wood", 0) < 10 or resources.get("stone", 0) < 5:
@@ -107,7 +1339,7 @@ class BuildingPlanner:
             choice_pool.append("Watchtower")
         if known_tier >= 3:
             choice_pool.append("Granary")
-        selection = random.choice(choice_pool)
+        selection = self.rng.choice(choice_pool)
         resources["wood"] -= 10
         resources["stone"] -= 5
         return BuildOrder(type=selection, wood_cost=10, stone_cost=5)
@@ -0,0 +1,158 @@
+"""Compact, versioned binary snapshots of simulation state.
+
+A snapshot file is laid out as::
+
+    header | padding | tiles (width * height raw bytes) | state (zlib-compressed pickle)
+
+The tile section starts on an mmap allocation boundary, so :func:`read_snapshot`
+maps the file and hands the tiles out as a zero-copy ``memoryview`` however
+large the world is. The state section holds only builtin values and is read
+back with an unpickler that refuses to import anything, so a snapshot cannot
+run code when loaded. ``FORMAT_VERSION`` covers the layout of the state as
+well as the container, and only snapshots of the current version load. A
+blake2b digest over both sections catches truncated or corrupted files, and
+writes go through a temporary file and an atomic rename so a crash mid-save
+never clobbers the previous checkpoint.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import mmap
+import os
+import pickle
+import struct
+import zlib
+from typing import Any, Dict, Optional
+
+MAGIC = b"EVOSNAP\0"
+# Bumped whenever the container or the saved state changes shape:
+# 2 chunked world, 3 parked chunks and the active chunk set, 4 farms as due-time entries.
+FORMAT_VERSION = 4
+# magic, format version, reserved, width, height, tiles offset/length, state offset/length, digest
+HEADER = struct.Struct("<8sHHIIQQQQ16s")
+_ALIGN = mmap.ALLOCATIONGRANULARITY
+_SAFE_GLOBALS = {("builtins", "set"), ("builtins", "frozenset")}
+
+
+class SnapshotError(ValueError):
+    """Raised when a file is not a readable snapshot."""
+
+
+def _canonical(value):
+    # Sets iterate in an order that depends on their insertion history; rebuild
+    # them from sorted items so equal states pickle to identical bytes (sets of
+    # strings still follow the process's hash seed).
+    kind = type(value)
+    if kind in (set, frozenset):
+        return kind(sorted((_canonical(v) for v in value), key=repr))
+    if kind is dict:
+        return {k: _canonical(v) for k, v in value.items()}
+    if kind in (list, tuple):
+        return kind(_canonical(v) for v in value)
+    return value
+
+
+class _StateUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if (module, name) in _SAFE_GLOBALS:
+            return super().find_class(module, name)
+        raise SnapshotError(f"Snapshot state may only contain builtin values, found {module}.{name}")
+
+
+def _digest(tiles, state: bytes) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(tiles)
+    h.update(state)
+    return h.digest()
+
+
+def write_snapshot(path: str | os.PathLike[str], width: int, height: int, tiles, state: Dict[str, Any]) -> int:
+    """Atomically write ``tiles`` (``width * height`` bytes) and ``state`` to ``path``.
+
+    ``state`` must contain only builtin values (numbers, strings, bytes,
+    tuples, lists, dicts, sets). Returns the size of the written file.
+    """
+    tiles = memoryview(tiles).cast("B")
+    if len(tiles) != width * height:
+        raise ValueError(f"Expected {width * height} tile bytes, got {len(tiles)}")
+    buf = io.BytesIO()
+    pickler = pickle.Pickler(buf, protocol=5)
+    # No memo: equal states then pickle to equal bytes whatever objects they share.
+    pickler.fast = True
+    pickler.dump(_canonical(state))
+    payload = zlib.compress(buf.getvalue(), 6)
+    tiles_offset = -(-HEADER.size // _ALIGN) * _ALIGN
+    state_offset = tiles_offset + len(tiles)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, width, height,
+        tiles_offset, len(tiles), state_offset, len(payload), _digest(tiles, payload),
+    )
+    tmp_path = f"{os.fspath(path)}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(bytes(tiles_offset - HEADER.size))
+        f.write(tiles)
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return state_offset + len(payload)
+
+
+class Snapshot:
+    """A snapshot opened for reading; ``tiles`` is a view into the mapped file."""
+
+    def __init__(self, path: str | os.PathLike[str], verify: bool = True):
+        self._file = open(path, "rb")
+        try:
+            self._map: Optional[mmap.mmap] = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise SnapshotError(f"{os.fspath(path)} is empty")
+        try:
+            self._parse(path, verify)
+        except Exception:
+            self.close()
+            raise
+
+    def _parse(self, path, verify: bool):
+        if len(self._map) < HEADER.size:
+            raise SnapshotError(f"{os.fspath(path)} is too short to be a snapshot")
+        (magic, version, _, self.width, self.height,
+         tiles_offset, tiles_length, state_offset, state_length, digest) = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise SnapshotError(f"{os.fspath(path)} is not a simulation snapshot")
+        if version > FORMAT_VERSION:
+            raise SnapshotError(f"Snapshot format {version} is newer than supported ({FORMAT_VERSION})")
+        if version < FORMAT_VERSION:
+            raise SnapshotError(f"Snapshot format {version} is older than supported ({FORMAT_VERSION})")
+        if state_offset + state_length > len(self._map) or tiles_length != self.width * self.height:
+            raise SnapshotError(f"{os.fspath(path)} is truncated")
+        self.version = version
+        self.tiles = memoryview(self._map)[tiles_offset:tiles_offset + tiles_length]
+        payload = self._map[state_offset:state_offset + state_length]
+        if verify and _digest(self.tiles, payload) != digest:
+            raise SnapshotError(f"{os.fspath(path)} failed its checksum")
+        self.state: Dict[str, Any] = _StateUnpickler(io.BytesIO(zlib.decompress(payload))).load()
+
+    def close(self):
+        if getattr(self, "tiles", None) is not None:
+            self.tiles.release()
+            self.tiles = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_snapshot(path: str | os.PathLike[str], verify: bool = True) -> Snapshot:
+    """Open ``path``; close the returned :class:`Snapshot` when done with ``tiles``."""
+    return Snapshot(path, verify=verify)
@@ -0,0 +1,139 @@
+"""Deterministic local stand-in for the Ollama ``/api/generate`` endpoint.
+
+Lets System 2 be exercised and benchmarked without a live model. Replies use
+the THOUGHT/SPEECH/CRAFT format QwenBrain expects and depend only on the
+prompt and ``seed``; ``latency`` and ``failure_rate`` simulate a slow or
+flaky server.
+
+Usage::
+
+    python stub_brain_server.py --port 11434 --latency 0.3 --failure-rate 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+THOUGHTS = (
+    "The stone is sharp and good.",
+    "Strangers near the water mean danger.",
+    "Fire keeps the night away.",
+    "My belly wants fruit.",
+)
+SPEECHES = ("Ugh!", "Hm.", "Hrr!", "Ah-ah!")
+
+
+def _fraction(seed: int, text: str, salt: str) -> float:
+    digest = hashlib.blake2b(f"{seed}:{salt}:{text}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") / 2**64
+
+
+def stub_reply(prompt: str, seed: int = 0) -> str:
+    """Deterministic model text for ``prompt``; crafts a spear when it can."""
+    inventory = next((line for line in prompt.splitlines() if line.startswith("Inv:")), "")
+    craft = "SPEAR" if "🦴" in inventory and "🥢" in inventory else "NONE"
+    thought = THOUGHTS[int(_fraction(seed, prompt, "thought") * len(THOUGHTS))]
+    speech = SPEECHES[int(_fraction(seed, prompt, "speech") * len(SPEECHES))]
+    return f"THOUGHT: {thought}\nSPEECH: {speech}\nCRAFT: {craft}"
+
+
+class StubBrainServer:
+    """Threaded HTTP server answering like Ollama; usable as a context manager.
+
+    ``failure_rate`` of prompts (chosen deterministically from the prompt and
+    ``seed``) get HTTP 500. Every request sleeps ``latency`` seconds first.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/generate"
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    prompt = json.loads(self.rfile.read(length) or b"{}").get("prompt", "")
+                except json.JSONDecodeError:
+                    prompt = ""
+                if stub.latency:
+                    time.sleep(stub.latency)
+                with stub._lock:
+                    stub.requests_served += 1
+                if _fraction(stub.seed, prompt, "failure") < stub.failure_rate:
+                    self._send(500, {"error": "stub failure"})
+                else:
+                    self._send(200, {"response": stub_reply(prompt, stub.seed), "done": True})
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubBrainServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-brain", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "StubBrainServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve deterministic fake Ollama replies.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to sleep per request")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    server = StubBrainServer(args.host, args.port, args.latency, args.failure_rate, args.seed)
+    print(f"Stub brain listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+"""System 2 plumbing: scheduling slow LLM "thinking" off the main loop.
+
+System 1 (the pygame loop) must never wait on the LLM. Novelty events are
+submitted to a :class:`BrainScheduler`, which runs them on a small, bounded
+pool of worker threads in priority order, keeps at most one request per agent
+and refuses (or sheds) work once its queue is full so a combat wave cannot
+flood the local Ollama server. A :class:`BrainResponseCache` in front of the
+brain answers repeated situations without an HTTP round trip, and the model
+itself sits behind the pluggable :class:`BrainBackend` interface.
+
+Workers never touch agents directly: replies travel back as immutable
+:class:`ThoughtResult` records on a :class:`ResultChannel`, and the
+simulation applies them in one batch at a fixed point of its tick.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import urllib.request
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import requests
+
+from profiling import percentile
+
+logger = logging.getLogger(__name__)
+
+class BrainBackend(ABC):
+    """Turns a prompt into raw model text, or ``None`` when the call fails.
+
+    Implementations are called from scheduler worker threads concurrently.
+    """
+
+    @abstractmethod
+    def generate(self, prompt: str) -> Optional[str]:
+        """Return the model's reply to ``prompt``; never raise."""
+
+
+class OllamaBackend(BrainBackend):
+    """Ollama ``/api/generate`` client with one keep-alive session per thread."""
+
+    def __init__(self, url: str = "http://localhost:11434/api/generate", model: str = "qwen2.5:1.5b", timeout: float = 10.0):
+        self.url = url
+        self.model = model
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def generate(self, prompt: str) -> Optional[str]:
+        try:
+            r = self._session().post(
+                self.url, json={"model": self.model, "prompt": prompt, "stream": False}, timeout=self.timeout
+            )
+            if r.status_code == 200:
+                return r.json().get("response", "")
+        except Exception:
+            pass
+        return None
+
+
+class UrllibBackend(BrainBackend):
+    """Ollama ``/api/generate`` client using only the standard library.
+
+    No connection reuse, but no dependency on ``requests`` either.
+    """
+
+    def __init__(self, url: str = "http://localhost:11434/api/generate", model: str = "qwen2.5:1.5b", timeout: float = 10.0):
+        self.url = url
+        self.model = model
+        self.timeout = timeout
+
+    def generate(self, prompt: str) -> Optional[str]:
+        body = json.dumps({"model": self.model, "prompt": prompt, "stream": False}).encode("utf-8")
+        request = urllib.request.Request(
+            self.url, data=body, headers={"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read()).get("response", "")
+        except Exception:
+            return None
+
+
+@dataclass(frozen=True)
+class ThoughtResult:
+    """Immutable System 2 outcome for one agent; ``thought`` is None on failure."""
+
+    agent: Hashable
+    situation: str
+    thought: Optional[str] = None
+    speech: Optional[str] = None
+    craft: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.thought is not None
+
+    @classmethod
+    def from_response(cls, agent: Hashable, situation: str, response: Optional[Dict[str, str]]) -> "ThoughtResult":
+        if not response:
+            return cls(agent, situation)
+        return cls(agent, situation, response["THOUGHT"], response["SPEECH"], response["CRAFT"])
+
+
+class ResultChannel:
+    """Multi-producer queue carrying :class:`ThoughtResult` records to the main thread."""
+
+    def __init__(self):
+        self._queue: "queue.SimpleQueue[ThoughtResult]" = queue.SimpleQueue()
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def post(self, result: ThoughtResult):
+        self._queue.put(result)
+
+    def drain(self) -> List[ThoughtResult]:
+        results = []
+        while True:
+            try:
+                results.append(self._queue.get_nowait())
+            except queue.Empty:
+                return results
+
+
+# Lower values are served first.
+PRIORITY_COMBAT = 0
+PRIORITY_SOCIAL = 1
+PRIORITY_DISCOVERY = 2
+PRIORITY_IDLE = 3
+
+
+@dataclass
+class SchedulerMetrics:
+    """Point-in-time view of scheduler load and latency (seconds)."""
+
+    queue_depth: int
+    in_flight: int
+    max_queue_depth: int
+    submitted: int
+    completed: int
+    rejected: int
+    shed: int
+    deduplicated: int
+    wait_p50: float
+    wait_p99: float
+    latency_p50: float
+    latency_p99: float
+
+
+@dataclass
+class _Job:
+    key: Hashable
+    priority: int
+    seq: int
+    fn: Callable[..., Any]
+    args: Tuple[Any, ...]
+    on_done: Optional[Callable[[Any], None]]
+    submitted_at: float
+
+
+class BrainScheduler:
+    """Bounded worker pool with a priority queue for System 2 requests.
+
+    ``submit`` never blocks. Each ``key`` (normally the agent) has at most one
+    queued or running job. When ``max_pending`` jobs are already queued the
+    least urgent one is shed to make room for a more urgent submission;
+    otherwise the new job is rejected. Shed jobs get ``on_done(None)`` so the
+    caller can reset its state. Worker threads start lazily on first submit.
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = 64, latency_window: int = 1024):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self.max_pending = max_pending
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[int, int, Hashable]] = []
+        self._pending: Dict[Hashable, _Job] = {}
+        self._running: set = set()
+        self._threads: List[threading.Thread] = []
+        self._seq = itertools.count()
+        self._closed = False
+        self._waits: Deque[float] = deque(maxlen=latency_window)
+        self._latencies: Deque[float] = deque(maxlen=latency_window)
+        self._max_depth = 0
+        self._counts = {"submitted": 0, "completed": 0, "rejected": 0, "shed": 0, "deduplicated": 0}
+
+    def submit(
+        self,
+        key: Hashable,
+        fn: Callable[..., Any],
+        *args: Any,
+        priority: int = PRIORITY_IDLE,
+        on_done: Optional[Callable[[Any], None]] = None,
+    ) -> bool:
+        """Queue ``fn(*args)``; returns False if the job was not accepted."""
+        shed = None
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler has been shut down")
+            if key in self._running:
+                self._counts["deduplicated"] += 1
+                return False
+            existing = self._pending.get(key)
+            if existing is not None:
+                # Keep a single request per agent, upgraded to the most urgent situation.
+                self._counts["deduplicated"] += 1
+                if priority < existing.priority:
+                    existing.priority, existing.seq = priority, next(self._seq)
+                    existing.fn, existing.args, existing.on_done = fn, args, on_done
+                    heapq.heappush(self._heap, (existing.priority, existing.seq, key))
+                return True
+            if len(self._pending) >= self.max_pending:
+                worst = max(self._pending.values(), key=lambda job: (job.priority, job.seq))
+                if worst.priority <= priority:
+                    self._counts["rejected"] += 1
+                    return False
+                del self._pending[worst.key]
+                self._counts["shed"] += 1
+                shed = worst
+            job = _Job(key, priority, next(self._seq), fn, args, on_done, time.perf_counter())
+            self._pending[key] = job
+            heapq.heappush(self._heap, (priority, job.seq, key))
+            self._counts["submitted"] += 1
+            self._max_depth = max(self._max_depth, len(self._pending))
+            self._ensure_workers()
+            self._cond.notify()
+        if shed is not None and shed.on_done is not None:
+            shed.on_done(None)
+        return True
+
+    def _ensure_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"system2-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_job(self) -> Optional[_Job]:
+        with self._cond:
+            while True:
+                while self._heap:
+                    priority, seq, key = heapq.heappop(self._heap)
+                    job = self._pending.get(key)
+                    if job is not None and job.seq == seq:
+                        del self._pending[key]
+                        self._running.add(key)
+                        self._waits.append(time.perf_counter() - job.submitted_at)
+                        return job
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                result = job.fn(*job.args)
+            except Exception:
+                logger.exception("System 2 job for %r failed", job.key)
+                result = None
+            latency = time.perf_counter() - job.submitted_at
+            try:
+                if job.on_done is not None:
+                    job.on_done(result)
+            except Exception:
+                # A broken callback must not take the worker down with it.
+                logger.exception("System 2 callback for %r failed", job.key)
+            finally:
+                with self._cond:
+                    self._running.discard(job.key)
+                    self._latencies.append(latency)
+                    self._counts["completed"] += 1
+                    self._cond.notify_all()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until nothing is queued or running; returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._running, timeout)
+
+    def shutdown(self, wait: bool = True):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def metrics(self) -> SchedulerMetrics:
+        with self._cond:
+            waits, latencies = list(self._waits), list(self._latencies)
+            return SchedulerMetrics(
+                queue_depth=len(self._pending),
+                in_flight=len(self._running),
+                max_queue_depth=self._max_depth,
+                wait_p50=percentile(waits, 0.5),
+                wait_p99=percentile(waits, 0.99),
+                latency_p50=percentile(latencies, 0.5),
+                latency_p99=percentile(latencies, 0.99),
+                **self._counts,
+            )
+
+
+CacheKey = Tuple[str, Tuple[Tuple[str, int], ...], Tuple[str, ...]]
+
+
+def situation_key(inventory: Iterable[str], tools: Iterable[str], situation: str) -> CacheKey:
+    """Normalize an agent's situation so equivalent prompts share a cache entry.
+
+    The agent's name is deliberately left out; inventory is treated as a
+    multiset and tools as a set.
+    """
+    text = re.sub(r"\s+", " ", situation).strip().lower()
+    items = tuple(sorted(Counter(inventory).items()))
+    return text, items, tuple(sorted(set(tools)))
+
+
+class BrainResponseCache:
+    """LRU + TTL memo of System 2 responses keyed by :func:`situation_key`.
+
+    At most ``max_entries`` responses are kept, each for ``ttl`` seconds. With
+    ``path`` set, entries are appended to a JSON Lines file and reloaded on
+    start-up, so warm answers survive restarts; the file is compacted on load
+    once expired, evicted or superseded lines outnumber the live entries.
+    Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl: float = 300.0,
+        path: Optional[str | os.PathLike[str]] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            if self._load() > 2 * len(self._entries):
+                self.compact()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, inventory: Iterable[str], tools: Iterable[str], situation: str) -> Optional[Dict[str, str]]:
+        key = situation_key(inventory, tools, situation)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, inventory: Iterable[str], tools: Iterable[str], situation: str, response: Dict[str, str]):
+        key = situation_key(inventory, tools, situation)
+        stored_at = self.clock()
+        with self._lock:
+            self._insert(key, stored_at, dict(response))
+            if self.path is not None:
+                record = {"key": [key[0], [list(p) for p in key[1]], list(key[2])], "at": stored_at, "response": response}
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _insert(self, key: CacheKey, stored_at: float, response: Dict[str, str]):
+        self._entries[key] = (stored_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self) -> int:
+        """Load the live entries from ``path``; returns the number of lines read."""
+        now = self.clock()
+        lines = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for lines, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if now - record["at"] > self.ttl:
+                    continue
+                situation, items, tools = record["key"]
+                key = (situation, tuple((item, count) for item, count in items), tuple(tools))
+                self._insert(key, record["at"], record["response"])
+        return lines
+
+    def compact(self):
+        """Rewrite the on-disk store with only the live entries."""
+        if self.path is None:
+            return
+        with self._lock:
+            tmp_path = f"{os.fspath(self.path)}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for key, (stored_at, response) in self._entries.items():
+                    record = {"key": [key[0], [list(p) for p in key[1]], list(key[2])], "at": stored_at, "response": response}
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
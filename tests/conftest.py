@@ -1,6 +1,9 @@
 """Provide a lightweight pygame stub so logic can be unit tested headlessly."""
 import sys
 import types
+from pathlib import Path
+
+import pytest
 
 class _DummyFont:
     def render(self, *args, **kwargs):
@@ -13,11 +16,24 @@ def _noop(*args, **kwargs):
 def _dummy_get_ticks():
     return 0
 
+class _DummySurface:
+    def __init__(self, size=(0, 0), flags=0):
+        self.size = size
+        self.flags = flags
+
+    def fill(self, *args, **kwargs):
+        return None
+
+    def blit(self, *args, **kwargs):
+        return None
+
 pygame_stub = types.SimpleNamespace(
     init=_noop,
+    Surface=_DummySurface,
+    SRCALPHA=65536,
     display=types.SimpleNamespace(set_mode=_noop, set_caption=_noop, flip=_noop),
     time=types.SimpleNamespace(get_ticks=_dummy_get_ticks),
-    draw=types.SimpleNamespace(rect=_noop, circle=_noop, ellipse=_noop, line=_noop),
+    draw=types.SimpleNamespace(rect=_noop, circle=_noop, ellipse=_noop, line=_noop, polygon=_noop),
     font=types.SimpleNamespace(SysFont=lambda *args, **kwargs: _DummyFont()),
     event=types.SimpleNamespace(get=lambda: []),
     mouse=types.SimpleNamespace(get_pos=lambda: (0, 0)),
@@ -30,8 +46,33 @@ pygame_stub = types.SimpleNamespace(
 sys.modules.setdefault("pygame", pygame_stub)
 
 # Stub requests for environments without the dependency during headless tests.
+def _stub_post(*args, **kwargs):
+    return types.SimpleNamespace(status_code=400, json=lambda: {})
+
 requests_stub = types.SimpleNamespace(
-    post=lambda *args, **kwargs: types.SimpleNamespace(status_code=400, json=lambda: {})
+    post=_stub_post,
+    Session=lambda: types.SimpleNamespace(post=_stub_post),
 )
 
 sys.modules.setdefault("requests", requests_stub)
+
+
+# Benchmark baselines are committed next to the tests; a run on a machine that
+# has one fails when a benchmark gets slower than this against the latest.
+BENCHMARK_STORAGE = Path(__file__).parent / "benchmarks"
+BENCHMARK_THRESHOLD = "median:25%"
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    if not config.pluginmanager.hasplugin("benchmark"):
+        return
+    from pytest_benchmark.utils import get_machine_id, parse_compare_fail
+
+    option = config.option
+    if option.benchmark_storage != "file://./.benchmarks":
+        return  # an explicit --benchmark-storage wins
+    option.benchmark_storage = BENCHMARK_STORAGE.as_uri()
+    if not option.benchmark_compare and any((BENCHMARK_STORAGE / get_machine_id()).glob("*.json")):
+        option.benchmark_compare = True
+        option.benchmark_compare_fail = option.benchmark_compare_fail or [parse_compare_fail(BENCHMARK_THRESHOLD)]
@@ -0,0 +1,121 @@
+"""Performance benchmarks for the simulation's hot paths (needs pytest-benchmark).
+
+Baselines live in ``tests/benchmarks/``, one folder per machine id
+(platform, Python implementation and version). When a baseline exists for
+the current machine, every test run compares against the latest one and fails
+on a regression beyond ``BENCHMARK_THRESHOLD`` (see ``conftest.py``). Record
+or refresh the baseline with::
+
+    python -m pytest tests/test_benchmarks.py --benchmark-only --benchmark-autosave
+
+Skipped when pytest-benchmark is not installed.
+"""
+
+import random
+from array import array
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import game
+from camera import Camera
+from simulation_core import ChunkManager, MemoryChronicle, seek_step
+
+# Short timing budgets keep the suite quick when it runs with the regular tests.
+pytestmark = pytest.mark.benchmark(max_time=0.25, min_rounds=5)
+
+POPULATIONS = [6, 60, 300]
+WORLD_SPANS = [64, 256]
+UPDATE_ROUNDS = 20
+
+
+def _populated_sim(agents, seed=0, warmup=0):
+    rng = random.Random(seed)
+    sim = game.Simulation(seed=seed)
+    while len(sim.humans) < agents:
+        sim.add_human(rng.randrange(game.MAP_W), rng.randrange(game.MAP_H), len(sim.humans) % 2)
+    for _ in range(warmup):
+        sim.update(1.0)
+    return sim
+
+
+@pytest.fixture(autouse=True)
+def no_system2(monkeypatch):
+    # Keep worker threads and the network out of the timings.
+    monkeypatch.setattr(game.Simulation, "think", lambda self, h, situation, priority=0: None)
+
+
+@pytest.mark.parametrize("agents", POPULATIONS)
+def test_bench_simulation_update(benchmark, agents):
+    # A crowded world thins out quickly, so each round times one tick of a
+    # fresh population, warmed up just enough to build fields and indexes.
+    sims = []
+
+    def setup():
+        sims.append(_populated_sim(agents, warmup=5))
+        return (sims[-1], 1.0), {}
+
+    benchmark.pedantic(game.Simulation.update, setup=setup, rounds=UPDATE_ROUNDS)
+    assert sum(h.alive for h in sims[-1].humans) == agents
+
+
+@pytest.mark.parametrize("span", WORLD_SPANS)
+def test_bench_chunk_manager_get_tile(benchmark, span):
+    manager = ChunkManager(chunk_size=32, rng=random.Random(1), max_resident_chunks=64)
+    rng = random.Random(2)
+    coords = [(rng.randrange(span), rng.randrange(span)) for _ in range(1000)]
+
+    def sample():
+        get = manager.get_tile
+        for x, y in coords:
+            get(x, y)
+
+    benchmark(sample)
+    manager.close()
+
+
+@pytest.mark.parametrize("agents", POPULATIONS)
+def test_bench_seek(benchmark, agents):
+    sim = _populated_sim(agents)
+    apple = min(pos for pos, item in sim.items.items() if item == "🍎")
+
+    def seek_all():
+        # An apple eaten and regrown per round keeps the fields refreshing as in a live tick.
+        sim.items.pop(apple)
+        sim.items[apple] = "🍎"
+        for h in sim.humans:
+            vision = sim._vision_range(h)
+            seek_step(sim.resource_field("water", (h.x, h.y)), h.x, h.y, vision)
+            seek_step(sim.resource_field("apple", (h.x, h.y)), h.x, h.y, vision)
+
+    benchmark(seek_all)
+
+
+@pytest.mark.parametrize("agents", POPULATIONS)
+def test_bench_find_nearest_item(benchmark, agents):
+    sim = _populated_sim(agents)
+    benchmark(lambda: [sim._find_nearest_item(h, "🍎", 10) for h in sim.humans])
+
+
+@pytest.mark.parametrize("points", [100, 10000])
+def test_bench_camera_world_to_screen(benchmark, points):
+    camera = Camera(offset_x=400, scale=1.3)
+    rng = random.Random(3)
+    xs = [rng.randrange(200) for _ in range(points)]
+    ys = [rng.randrange(200) for _ in range(points)]
+    benchmark(lambda: [camera.world_to_screen(x, y) for x, y in zip(xs, ys)])
+
+
+@pytest.mark.parametrize("points", [100, 10000])
+def test_bench_camera_world_to_screen_many(benchmark, points):
+    camera = Camera(offset_x=400, scale=1.3)
+    rng = random.Random(3)
+    xs = array("q", (rng.randrange(200) for _ in range(points)))
+    ys = array("q", (rng.randrange(200) for _ in range(points)))
+    benchmark(camera.world_to_screen_many, xs, ys)
+
+
+def test_bench_memory_chronicle_log_event(benchmark, tmp_path):
+    with MemoryChronicle(tmp_path / "chronicle.jsonl") as chronicle:
+        benchmark(chronicle.log_event, 3, "Tribe 0 built a Hut at 4,5")
@@ -1,4 +1,7 @@
 import math
+from array import array
+
+import pytest
 
 from camera import Camera
 
@@ -32,3 +35,55 @@ def test_zoom_keeps_pivot_screen_position():
     distance = math.hypot(after[0] - before[0], after[1] - before[1])
     assert distance < 1e-6
     assert camera.scale == camera.max_scale
+
+
+def test_visible_tile_bounds_cover_every_on_screen_tile():
+    camera = Camera(offset_x=300, offset_y=-40, scale=1.7)
+    screen_w, screen_h = 640, 480
+    x0, y0, x1, y1 = camera.visible_tile_bounds(screen_w, screen_h)
+    for ty in range(-60, 120):
+        for tx in range(-60, 120):
+            sx, sy = camera.world_to_screen(tx, ty)
+            if 0 <= sx <= screen_w and 0 <= sy <= screen_h:
+                assert x0 <= tx < x1 and y0 <= ty < y1
+    assert (x1 - x0) * (y1 - y0) < 180 * 180
+
+
+def test_visible_tile_bounds_shrink_when_zoomed_in():
+    camera = Camera(offset_x=320, offset_y=0)
+    wide = camera.visible_tile_bounds(640, 480)
+    camera.zoom_by(2.0)
+    narrow = camera.visible_tile_bounds(640, 480)
+    assert (narrow[2] - narrow[0]) < (wide[2] - wide[0])
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_batch_transforms_match_scalar_transforms(use_numpy):
+    if use_numpy:
+        np = pytest.importorskip("numpy")
+    camera = Camera(offset_x=150, offset_y=-30, scale=1.3)
+    camera.pan(12, -7)
+    camera.zoom_by(1.4, pivot=(200, 100))
+    tiles = [(0, 0), (3, 9), (17, 2), (-4, 6), (25, 25)]
+    xs = [t[0] for t in tiles]
+    ys = [t[1] for t in tiles]
+    if use_numpy:
+        xs, ys = np.array(xs), np.array(ys)
+    else:
+        xs, ys = array("q", xs), array("q", ys)
+
+    screen_xs, screen_ys = camera.world_to_screen_many(xs, ys)
+    for (tx, ty), sx, sy in zip(tiles, screen_xs, screen_ys):
+        assert (sx, sy) == pytest.approx(camera.world_to_screen(tx, ty))
+
+    back_xs, back_ys = camera.screen_to_world_many(screen_xs, screen_ys)
+    assert list(zip(back_xs, back_ys)) == tiles
+
+
+def test_batch_transforms_follow_zoom_and_direct_scale_changes():
+    camera = Camera()
+    camera.world_to_screen_many([1], [0])
+    camera.zoom_by(2.0)
+    assert camera.world_to_screen_many([1], [0])[0][0] == pytest.approx(camera.world_to_screen(1, 0)[0])
+    camera.scale = 0.75
+    assert camera.world_to_screen_many([1], [0])[0][0] == pytest.approx(camera.world_to_screen(1, 0)[0])
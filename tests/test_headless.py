@@ -0,0 +1,35 @@
+import random
+
+import game
+from headless import MINUTES_PER_DAY, run_headless
+from simulation_core import MemoryChronicle
+
+
+def test_run_headless_advances_fixed_steps():
+    ticks = []
+    report = run_headless(seed=3, days=0.5, step=4.0, on_tick=lambda sim, tick: ticks.append(tick))
+
+    assert report.ticks == len(ticks) == 180
+    assert report.simulated_minutes == 0.5 * MINUTES_PER_DAY
+    assert report.minutes_per_second > 0
+
+
+def test_farms_grow_on_simulated_time():
+    sim = game.Simulation(rng=random.Random(0))
+    sim.items.clear()
+    sim.farms.schedule((4, 4), sim.total_minutes + game.FARM_GROWTH_MINUTES)
+
+    run_headless(days=2 / MINUTES_PER_DAY, step=1.0, sim=sim)
+    assert (4, 4) not in sim.items
+
+    run_headless(days=4 / MINUTES_PER_DAY, step=1.0, sim=sim)
+    assert sim.items.get((4, 4)) == "🍎"
+
+
+def test_run_headless_flushes_the_chronicle(tmp_path):
+    path = tmp_path / "history.jsonl"
+    sim = game.Simulation(rng=random.Random(0), chronicle=MemoryChronicle(path, flush_every=1000))
+    sim.chronicle.log_event(0, "The tribes wake")
+
+    run_headless(days=1 / MINUTES_PER_DAY, step=1.0, sim=sim)
+    assert [e["event"] for e in MemoryChronicle(path)] == ["The tribes wake"]
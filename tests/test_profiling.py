@@ -0,0 +1,48 @@
+import csv
+import json
+import random
+
+import pytest
+
+import game
+from profiling import TickProfiler
+
+
+def test_profiler_laps_build_per_phase_percentiles():
+    now = [0.0]
+    profiler = TickProfiler(window=4, clock=lambda: now[0])
+    for tick in range(6):
+        profiler.begin_tick()
+        now[0] += 0.001
+        profiler.lap("pickup")
+        now[0] += 0.002 * (tick + 1)
+        profiler.lap("movement")
+        profiler.count("agents", 10)
+        profiler.end_tick()
+
+    report = profiler.report()
+    assert report["ticks"] == 6
+    assert report["phases"]["pickup"]["p50_ms"] == pytest.approx(1.0)
+    # Only the last four ticks stay in the window: 6, 8, 10, 12 ms.
+    assert report["phases"]["movement"]["samples"] == 4
+    assert report["phases"]["movement"]["p99_ms"] == pytest.approx(12.0)
+    assert report["counters"]["agents"] == {"total": 60, "per_tick": 10.0}
+    assert profiler.overlay_lines()[0].startswith("tick")
+
+
+def test_simulation_update_reports_phases_and_exports(tmp_path):
+    sim = game.Simulation(rng=random.Random(2))
+    sim.profiler = TickProfiler()
+    for _ in range(20):
+        sim.update(1.0)
+
+    report = sim.profiler.report()
+    assert {"needs", "pickup", "combat", "movement", "wolves", "tick"} <= set(report["phases"])
+    assert report["counters"]["agents"]["total"] > 0
+    assert report["counters"]["neighbor_queries"]["total"] > 0
+
+    sim.profiler.export(tmp_path / "profile.json")
+    sim.profiler.export(tmp_path / "profile.csv")
+    assert json.loads((tmp_path / "profile.json").read_text())["ticks"] == 20
+    rows = list(csv.DictReader((tmp_path / "profile.csv").open()))
+    assert {row["name"] for row in rows if row["kind"] == "phase"} == set(report["phases"])
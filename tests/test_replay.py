@@ -0,0 +1,85 @@
+import json
+import time
+
+import pytest
+
+import game
+from headless import run_headless, run_replay
+from replay import ReplayDivergence
+from system2 import BrainResponseCache, BrainScheduler
+
+
+@pytest.fixture
+def live_brain(monkeypatch):
+    def call_brain(name, inventory, tools, situation):
+        time.sleep(0.001)
+        craft = "SPEAR" if "🦴" in inventory and "🥢" in inventory else "NONE"
+        return {"THOUGHT": f"{name} ponders {situation}", "SPEECH": "Hm.", "CRAFT": craft}
+
+    scheduler = BrainScheduler(workers=2, max_pending=4)
+    monkeypatch.setattr(game.QwenBrain, "call_brain", staticmethod(call_brain))
+    monkeypatch.setattr(game, "brain_scheduler", scheduler)
+    monkeypatch.setattr(game, "brain_cache", BrainResponseCache())
+    yield
+    scheduler.shutdown(wait=True)
+
+
+def _no_brain(*args, **kwargs):
+    raise AssertionError("replay must not call System 2")
+
+
+def test_same_seed_gives_same_run(monkeypatch):
+    # Without a replay log only synchronous thinking is reproducible.
+    monkeypatch.setattr(
+        game.Simulation, "think",
+        lambda self, h, situation, priority=game.PRIORITY_DISCOVERY: h.trigger_thinking(situation, self.thought_results, async_call=False),
+    )
+    a, b = game.Simulation(seed=5), game.Simulation(seed=5)
+    for sim in (a, b):
+        sim.wolves.append((9, 9, False))
+        for _ in range(150):
+            sim.update(2.0)
+    assert a._snapshot_state() == b._snapshot_state()
+
+
+def _spear_parts(sim):
+    sim.humans[1].inventory.extend(["🦴", "🥢"])
+
+
+def test_replay_reproduces_recorded_session_without_llm(tmp_path, live_brain, monkeypatch):
+    log = tmp_path / "run.jsonl"
+    live = game.Simulation(seed=21)
+    _spear_parts(live)
+    live.replay = game.ReplayRecorder(log, live)
+    live.think(live.humans[1], "A god speaks from the clouds.")
+    for i in range(400):
+        live.update(1.0 + (i % 3) * 0.5)
+        time.sleep(0.0002)
+    live.replay.close()
+
+    kinds = {json.loads(line).get("kind") for line in log.read_text(encoding="utf-8").splitlines()}
+    assert {"input", "pending", "result"} <= kinds
+
+    monkeypatch.setattr(game.QwenBrain, "call_brain", staticmethod(_no_brain))
+    monkeypatch.setattr(game, "brain_cache", BrainResponseCache(max_entries=0))
+
+    # The replayed world starts from the seed, so apply the same pre-run setup.
+    replayed, report = run_replay(log, setup=_spear_parts)
+
+    assert report.ticks == 400
+    assert replayed._snapshot_state() == live._snapshot_state()
+
+
+def test_replay_detects_divergence(tmp_path, live_brain):
+    log = tmp_path / "run.jsonl"
+    run_headless(seed=4, days=300 / 24 / 60, step=1.0, record=log)
+    lines = log.read_text(encoding="utf-8").splitlines()
+    thinks = [i for i, line in enumerate(lines) if json.loads(line).get("kind") in ("pending", "inline", "skipped")]
+    assert thinks
+    record = json.loads(lines[thinks[0]])
+    record["situation"] = "something else entirely"
+    lines[thinks[0]] = json.dumps(record)
+    log.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    with pytest.raises(ReplayDivergence):
+        run_replay(log)
@@ -0,0 +1,124 @@
+import random
+
+import pytest
+
+import game
+from sharding import ShardAgent, ShardedSimulation, shard_bounds
+from simulation_core import TILE_WATER
+
+
+def _world(seed, width=48, height=24, agents=60):
+    rng = random.Random(seed)
+    tiles = bytes(rng.choices([0, 1, 2, 3], weights=[60, 15, 10, 15], k=width * height))
+    population = [ShardAgent(i, i % 2, rng.randrange(width), rng.randrange(height)) for i in range(agents)]
+    items = {}
+    for i, t in enumerate(tiles):
+        pos = (i % width, i // width)
+        if t == 1:
+            items[pos] = "🍎"
+        elif t == 2:
+            items[pos] = "🦴"
+        elif t == 0 and rng.random() < 0.1:
+            items[pos] = "🥢"
+    return width, height, tiles, population, items
+
+
+def _run(shards, workers, ticks=120):
+    width, height, tiles, agents, items = _world(5)
+    with ShardedSimulation(width, height, tiles, agents, items, seed=9, shards=shards, workers=workers) as sim:
+        sim.run(ticks)
+        return sim.agents(), sim.items(), sim.tiles()
+
+
+def test_shard_bounds_follow_chunk_columns():
+    assert shard_bounds(48, 3, chunk_size=8) == [(0, 16), (16, 32), (32, 48)]
+    assert shard_bounds(20, 8, chunk_size=8) == [(0, 8), (8, 16), (16, 20)]
+
+
+def test_results_do_not_depend_on_shards_or_workers():
+    reference = _run(shards=1, workers=0)
+    assert any(a.x != b.x for a, b in zip(reference[0], _world(5)[3]))
+    assert _run(shards=3, workers=0) == reference
+    assert _run(shards=6, workers=2) == reference
+    assert _run(shards=4, workers=3) == reference
+
+
+def test_combat_reaches_across_shard_edges():
+    tiles = bytes([TILE_WATER]) * (16 * 4)
+    # Everyone stands on water, so nobody wanders and only melee hurts.
+    agents = [ShardAgent(0, 0, 7, 1), ShardAgent(1, 1, 8, 1)]
+    with ShardedSimulation(16, 4, tiles, agents, seed=1, shards=2, chunk_size=8) as sim:
+        sim.step()
+        hurt = {a.id: a.hp for a in sim.agents()}
+    assert hurt == {0: pytest.approx(99.0), 1: pytest.approx(99.0)}
+
+
+def test_from_simulation_keeps_every_agent_and_item():
+    sim = game.Simulation(seed=3)
+    for _ in range(300):
+        sim.update()
+    sim._move_human(sim.humans[0], -20, -30)
+    with ShardedSimulation.from_simulation(sim, shards=2) as sharded:
+        assert [a.id for a in sharded.agents()] == [h.id for h in sim.humans]
+        assert (sharded.agents()[0].x, sharded.agents()[0].y) == (-20, -30)
+        assert sharded.items() == sim.all_items()
+        x0, y0 = sharded.origin
+        assert sharded.tiles() == sim.world.region(x0, y0, x0 + sharded.width, y0 + sharded.height)
+
+    with pytest.raises(ValueError):
+        ShardedSimulation.from_simulation(sim, window=(0, 0, game.MAP_W, game.MAP_H))
+
+
+def test_from_simulation_accepts_an_empty_world():
+    sim = game.Simulation(seed=3)
+    sim.humans = []
+    sim.items.clear()
+    with ShardedSimulation.from_simulation(sim, shards=1) as sharded:
+        assert (sharded.origin, sharded.width, sharded.height) == ((0, 0), game.CHUNK_SIZE, game.CHUNK_SIZE)
+        sharded.step()
+        assert sharded.agents() == [] and sharded.items() == {}
+
+
+def test_one_shard_matches_the_simulation_rules():
+    sim = game.Simulation(seed=4)
+    for y in range(-game.CHUNK_SIZE, 2 * game.CHUNK_SIZE):
+        for x in range(-game.CHUNK_SIZE, 3 * game.CHUNK_SIZE):
+            sim.world[y][x] = 0
+    sim.items.clear()
+    sim.wolves = []
+    sim.fires = {(11, 3)}
+    sim.time_minutes, sim.is_night = 22 * 60, True  # the cold bites away from fire and trees
+    sim.is_raining = True
+    sim.world[5][5] = TILE_WATER
+    sim.world[12][3] = 1
+    sim.items[(12, 2)] = "🍎"
+    sim.items[(3, 12)] = "🥢"
+    setups = [
+        ((3, 5), 0, {"thirst": 90}),  # walks to water and drinks
+        ((10, 2), 0, {"hunger": 90}),  # walks to the apple, by the fire
+        ((8, 10), 0, {}),  # two foes trading blows
+        ((9, 10), 1, {"attack_power": 40}),
+        ((14, 14), 1, {"inventory": ["🥢"] * 3}),  # builds a hut
+        ((3, 12), 1, {}),  # picks up a stick under a tree
+    ]
+    for h, ((x, y), tribe, stats) in zip(sim.humans, setups):
+        sim._move_human(h, x, y)
+        h.tribe_id, h.is_thinking = tribe, True  # thinking agents never wander
+        h.hunger, h.thirst, h.inventory = 10.0, 10.0, []
+        for name, value in stats.items():
+            setattr(h, name, value)
+    sim.update_active_chunks()
+
+    with ShardedSimulation.from_simulation(sim, window=(-8, -8, 24, 24), shards=1) as sharded:
+        for _ in range(6):
+            sim.update(1)
+            sharded.step(1)
+        for h, a in zip(sim.humans, sharded.agents()):
+            assert (a.id, a.x, a.y, a.alive, a.inventory) == (h.id, h.x, h.y, h.alive, h.inventory)
+            assert (a.hp, a.hunger, a.thirst) == pytest.approx((h.hp, h.hunger, h.thirst))
+        assert sharded.items() == sim.all_items()
+        assert sharded.tiles() == sim.world.region(-8, -8, 24, 24)
+    assert (sim.humans[0].x, sim.humans[0].thirst) == (5, 0)
+    assert sim.humans[1].hunger < 10 and (12, 2) not in sim.items
+    assert sim.humans[5].inventory == ["🥢"] and sim.world.get(14, 14) == 4
+    assert sim.humans[2].hp < 100 and sim.humans[3].hp < 100
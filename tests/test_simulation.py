@@ -1,11 +1,18 @@
 import random
 import math
+
+import pytest
+
 import game
+from camera import Camera
+from simulation_core import seek_step
 
 
 def build_flat_world(sim, tile_type):
-    for y in range(game.MAP_H):
-        for x in range(game.MAP_W):
+    # The world continues past the map edge, so flatten a chunk of margin too.
+    margin = game.CHUNK_SIZE
+    for y in range(-margin, game.MAP_H + margin):
+        for x in range(-margin, game.MAP_W + margin):
             sim.world[y][x] = tile_type
     sim.items.clear()
 
@@ -46,7 +53,282 @@ def test_apple_regrowth_every_three_days():
     sim.items.pop(harvest_spot)
 
     sim.update(2.5 * 24 * 60)  # 2.5 in-game days
-    assert harvest_spot not in sim.items, "Apple should not regrow before 3 days"
+    assert sim.item_at(harvest_spot) is None, "Apple should not regrow before 3 days"
 
     sim.update(1 * 24 * 60)  # push past the 3-day mark
-    assert sim.items.get(harvest_spot) == "🍎", "Apple should regrow after 3 in-game days"
+    assert sim.item_at(harvest_spot) == "🍎", "Apple should regrow after 3 in-game days"
+
+
+def test_neighbors_within_only_returns_nearby_living_humans():
+    sim = game.Simulation(rng=random.Random(3))
+    h, near, far, dead = sim.humans[0], sim.humans[3], sim.humans[4], sim.humans[5]
+    h.x, h.y = 5, 5
+    near.x, near.y = 6, 6
+    far.x, far.y = 12, 12
+    dead.x, dead.y = 5, 6
+    dead.alive = False
+    sim._sync_human_index()
+
+    foes = sim.neighbors_within(h, 1, lambda o: o.tribe_id != h.tribe_id)
+
+    assert foes == [near]
+    sim._move_human(far, 7, 7)
+    assert sim.neighbors_within(h, 2, lambda o: o.tribe_id != h.tribe_id) == [near, far]
+
+
+def test_find_nearest_item_respects_vision_property():
+    rng = random.Random(11)
+    sim = game.Simulation(rng=rng)
+    agent = sim.humans[0]
+    for _ in range(40):
+        agent.x, agent.y = rng.randrange(game.MAP_W), rng.randrange(game.MAP_H)
+        vision = rng.randint(1, 5)
+        found = sim._find_nearest_item(agent, "🍎", vision)
+        apples = [pos for pos, item in sim.items.items() if item == "🍎"]
+        in_range = [abs(x - agent.x) + abs(y - agent.y) for x, y in apples if abs(x - agent.x) + abs(y - agent.y) <= vision]
+        if not in_range:
+            assert found is None
+        else:
+            assert abs(found[0] - agent.x) + abs(found[1] - agent.y) == min(in_range)
+
+
+def test_resource_fields_rebuild_when_tiles_or_items_change():
+    sim = game.Simulation(rng=random.Random(4))
+    build_flat_world(sim, 0)
+    sim.world[0][5] = 3
+    water = sim.resource_field("water")
+    assert water.distance(0, 0) == 5
+    assert sim.resource_field("water") is water
+
+    sim.set_tile(0, 3, 3)
+    assert sim.resource_field("water").distance(0, 0) == 3
+
+    assert sim.resource_field("apple").distance(0, 0) is None
+    sim.items[(2, 2)] = "🍎"
+    assert sim.resource_field("apple").distance(0, 0) == 2
+
+
+def test_resource_fields_refresh_locally_and_match_a_rebuild():
+    sim = game.Simulation(rng=random.Random(4))
+    build_flat_world(sim, 0)
+    sim.profiler = game.TickProfiler()
+    for pos in [(2, 2), (6, 1), (9, 9)]:
+        sim.items[pos] = "🍎"
+    apples = sim.resource_field("apple")
+    sim.items.pop((2, 2))
+    sim.set_tile(4, 4, 3)
+    sim.fires.add((3, 3))
+    assert sim.resource_field("apple") is apples
+    sim.resource_field("fire")
+    sim.fires.discard((3, 3))
+    fires = sim.resource_field("fire")
+
+    assert sim.resource_field("fire") is fires
+    assert sim.profiler.counters["field_builds"] == 2
+    assert "field_rebuilds" not in sim.profiler.counters
+    assert sim.profiler.counters["field_refreshes"] == 2
+    for kind, field in (("apple", apples), ("fire", fires)):
+        sim._resource_fields.clear()
+        assert sim.resource_field(kind).dist == field.dist
+
+
+def test_harvesting_schedules_regrowth_once():
+    sim = game.Simulation(rng=random.Random(5))
+    build_flat_world(sim, 1)
+    sim.apple_regrowth.pop_due(float("inf"))
+    sim.total_minutes = 100
+    sim.items[(3, 3)] = "🍎"
+    sim.items.pop((3, 3))
+    sim.items[(3, 3)] = "🔥"
+    sim.items.pop((3, 3))
+
+    assert len(sim.apple_regrowth) == 1
+    assert sim.apple_regrowth.due_time((3, 3)) == 100 + game.APPLE_REGROWTH_MINUTES
+
+
+def test_pooled_population_matches_object_population():
+    plain = game.Simulation(rng=random.Random(6))
+    pooled = game.Simulation(rng=random.Random(6), population_backend="array")
+    assert isinstance(pooled.humans[0], game.PooledHuman)
+    for sim in (plain, pooled):
+        sim.is_night = True
+        sim.is_raining = True
+        for i, h in enumerate(sim.humans):
+            h.hunger, h.thirst, h.hp = 90 + i * 3, 95 - i, 1 + i * 2
+            h.move_cooldown = 0.5
+    for _ in range(12):
+        plain._decay_needs(1.0)
+        pooled._decay_needs(1.0)
+
+    for a, b in zip(plain.humans, pooled.humans):
+        assert (a.alive, a.hp, a.hunger, a.thirst, a.move_cooldown) == pytest.approx(
+            (b.alive, b.hp, b.hunger, b.thirst, b.move_cooldown)
+        )
+    assert not all(h.alive for h in pooled.humans)
+
+
+def test_terrain_layer_repaints_only_changed_tiles(monkeypatch):
+    sim = game.Simulation(rng=random.Random(8))
+    painted = []
+    monkeypatch.setattr(game, "draw_world_tile", lambda surf, cam, x, y, t, animate=True: painted.append((x, y)))
+    layer = game.TerrainLayer()
+    camera = Camera(offset_x=200, offset_y=40)
+    x0, y0, x1, y1 = camera.visible_tile_bounds(*layer.size)
+    window = (x1 - x0) * (y1 - y0)
+
+    layer.render(sim, camera)
+    assert len(painted) == window
+    painted.clear()
+    layer.render(sim, camera)
+    assert painted == []
+
+    sim.set_tile(2, 3, 4)
+    sim.set_tile(x0, y0, 0)  # outside the home map area, but in view
+    sim.set_tile(x1 + 5, y1 + 5, 0)  # off screen
+    layer.render(sim, camera)
+    assert painted == [(2, 3), (x0, y0)]
+
+    painted.clear()
+    sim.world_version += 1  # bulk change that is not logged per tile
+    layer.render(sim, camera)
+    assert len(painted) == window
+
+
+def test_terrain_layer_follows_the_camera(monkeypatch):
+    sim = game.Simulation(rng=random.Random(8))
+    painted = []
+    monkeypatch.setattr(game, "draw_world_tile", lambda surf, cam, x, y, t, animate=True: painted.append((x, y)))
+    layer = game.TerrainLayer()
+    camera = Camera()
+    layer.render(sim, camera)
+    painted.clear()
+
+    camera.pan(-40 * game.TILE_SIZE, 0)
+    layer.render(sim, camera)
+    x0, y0, x1, y1 = camera.visible_tile_bounds(*layer.size)
+    assert set(painted) == {(x, y) for y in range(y0, y1) for x in range(x0, x1)}
+    assert x0 > game.MAP_W
+
+
+def test_clicks_pick_agents_through_the_camera():
+    sim = game.Simulation(rng=random.Random(8))
+    target = sim.humans[2]
+    sim.camera.pan(-300, 120)
+    sx, sy = sim.camera.world_to_screen(target.x, target.y)
+    picked = sim.human_at(*sim.camera.screen_to_world(sx + 3, sy - 2))
+    assert (picked.x, picked.y) == (target.x, target.y)
+    assert sim.human_at(target.x + 500, target.y) is None
+
+
+def test_agents_cross_the_map_edge_and_activate_chunks_around_them():
+    sim = game.Simulation(rng=random.Random(9))
+    build_flat_world(sim, 0)
+    walker = sim.humans[0]
+    sim._move_human(walker, 0, 0)
+    sim.world[-3][-3] = 3
+    step = seek_step(sim.resource_field("water", (0, 0)), 0, 0, 4)
+    assert step == (-1, -1)
+    sim._move_human(walker, *step)
+
+    sim._move_human(walker, 500, -300)
+    sim.update_active_chunks()
+    home = sim.world.chunk_of(sim.humans[3].x, sim.humans[3].y)
+    far = sim.world.chunk_of(500, -300)
+    assert {home, far} <= sim.active_chunks
+    # Distant groups get their own small field windows instead of one spanning both.
+    x0, y0, x1, y1 = sim._chunk_windows[far]
+    assert x1 - x0 <= 3 * game.CHUNK_SIZE and y1 - y0 <= 3 * game.CHUNK_SIZE
+    assert sim.resource_field("water", (500, -300)).origin == (x0, y0)
+
+    walker.alive = False
+    sim.update_active_chunks()
+    assert far not in sim.active_chunks
+    assert far not in sim.world.resident()
+
+
+def test_released_chunks_park_their_items_and_fog_until_revisited():
+    sim = game.Simulation(rng=random.Random(9))
+    walker = sim.humans[0]
+    sim._move_human(walker, 500, -300)
+    sim.update_active_chunks()
+    sim.reveal_area(walker)
+    far = sim.world.chunk_of(500, -300)
+    x0, y0, x1, y1 = sim.world.chunk_bounds(far)
+    spot = (x0, y0)
+    sim.items[spot] = "🦴"
+    fog = {pos for pos in sim.explored if x0 <= pos[0] < x1 and y0 <= pos[1] < y1}
+    assert fog
+
+    sim._move_human(walker, 0, 0)
+    sim.update_active_chunks()
+    assert far not in sim.active_chunks
+    assert not sim.items.in_rect(x0, y0, x1, y1)
+    assert not fog & sim.explored
+    assert sim.item_at(spot) == "🦴"
+
+    sim._move_human(walker, 500, -300)
+    sim.update_active_chunks()
+    assert sim.items.get(spot) == "🦴"
+    assert fog <= sim.explored
+
+
+def test_untouched_chunks_are_forgotten_when_released():
+    sim = game.Simulation(rng=random.Random(9))
+    walker = sim.humans[0]
+    home = set(sim.active_chunks)
+    sim._move_human(walker, 500, -300)
+    sim.update_active_chunks()
+    visited = sim.active_chunks - home
+    assert visited
+    sim._move_human(walker, 0, 0)
+    sim.update_active_chunks()
+    assert not visited & (set(sim._parked_chunks) | sim._populated_chunks)
+
+
+def test_seasons_overlay_the_terrain_without_rewriting_it():
+    sim = game.Simulation(rng=random.Random(10))
+    far = (40 * game.CHUNK_SIZE, 0, 41 * game.CHUNK_SIZE, game.CHUNK_SIZE)
+    summer_home = sim.world.region(0, 0, game.MAP_W, game.MAP_H)
+    summer_far = sim.world.region(*far)
+    version = sim.world_version
+
+    sim.day_count = game.SEASON_LENGTH_DAYS
+    sim.apply_seasonal_changes()
+    assert sim.world_version == version + 1
+    assert sim.world.modified_keys() == []
+    for tiles in (sim.world.region(0, 0, game.MAP_W, game.MAP_H), sim.world.region(*far)):
+        assert 0 not in tiles and 3 not in tiles
+    assert sim.world.region(0, 0, game.MAP_W, game.MAP_H, base=True) == summer_home
+
+    sim.day_count = 2 * game.SEASON_LENGTH_DAYS
+    sim.apply_seasonal_changes()
+    assert sim.world.region(0, 0, game.MAP_W, game.MAP_H) == summer_home
+    assert sim.world.region(*far) == summer_far
+
+
+def test_season_turns_when_the_day_rolls_over():
+    sim = game.Simulation(rng=random.Random(10))
+    sim.day_count = game.SEASON_LENGTH_DAYS - 1
+    sim.time_minutes = 24 * 60 - 1
+    version = sim.world_version
+    sim.update(2)
+
+    assert sim.season_phase == 1
+    assert sim.world.overlay is game.SEASON_OVERLAYS[1]
+    assert sim.world_version > version
+
+
+def test_farms_grow_into_parked_chunks_far_from_agents():
+    sim = game.Simulation(rng=random.Random(12))
+    for h in sim.humans:
+        h.alive = False
+    far = (-30 * game.CHUNK_SIZE, 9)
+    sim.farms.schedule(far, sim.total_minutes + game.FARM_GROWTH_MINUTES)
+    sim.update(game.FARM_GROWTH_MINUTES)
+
+    key = sim.world.chunk_of(*far)
+    assert key not in sim.active_chunks
+    assert far not in sim.items
+    assert key in sim._parked_chunks
+    assert sim.item_at(far) == "🍎"
+    assert sim.farms.due_time(far) == sim.total_minutes + game.FARM_GROWTH_MINUTES
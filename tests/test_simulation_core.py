@@ -1,14 +1,22 @@
 import json
 import os
 import random
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
 from simulation_core import (
     BuildingPlanner,
+    ChunkedWorld,
     ChunkManager,
+    DistanceField,
+    ItemIndex,
     KnowledgeBase,
     MemoryChronicle,
+    PopulationStore,
+    RandomStreams,
+    RegrowthScheduler,
+    SpatialHash,
     TribeCoordinator,
 )
 
@@ -24,6 +32,318 @@ def test_chunk_manager_idempotent_property():
             assert manager.get_tile(*coord) == initial
 
 
+def test_chunk_manager_stores_compact_chunks():
+    manager = ChunkManager(chunk_size=8, rng=random.Random(3))
+    manager.get_tile(0, 0)
+    chunk = manager.chunks[(0, 0)]
+    assert isinstance(chunk, bytearray)
+    assert len(chunk) == 64
+    assert set(chunk) <= {0, 1, 2, 3}
+
+
+def test_chunk_generation_is_seeded():
+    first = ChunkManager(rng=random.Random(9))
+    second = ChunkManager(rng=random.Random(9))
+    assert [first.get_tile(x, 5) for x in range(-40, 40)] == [second.get_tile(x, 5) for x in range(-40, 40)]
+
+
+def test_get_tiles_matches_get_tile_across_chunks():
+    manager = ChunkManager(chunk_size=4, rng=random.Random(5))
+    view = manager.get_tiles(-5, -3, 6, 7)
+    assert view.shape == (10, 11)
+    assert view.readonly
+    for y in range(-3, 7):
+        for x in range(-5, 6):
+            assert view[y + 3, x + 5] == manager.get_tile(x, y)
+
+
+def test_chunk_manager_evicts_least_recently_used():
+    manager = ChunkManager(chunk_size=4, rng=random.Random(1), max_resident_chunks=2)
+    original = {c: manager.get_tile(c * 4, 0) for c in range(3)}
+    assert list(manager.chunks) == [(1, 0), (2, 0)]
+    assert manager.stats.evictions == 1
+    # Untouched chunks regenerate identically from their seed.
+    assert manager.get_tile(0, 0) == original[0]
+    assert manager.stats.misses == 4
+    manager.get_tile(0, 0)
+    assert manager.stats.hits == 1
+
+
+def test_modified_chunks_are_paged_to_region_file(tmp_path):
+    region = tmp_path / "region.bin"
+    manager = ChunkManager(chunk_size=4, rng=random.Random(1), max_resident_chunks=1, region_path=region)
+    manager.set_tile(1, 1, 4)
+    manager.get_tile(100, 100)
+    assert (0, 0) not in manager.chunks
+    assert manager.stats.page_outs == 1
+    assert region.stat().st_size > 0
+    assert manager.get_tile(1, 1) == 4
+    assert manager.stats.page_ins == 1
+    manager.close()
+
+
+def test_chunk_terrain_is_independent_of_visit_order():
+    forward = ChunkManager(chunk_size=4, world_seed=77)
+    backward = ChunkManager(chunk_size=4, world_seed=77)
+    coords = [(x, y) for x in range(-8, 8) for y in range(-8, 8)]
+    first = {c: forward.get_tile(*c) for c in coords}
+    second = {c: backward.get_tile(*c) for c in reversed(coords)}
+    assert first == second
+
+
+def test_prefetch_matches_serial_generation():
+    keys = [(cx, cy) for cx in range(-3, 3) for cy in range(-3, 3)]
+    serial = ChunkManager(chunk_size=8, world_seed=5)
+    for key in keys:
+        serial._ensure_chunk(*key)
+    pooled = ChunkManager(chunk_size=8, world_seed=5)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert pooled.prefetch(keys, executor=pool) == len(keys)
+    assert pooled.prefetch(keys) == 0
+    assert pooled.chunks == serial.chunks
+
+
+def test_chunked_world_reports_writes_and_keeps_modified_chunks():
+    writes = []
+    world = ChunkedWorld(ChunkManager(chunk_size=4, world_seed=3), on_write=lambda x, y: writes.append((x, y)))
+    world[-5][7] = 4
+    world.set(1, 1, 2)
+    assert writes == [(7, -5), (1, 1)]
+    assert world[-5][7] == world.get(7, -5) == 4
+    world.get(40, 40)
+
+    assert world.release(world.resident()) == 1
+    assert sorted(world.resident()) == world.modified_keys() == [(0, 0), (1, -2)]
+
+    copy = ChunkedWorld(ChunkManager(chunk_size=4, world_seed=3))
+    for key, data in world.modified().items():
+        copy.restore(key, data)
+    assert copy.region(-8, -8, 12, 12) == world.region(-8, -8, 12, 12)
+
+
+def test_chunk_manager_install_and_discard():
+    manager = ChunkManager(chunk_size=4, world_seed=3, max_resident_chunks=2)
+    manager.install((5, 5), bytes(range(16)))
+    manager.chunk((0, 0))
+    assert manager.modified_keys() == [(5, 5)]
+    assert not manager.discard((5, 5))
+    assert manager.discard((0, 0)) and not manager.discard((0, 0))
+    assert bytes(manager.chunk((5, 5))) == bytes(range(16))
+    with pytest.raises(ValueError):
+        manager.install((1, 1), b"short")
+
+
+def test_item_index_take_rect_moves_items_without_on_remove():
+    removed = []
+    items = ItemIndex(on_remove=lambda pos, item: removed.append(pos))
+    items[(1, 1)] = "🍎"
+    items[(2, 1)] = "🦴"
+    items[(9, 9)] = "🍎"
+    assert items.take_rect(0, 0, 4, 4) == [((1, 1), "🍎"), ((2, 1), "🦴")]
+    assert list(items.items()) == [((9, 9), "🍎")]
+    assert removed == [] and items.nearest("🦴", 2, 1, max_dist=3) is None
+
+
+def test_chunked_world_groups_separate_clusters():
+    world = ChunkedWorld(ChunkManager(chunk_size=4, world_seed=3))
+    windows = world.group_windows([(0, 0), (1, 1), (10, 0)])
+    assert windows[(0, 0)] == windows[(1, 1)] == (0, 0, 8, 8)
+    assert windows[(10, 0)] == (40, 0, 44, 4)
+
+
+def test_distance_field_with_origin_uses_world_coordinates():
+    field = DistanceField(5, 5, origin=(-10, 20))
+    field.rebuild([(-8, 22), (0, 0)])
+    assert field.distance(-8, 22) == 0
+    assert field.distance(-10, 20) == 2
+    assert field.distance(0, 0) is None
+    assert field.step(-10, 20) == (-9, 21)
+
+
+def test_spatial_hash_within_matches_brute_force_property():
+    rng = random.Random(8)
+    index = SpatialHash(cell_size=3)
+    positions = {}
+    for obj in range(80):
+        positions[obj] = (rng.randint(-20, 20), rng.randint(-20, 20))
+        index.move(obj, *positions[obj])
+    for obj in range(0, 80, 4):
+        positions[obj] = (rng.randint(-20, 20), rng.randint(-20, 20))
+        index.move(obj, *positions[obj])
+    index.remove(1)
+    positions.pop(1)
+    for _ in range(50):
+        qx, qy, radius = rng.randint(-25, 25), rng.randint(-25, 25), rng.randint(0, 6)
+        expected = {o for o, (x, y) in positions.items() if max(abs(x - qx), abs(y - qy)) <= radius}
+        assert set(index.within(qx, qy, radius)) == expected
+
+
+def test_spatial_hash_in_rect_matches_brute_force_property():
+    rng = random.Random(9)
+    index = SpatialHash(cell_size=4)
+    positions = {obj: (rng.randint(-30, 30), rng.randint(-30, 30)) for obj in range(120)}
+    for obj, pos in positions.items():
+        index.move(obj, *pos)
+    for _ in range(50):
+        x0, y0 = rng.randint(-35, 35), rng.randint(-35, 35)
+        x1, y1 = x0 + rng.randint(0, 40), y0 + rng.randint(0, 40)
+        expected = {o for o, (x, y) in positions.items() if x0 <= x < x1 and y0 <= y < y1}
+        assert set(index.in_rect(x0, y0, x1, y1)) == expected
+
+    items = ItemIndex(cell_size=2)
+    items[(1, 1)] = "🍎"
+    items[(4, 1)] = "🦴"
+    items[(9, 9)] = "🍎"
+    assert sorted(items.in_rect(0, 0, 5, 5)) == [((1, 1), "🍎"), ((4, 1), "🦴")]
+
+
+def test_spatial_hash_nearest_uses_manhattan_distance_and_tie_key():
+    index = SpatialHash(cell_size=2)
+    index.move("far", 9, 9)
+    index.move("b", 3, 0)
+    index.move("a", 0, 3)
+    assert index.nearest(0, 0, tie_key=lambda o: o) == "a"
+    assert index.nearest(0, 0, predicate=lambda o: o == "far") == "far"
+    assert SpatialHash().nearest(0, 0) is None
+
+
+def test_item_index_nearest_tracks_mutations():
+    items = ItemIndex(cell_size=2)
+    items[(0, 0)] = "🍎"
+    items[(5, 5)] = "🍎"
+    items[(1, 1)] = "🦴"
+    assert items.nearest("🍎", 2, 2, max_dist=4) == (0, 0)
+    items[(0, 0)] = "🔥"
+    assert items.nearest("🍎", 2, 2, max_dist=4) is None
+    assert items.nearest("🍎", 2, 2, max_dist=6) == (5, 5)
+    assert items.pop((5, 5)) == "🍎"
+    assert items.count("🍎") == 0
+    assert items.nearest("🔥", 0, 1, max_dist=1) == (0, 0)
+    items.clear()
+    assert len(items) == 0 and items.nearest("🦴", 1, 1, max_dist=3) is None
+
+
+def test_distance_field_paths_around_obstacles():
+    # A wall at x=2 with a single gap at the bottom row.
+    passable = bytearray(1 for _ in range(25))
+    for y in range(4):
+        passable[y * 5 + 2] = 0
+    field = DistanceField(5, 5)
+    field.rebuild([(4, 0)], passable)
+    assert field.distance(4, 0) == 0
+    assert field.distance(2, 0) is None
+    pos, steps = (0, 0), 0
+    while field.distance(*pos):
+        pos = field.step(*pos)
+        assert passable[pos[1] * 5 + pos[0]]
+        steps += 1
+    assert pos == (4, 0)
+    assert steps == field.distance(0, 0) == 8
+
+
+def test_distance_field_refresh_matches_rebuild_property():
+    rng = random.Random(12)
+    width, height, limit = 24, 20, 6
+    passable = bytearray(rng.random() > 0.2 for _ in range(width * height))
+    sources = {(rng.randrange(width), rng.randrange(height)) for _ in range(6)}
+    field = DistanceField(width, height, origin=(-4, 3))
+    field.rebuild([(x - 4, y + 3) for x, y in sources], passable, limit)
+    for _ in range(30):
+        changed = []
+        for _ in range(rng.randint(1, 3)):
+            pos = (rng.randrange(width), rng.randrange(height))
+            if rng.random() < 0.5:
+                sources ^= {pos}
+            else:
+                passable[pos[1] * width + pos[0]] ^= 1
+            changed.append((pos[0] - 4, pos[1] + 3))
+        field.refresh(changed, [(x - 4, y + 3) for x, y in sources], passable)
+        full = DistanceField(width, height, origin=(-4, 3))
+        full.rebuild([(x - 4, y + 3) for x, y in sources], passable, limit)
+        assert field.dist == full.dist
+
+
+def test_item_index_changes_since_reports_positions_until_cleared():
+    items = ItemIndex()
+    items[(0, 0)] = "🍎"
+    version = items.version("🍎")
+    items[(1, 1)] = "🍎"
+    items.pop((0, 0))
+    items[(2, 2)] = "🦴"
+    assert items.changes_since("🍎", version) == [(1, 1), (0, 0)]
+    assert items.changes_since("🍎", items.version("🍎")) == []
+    items.clear()
+    assert items.changes_since("🍎", version) is None
+
+
+def test_item_index_versions_change_per_type():
+    items = ItemIndex()
+    items[(0, 0)] = "🍎"
+    apple_version, stone_version = items.version("🍎"), items.version("🦴")
+    items[(0, 0)] = "🍎"
+    assert items.version("🍎") == apple_version
+    items[(1, 1)] = "🦴"
+    assert items.version("🍎") == apple_version
+    assert items.version("🦴") > stone_version
+    items.clear()
+    assert items.version("🍎") > apple_version
+    assert list(items.positions("🍎")) == []
+
+
+def test_regrowth_scheduler_pops_only_due_entries():
+    scheduler = RegrowthScheduler()
+    assert scheduler.schedule((1, 1), 30)
+    assert scheduler.schedule((0, 0), 10)
+    assert not scheduler.schedule((0, 0), 5)
+    scheduler.schedule((2, 2), 20)
+    scheduler.cancel((2, 2))
+    assert scheduler.pop_due(9) == []
+    assert scheduler.pop_due(25) == [(0, 0)]
+    assert (1, 1) in scheduler and len(scheduler) == 1
+    assert scheduler.pop_due(30) == [(1, 1)]
+    assert len(scheduler) == 0
+
+
+@pytest.mark.parametrize("backend", ["array", "numpy"])
+def test_population_store_decays_needs_and_reports_deaths(backend):
+    if backend == "numpy":
+        pytest.importorskip("numpy")
+    store = PopulationStore(backend=backend, capacity=1)
+    rows = [store.add(x=i, y=0, hp=100, alive=True) for i in range(3)]
+    store.hp[rows[1]] = 0.1
+    store.thirst[rows[1]] = 101
+    store.alive[rows[2]] = False
+    tiles = bytes([0, 1, 0])
+
+    exposed = store.cold_exposure(fires=[], tiles=tiles, width=3)
+    died = store.decay_needs(dt=2.0, exposed=exposed)
+
+    assert list(exposed) == [True, False, True]
+    assert died == [1]
+    assert store.hunger[0] == 1.5 and store.thirst[0] == 1.2
+    assert store.hp[0] == 99.5
+    assert store.hunger[2] == 0 and not store.alive[1]
+
+
+@pytest.mark.parametrize("backend", ["array", "numpy"])
+def test_population_store_reads_ground_through_windows(backend):
+    if backend == "numpy":
+        pytest.importorskip("numpy")
+    store = PopulationStore(backend=backend)
+    for x, y in [(1, 0), (5, 1), (-3, -3), (2, 1), (9, 9)]:
+        store.add(x=x, y=y, alive=True)
+    store.alive[3] = False
+    tile_at = lambda x, y: (x * 7 + y * 3) % 4
+    windows = [(0, 0, 4, 2), (4, 0, 8, 2)]
+
+    def tiles_in(window):
+        x0, y0, x1, y1 = window
+        return bytes(tile_at(x, y) for y in range(y0, y1) for x in range(x0, x1))
+
+    ground = store.ground_under(windows, tiles_in, tile_at)
+    assert list(ground) == [tile_at(1, 0), tile_at(5, 1), tile_at(-3, -3), 0, tile_at(9, 9)]
+
+
 def test_knowledge_progression_triggers_tiers():
     kb = KnowledgeBase()
     kb.evaluate_progress(resource_events={"stone_tools": True})
@@ -44,16 +364,45 @@ def test_building_planner_requires_resources():
 
 
 def test_memory_chronicle_appends(tmp_path):
-    chron_path = tmp_path / "chronicle.json"
-    chronicle = MemoryChronicle(path=chron_path)
+    chron_path = tmp_path / "chronicle.jsonl"
+    chronicle = MemoryChronicle(path=chron_path, flush_every=1)
     chronicle.log_event(year=10, description="Moon Tribe attacked")
     chronicle.log_event(year=11, description="Fire rediscovered")
     with open(chron_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+        data = [json.loads(line) for line in f]
     assert data[-1]["year"] == 11
     assert "Fire rediscovered" in data[-1]["event"]
 
 
+def test_memory_chronicle_buffers_and_streams(tmp_path):
+    chron_path = tmp_path / "chronicle.jsonl"
+    with MemoryChronicle(path=chron_path, flush_every=10, fsync_interval=None) as chronicle:
+        for year in range(5):
+            chronicle.log_event(year=year, description=f"Winter {year}")
+        assert not chron_path.exists()
+        assert [e["year"] for e in chronicle] == [0, 1, 2, 3, 4]
+    with open(chron_path, "a", encoding="utf-8") as f:
+        f.write('{"year": 9, "eve')
+    assert len(list(MemoryChronicle(path=chron_path))) == 5
+
+
+def test_memory_chronicle_drops_torn_line_before_appending(tmp_path):
+    chron_path = tmp_path / "chronicle.jsonl"
+    chron_path.write_text('{"year": 1, "event": "Dawn"}\n{"year": 2, "eve', encoding="utf-8")
+    with MemoryChronicle(path=chron_path, flush_every=1) as chronicle:
+        chronicle.log_event(year=3, description="Flood")
+    assert [e["year"] for e in MemoryChronicle(path=chron_path)] == [1, 3]
+
+
+def test_legacy_chronicle_is_imported(tmp_path):
+    legacy = tmp_path / "chronicle.json"
+    legacy.write_text(json.dumps([{"year": 1, "event": "Huts raised"}], indent=2), encoding="utf-8")
+    chronicle = MemoryChronicle(path=legacy)
+    chronicle.log_event(year=2, description="Granary built")
+    assert [e["event"] for e in chronicle] == ["Huts raised", "Granary built"]
+    chronicle.close()
+
+
 def test_chief_orders_propagate_to_tribe():
     coordinator = TribeCoordinator()
     humans = [
@@ -68,3 +417,16 @@ def test_chief_orders_propagate_to_tribe():
     assert propagated[1]["directive"] == order.directive
     assert propagated[0]["directive"] == order.directive
     assert 2 not in propagated
+
+
+def test_random_streams_are_independent_and_restorable():
+    a, b = RandomStreams(3), RandomStreams(3)
+    a["wolves"].random()  # extra draws in one subsystem...
+    assert a["fire"].random() == b["fire"].random()  # ...never shift another
+    assert a["fire"].random() != a["farming"].random()
+
+    saved = a.getstate()
+    expected = [a["wolves"].random(), a["fire"].random()]
+    restored = RandomStreams(3)
+    restored.setstate(saved)
+    assert [restored["wolves"].random(), restored["fire"].random()] == expected
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+import game
+from snapshot import FORMAT_VERSION, HEADER, SnapshotError, read_snapshot, write_snapshot
+
+
+@pytest.fixture
+def sync_thinking(monkeypatch):
+    # Async System 2 replies land at wall-clock-dependent ticks; answer them at the next tick.
+    monkeypatch.setattr(
+        game.Simulation, "think",
+        lambda self, h, situation, priority=game.PRIORITY_DISCOVERY: h.trigger_thinking(situation, self.thought_results, async_call=False),
+    )
+
+
+def test_snapshot_round_trip_preserves_tiles_and_state(tmp_path):
+    path = tmp_path / "world.snap"
+    tiles = bytes(range(12))
+    state = {"clock": (1.5, 2), "fires": {(1, 2)}, "names": ["a", "b"]}
+    size = write_snapshot(path, 4, 3, tiles, state)
+
+    assert path.stat().st_size == size
+    with read_snapshot(path) as snap:
+        assert (snap.width, snap.height, snap.version) == (4, 3, FORMAT_VERSION)
+        assert bytes(snap.tiles) == tiles
+        assert snap.state == state
+
+
+def test_snapshot_rejects_corrupt_files(tmp_path):
+    path = tmp_path / "world.snap"
+    write_snapshot(path, 2, 2, b"\x00\x01\x02\x03", {"a": 1})
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(SnapshotError):
+        read_snapshot(path)
+
+    path.write_bytes(b"not a snapshot at all" * 10)
+    with pytest.raises(SnapshotError):
+        read_snapshot(path)
+
+
+@pytest.mark.parametrize("version", [FORMAT_VERSION - 1, FORMAT_VERSION + 1])
+def test_snapshot_rejects_other_format_versions(tmp_path, version):
+    path = tmp_path / "world.snap"
+    write_snapshot(path, 2, 2, b"\x00\x01\x02\x03", {"a": 1})
+    data = bytearray(path.read_bytes())
+    fields = list(HEADER.unpack_from(data))
+    fields[1] = version
+    HEADER.pack_into(data, 0, *fields)
+    path.write_bytes(bytes(data))
+    with pytest.raises(SnapshotError, match=f"format {version} is"):
+        read_snapshot(path)
+
+
+@pytest.mark.parametrize("backend", [None, "array"])
+def test_resumed_simulation_matches_uninterrupted_run(tmp_path, sync_thinking, backend):
+    sim = game.Simulation(rng=random.Random(11), population_backend=backend)
+    sim.wolves.append((8, 8, False))
+    sim.humans[0].inventory.extend(["🦴", "🥢"])
+    for _ in range(200):
+        sim.update(3.0)
+    sim.save_snapshot(tmp_path / "mid.snap")
+
+    resumed = game.Simulation.load_snapshot(tmp_path / "mid.snap")
+    assert resumed._snapshot_state() == sim._snapshot_state()
+    assert resumed.world.modified() == sim.world.modified()
+    assert resumed.world.region(-16, -16, 40, 40) == sim.world.region(-16, -16, 40, 40)
+
+    for _ in range(300):
+        sim.update(3.0)
+    sim.save_snapshot(tmp_path / "a.snap")
+
+    for _ in range(300):
+        resumed.update(3.0)
+    resumed.save_snapshot(tmp_path / "b.snap")
+
+    assert (tmp_path / "a.snap").read_bytes() == (tmp_path / "b.snap").read_bytes()
@@ -0,0 +1,253 @@
+import dataclasses
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import game
+from bench_system2 import run_benchmark
+from stub_brain_server import StubBrainServer, stub_reply
+from system2 import (
+    PRIORITY_COMBAT,
+    PRIORITY_IDLE,
+    BrainBackend,
+    BrainResponseCache,
+    BrainScheduler,
+    ResultChannel,
+    ThoughtResult,
+    situation_key,
+)
+
+
+def _blocked_scheduler(**kwargs):
+    """Scheduler whose single worker is parked until the returned event is set."""
+    scheduler = BrainScheduler(workers=1, **kwargs)
+    gate, started = threading.Event(), threading.Event()
+
+    def park():
+        started.set()
+        gate.wait(5)
+
+    scheduler.submit("blocker", park)
+    started.wait(5)
+    return scheduler, gate
+
+
+def test_scheduler_serves_combat_before_idle_work():
+    scheduler, gate = _blocked_scheduler()
+    order = []
+    scheduler.submit("pickup", order.append, "pickup", priority=PRIORITY_IDLE)
+    scheduler.submit("combat", order.append, "combat", priority=PRIORITY_COMBAT)
+    gate.set()
+
+    assert scheduler.wait_idle(5)
+    assert order == ["combat", "pickup"]
+    scheduler.shutdown()
+
+
+def test_scheduler_deduplicates_and_applies_backpressure():
+    scheduler, gate = _blocked_scheduler(max_pending=2)
+    results = []
+    assert scheduler.submit("a", lambda: "a1", on_done=results.append)
+    assert scheduler.submit("a", lambda: "a2", on_done=results.append)
+    assert scheduler.submit("b", lambda: "b", on_done=results.append)
+    assert not scheduler.submit("c", lambda: "c", on_done=results.append)
+    assert scheduler.submit("d", lambda: "d", priority=PRIORITY_COMBAT, on_done=results.append)
+    assert results == [None]  # "b" was shed to make room for the combat request.
+    gate.set()
+
+    assert scheduler.wait_idle(5)
+    assert results == [None, "d", "a1"]
+    metrics = scheduler.metrics()
+    assert (metrics.deduplicated, metrics.rejected, metrics.shed) == (1, 1, 1)
+    assert metrics.queue_depth == 0 and metrics.max_queue_depth == 2
+    assert metrics.latency_p99 >= metrics.latency_p50 >= 0
+    scheduler.shutdown()
+
+
+def test_trigger_thinking_keeps_is_thinking_protocol(monkeypatch):
+    scheduler = BrainScheduler(workers=1)
+    monkeypatch.setattr(game, "brain_scheduler", scheduler)
+    monkeypatch.setattr(game, "brain_cache", BrainResponseCache())
+    monkeypatch.setattr(
+        game.QwenBrain, "call_brain",
+        staticmethod(lambda *args: {"THOUGHT": "Stone sharp.", "SPEECH": "Hm!", "CRAFT": "NONE"}),
+    )
+    human = game.Human(0, 0, 0, tribe_id=0)
+    outbox = ResultChannel()
+
+    human.trigger_thinking("Combat with a stranger!", outbox, priority=PRIORITY_COMBAT)
+    assert human.is_thinking is True
+    assert scheduler.wait_idle(5)
+    # The worker only posts the reply; nothing changes until it is applied.
+    assert human.is_thinking is True and human.thought != "Stone sharp."
+
+    for result in outbox.drain():
+        human.apply_thought(result)
+
+    assert human.is_thinking is False
+    assert human.thought == "Stone sharp."
+    scheduler.shutdown()
+
+
+def test_simulation_applies_thought_results_at_start_of_tick():
+    sim = game.Simulation()
+    h = sim.humans[0]
+    h.inventory = ["🦴", "🥢"]
+    h.is_thinking = True
+    sim.thought_results.post(ThoughtResult(h, "Found sticks.", "Make spear.", "Hup!", "SPEAR"))
+    other = sim.humans[1]
+    other.is_thinking = True
+    sim.thought_results.post(ThoughtResult(other, "Combat with a stranger!"))
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        ThoughtResult(h, "x").thought = "y"
+
+    sim.apply_thought_results()
+
+    assert "SPEAR" in h.tools and h.attack_power == 40
+    assert not h.is_thinking and not other.is_thinking
+    assert len(sim.thought_results) == 0
+
+
+def test_situation_key_normalizes_inventory_and_text():
+    assert situation_key(["🦴", "🥢", "🦴"], ["SPEAR"], "I picked up  a 🦴.") == situation_key(
+        ["🥢", "🦴", "🦴"], ["SPEAR", "SPEAR"], "i picked up a 🦴. "
+    )
+    assert situation_key(["🦴"], [], "x") != situation_key(["🦴", "🦴"], [], "x")
+
+
+def test_response_cache_lru_and_ttl():
+    now = [0.0]
+    cache = BrainResponseCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    reply = {"THOUGHT": "Rock.", "SPEECH": "Ugh", "CRAFT": "NONE"}
+    cache.put([], [], "a", reply)
+    cache.put([], [], "b", reply)
+    assert cache.get([], [], "a") == reply
+    cache.put([], [], "c", reply)
+    assert cache.get([], [], "b") is None  # least recently used was evicted
+    now[0] = 11
+    assert cache.get([], [], "a") is None  # expired
+    assert cache.hit_rate == pytest.approx(1 / 3)
+
+
+def test_response_cache_persists_to_disk(tmp_path):
+    path = tmp_path / "brain_cache.jsonl"
+    reply = {"THOUGHT": "Fire warm.", "SPEECH": "Ah", "CRAFT": "NONE"}
+    BrainResponseCache(path=path).put(["🦴"], [], "Night falls.", reply)
+
+    warm = BrainResponseCache(path=path)
+    assert warm.get(["🦴"], [], "night falls.") == reply
+    warm.compact()
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 1
+
+
+def test_response_cache_compacts_a_mostly_dead_store_on_load(tmp_path):
+    path = tmp_path / "brain_cache.jsonl"
+    now = [0.0]
+    reply = {"THOUGHT": "Rock.", "SPEECH": "Ugh", "CRAFT": "NONE"}
+    cache = BrainResponseCache(ttl=10, path=path, clock=lambda: now[0])
+    for i in range(3):
+        cache.put([], [], "old", reply)  # superseded
+        cache.put([], [], f"stale {i}", reply)  # expires below
+    now[0] = 8
+    cache.put([], [], "old", reply)
+    cache.put([], [], "fresh", reply)
+    now[0] = 12
+
+    BrainResponseCache(ttl=10, path=path, clock=lambda: now[0])
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 2
+
+    # Mostly live files are left alone.
+    cache = BrainResponseCache(ttl=10, path=path, clock=lambda: now[0])
+    cache.put([], [], "old", reply)
+    BrainResponseCache(ttl=10, path=path, clock=lambda: now[0])
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 3
+
+
+def test_cached_situation_skips_the_brain(monkeypatch):
+    calls = []
+    cache = BrainResponseCache()
+    monkeypatch.setattr(game, "brain_cache", cache)
+    monkeypatch.setattr(
+        game.QwenBrain, "call_brain",
+        staticmethod(lambda *args: calls.append(args) or {"THOUGHT": "Bone.", "SPEECH": "Oh", "CRAFT": "NONE"}),
+    )
+    first, second = game.Human(0, 0, 0, tribe_id=0), game.Human(1, 0, 0, tribe_id=0)
+    outbox = ResultChannel()
+
+    first.trigger_thinking("I picked up a 🦴.", outbox, async_call=False)
+    second.trigger_thinking("I picked up a 🦴.", outbox, async_call=False)
+
+    assert len(calls) == 1
+    # Cache hits wait in the outbox like any other reply.
+    assert second.is_thinking and second.thought != "Bone."
+    results = outbox.drain()
+    assert [r.agent for r in results] == [first, second]
+    for result in results:
+        result.agent.apply_thought(result)
+    assert second.thought == "Bone." and not second.is_thinking
+
+
+def _post(url, prompt):
+    request = urllib.request.Request(url, data=json.dumps({"prompt": prompt}).encode("utf-8"), method="POST")
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.loads(response.read())["response"]
+
+
+def test_stub_server_replies_deterministically():
+    prompt = game.QwenBrain.build_prompt("Sun_0", ["🦴", "🥢"], [], "I picked up a 🥢.")
+    with StubBrainServer(seed=4) as server:
+        first, second = _post(server.url, prompt), _post(server.url, prompt)
+    assert first == second == stub_reply(prompt, seed=4)
+    assert game.QwenBrain.parse_reply(first)["CRAFT"] == "SPEAR"
+    assert server.requests_served == 2
+
+
+def test_stub_server_failure_rate():
+    with StubBrainServer(failure_rate=1.0) as server:
+        with pytest.raises(urllib.error.HTTPError):
+            _post(server.url, "anything")
+
+
+def test_qwen_brain_uses_pluggable_backend(monkeypatch):
+    class EchoBackend:
+        def generate(self, prompt):
+            return "THOUGHT: Heard you.\nSPEECH: Oi\ncraft: spear"
+
+    monkeypatch.setattr(game.QwenBrain, "backend", EchoBackend())
+    assert game.QwenBrain.call_brain("Sun_0", [], [], "Hello") == {
+        "THOUGHT": "Heard you.", "SPEECH": "Oi", "CRAFT": "SPEAR"
+    }
+
+
+def test_benchmark_reports_frame_and_thinking_stats():
+    # urllib reaches the stub server even where ``requests`` is stubbed out.
+    report = run_benchmark(agents=40, seconds=0.3, latency=0.0, workers=2, client="urllib")
+    assert report["agents"] == 40
+    assert report["frames"] > 0
+    assert report["frame_p99_ms"] >= report["frame_p50_ms"] > 0
+    assert report["server_requests"] > 0
+    assert report["thoughts_completed"] > 0
+
+
+def test_worker_survives_a_failing_callback(caplog):
+    scheduler = BrainScheduler(workers=1)
+    done = threading.Event()
+
+    def explode(result):
+        raise RuntimeError("callback bug")
+
+    scheduler.submit("first", lambda: "ok", on_done=explode)
+    scheduler.submit("second", lambda: "ok", on_done=lambda result: done.set())
+    assert done.wait(5), "the worker died with the first callback"
+    assert scheduler.wait_idle(5)
+    assert scheduler.metrics().completed == 2
+    assert "callback bug" in caplog.text
+    scheduler.shutdown()
+
+
+def test_brain_backend_is_abstract():
+    with pytest.raises(TypeError):
+        BrainBackend()